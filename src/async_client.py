@@ -0,0 +1,152 @@
+import asyncio
+from pathlib import Path
+
+from quic.client import Client, map_file
+from quic.clock import SECOND
+from quic.packets import QuicPacket
+from quic.packets.numbered_packet import NumberedPacket
+from quic.pmtud import set_dont_fragment
+from quic.transfer_stats import TransferStats
+
+
+class AsyncClient(Client, asyncio.DatagramProtocol):
+    """
+    Client on an asyncio datagram endpoint. Packets are handled as they arrive and the loss and probe timers
+    run on the event loop, so a transfer is awaited instead of polling the socket.
+    """
+
+    def __init__(self, server_ip, server_port, **kwargs):
+        super().__init__(server_ip, server_port, **kwargs)
+
+        self._transport: asyncio.DatagramTransport | None = None
+        self._timer: asyncio.TimerHandle | None = None
+        self._timer_deadline: int | None = None
+
+        # Set whenever an ACK, a timer or the transport may have opened the window
+        self._wakeup = asyncio.Event()
+        self._writing_paused = False
+
+    async def __aenter__(self):
+        loop = asyncio.get_running_loop()
+
+        if self._sock is None:
+            await loop.create_datagram_endpoint(lambda: self, remote_addr=(self.server_ip, self.server_port))
+        else:
+            self._sock.connect((self.server_ip, self.server_port))
+            await loop.create_datagram_endpoint(lambda: self, sock=self._sock)
+
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self._cancel_timer()
+        self._transport.close()
+
+    def connection_made(self, transport: asyncio.DatagramTransport):
+        self._transport = transport
+
+        if self.pmtud is not None:
+            set_dont_fragment(transport.get_extra_info("socket"))
+
+    def connection_lost(self, exc):
+        self._cancel_timer()
+        self._wakeup.set()
+
+    def datagram_received(self, data: bytes, addr):
+        packet, _ = QuicPacket.from_buffer(memoryview(data))
+        self.on_packet_received(packet)
+
+        self._set_timer()
+        self._wakeup.set()
+
+    def pause_writing(self):
+        self._writing_paused = True
+
+    def resume_writing(self):
+        self._writing_paused = False
+        self._wakeup.set()
+
+    def send_datagram(self, data, flush=False):
+        self._transport.sendto(data)
+
+    def on_packet_sent(self, packet: NumberedPacket, size: int):
+        super().on_packet_sent(packet, size)
+
+        self._set_timer()
+
+    def can_send(self) -> bool:
+        return not self._writing_paused and super().can_send()
+
+    async def send_stream(self, data, chunk_size: int = None, stream_id: int = None, max_in_flight: int = None) -> TransferStats:
+        """
+        Same as Client.send_stream, but waits on the event loop for ACKs, timers and the pacer.
+        """
+        stream = self.open_stream(data, chunk_size, stream_id)
+        stats = self.start_transfer()
+
+        try:
+            while not stream.finished:
+                if self._transport.is_closing():
+                    raise ConnectionError("Transport closed during transfer")
+
+                if stream.has_data() and self.window_open(max_in_flight):
+                    send_time = self.next_send_time()
+
+                    if send_time <= self.clock.now():
+                        if not self.send_mtu_probe():
+                            self.send_packet(self.build_packet(immediate_ack=self.window_closing(max_in_flight)))
+                        continue
+
+                    await self._wait(send_time)
+                else:
+                    await self._wait()
+        finally:
+            self.close_stream(stream)
+
+        stats.bytes_sent += stream.size
+        return self.finish_transfer(stats)
+
+    async def send_file(self, path: Path, chunk_size: int = None, stream_id: int = None, max_in_flight: int = None) -> TransferStats:
+        return await self.send_stream(map_file(path), chunk_size, stream_id, max_in_flight)
+
+    async def _wait(self, deadline: int = None):
+        # Nothing runs between the caller's checks and clearing the event, so no wakeup is missed
+        self._wakeup.clear()
+
+        if deadline is None:
+            await self._wakeup.wait()
+            return
+
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), max(deadline - self.clock.now(), 0) / SECOND)
+        except asyncio.TimeoutError:
+            pass
+
+    def _set_timer(self):
+        deadline = self.next_timeout()
+        if deadline == self._timer_deadline:
+            return
+
+        self._cancel_timer()
+
+        if deadline is not None:
+            self._timer_deadline = deadline
+            self._timer = asyncio.get_running_loop().call_later(
+                max(deadline - self.clock.now(), 0) / SECOND,
+                self._on_timer,
+            )
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+
+        self._timer = None
+        self._timer_deadline = None
+
+    def _on_timer(self):
+        self._timer = None
+        self._timer_deadline = None
+
+        self.on_timeout()
+
+        self._set_timer()
+        self._wakeup.set()
@@ -0,0 +1,137 @@
+import asyncio
+
+from quic.clock import SECOND
+from quic.connection import Connection
+from quic.frames.stream import StreamFrame
+from quic.packets.numbered_packet import NumberedPacket
+from quic.server import Server
+from quic.stream_reassembler import StreamReassembler
+
+
+class ReceiveStream:
+    """
+    One stream of a connection. Data is fed to the reader in order as soon as it is contiguous,
+    and the reader reaches EOF after the final frame.
+    """
+
+    def __init__(self, connection: Connection, stream_id: int):
+        self.connection = connection
+        self.stream_id = stream_id
+        self.reader = asyncio.StreamReader()
+        self.reassembler = StreamReassembler(self.reader.feed_data)
+
+    def on_stream_frame(self, frame: StreamFrame):
+        if self.reader.exception() is not None or self.finished:
+            return
+
+        try:
+            self.reassembler.on_stream_frame(frame)
+        except ValueError as e:
+            self.reader.set_exception(e)
+            return
+
+        if self.finished:
+            self.reader.feed_eof()
+
+    @property
+    def finished(self) -> bool:
+        # All data up to the final frame arrived, though the reader may not have consumed it yet
+        return self.reassembler.finished
+
+    @property
+    def addr(self):
+        return self.connection.addr
+
+    async def read(self, n=-1) -> bytes:
+        return await self.reader.read(n)
+
+
+class AsyncServer(Server, asyncio.DatagramProtocol):
+    """
+    Server on an asyncio datagram endpoint. Incoming streams are accepted with `async for stream in
+    server.accept_streams()`, and a loop timer sends delayed ACKs as they fall due.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        self._transport: asyncio.DatagramTransport | None = None
+
+        # Timer for the earliest delayed ACK, if any is pending
+        self._ack_timer: asyncio.TimerHandle | None = None
+
+        self._new_streams: asyncio.Queue[ReceiveStream | None] = asyncio.Queue()
+
+    async def __aenter__(self):
+        loop = asyncio.get_running_loop()
+
+        if self._sock is None:
+            await loop.create_datagram_endpoint(lambda: self, local_addr=(self.bind_host, self.bind_port))
+        else:
+            await loop.create_datagram_endpoint(lambda: self, sock=self._sock)
+
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self._transport.close()
+
+    @property
+    def address(self):
+        return self._transport.get_extra_info("sockname")
+
+    def connection_made(self, transport: asyncio.DatagramTransport):
+        self._transport = transport
+
+    def connection_lost(self, exc):
+        if self._ack_timer is not None:
+            self._ack_timer.cancel()
+            self._ack_timer = None
+
+        for connection in list(self.connections):
+            self.on_connection_closed(connection)
+
+        self._new_streams.put_nowait(None)
+
+    def on_connection_closed(self, connection: Connection):
+        super().on_connection_closed(connection)
+
+        for stream in connection.streams.values():
+            if not stream.finished:
+                stream.reader.set_exception(ConnectionError("Connection closed before the stream finished"))
+
+    def datagram_received(self, data: bytes, addr):
+        packet = self.parse_datagram(data, addr)
+        if packet is None:
+            return
+
+        if self.on_packet_received(packet, addr) is not None:
+            self._set_ack_timer()
+
+    def open_stream(self, connection: Connection, stream_id: int) -> ReceiveStream:
+        stream = ReceiveStream(connection, stream_id)
+        self._new_streams.put_nowait(stream)
+
+        return stream
+
+    async def accept_streams(self):
+        while (stream := await self._new_streams.get()) is not None:
+            yield stream
+
+    def send_packet(self, packet: NumberedPacket, addr):
+        end = packet.serialize_into(self._send_buffer, 0)
+        self._transport.sendto(self._send_buffer[:end], addr)
+
+    def _set_ack_timer(self):
+        deadline = self.next_ack_deadline()
+
+        if deadline is not None and self._ack_timer is None:
+            self._ack_timer = asyncio.get_running_loop().call_later(
+                max(deadline - self.clock.now(), 0) / SECOND,
+                self._on_ack_timer,
+            )
+
+    def _on_ack_timer(self):
+        self._ack_timer = None
+
+        self.send_due_acks(self.clock.now())
+        self._set_ack_timer()
@@ -1,15 +1,44 @@
-import datetime
+import errno
 import logging
-import math
+import mmap
 import random
 import socket
-from io import BytesIO
 from pathlib import Path
 
+from quic.clock import Clock, MICROSECOND, MILLISECOND, MonotonicClock, SECOND
+from quic.congestion import CongestionController
+from quic.congestion.new_reno import NewReno
+from quic.datagram_io import DatagramIO, MAX_UDP_PAYLOAD
 from quic.frames.ack import AckFrame
+from quic.frames.immediate_ack import elicits_immediate_ack, ImmediateAckFrame
+from quic.frames.padding import PaddingFrame
+from quic.frames.ping import PingFrame
 from quic.frames.stream import StreamFrame
 from quic.packets import QuicPacket
+from quic.packets.initial import QuicInitialPacket
 from quic.packets.numbered_packet import NumberedPacket
+from quic.pacer import Pacer
+from quic.packet_builder import PacketBuilder
+from quic.pmtud import PathMtuDiscovery, SEARCHING, set_dont_fragment
+from quic.send_stream import SendStream
+from quic.sent_packets import SentPacket, SentPacketTracker, StreamRange
+from quic.transfer_stats import TransferStats
+
+
+def map_file(path: Path):
+    size = path.stat().st_size
+    if size == 0:
+        return b""
+
+    # A read-only mapping instead of a copy, so neither sending nor retransmitting reads the file into memory.
+    # The mapping stays open until the last view of it is released
+    with path.open("rb") as f:
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if hasattr(mmap, "MADV_SEQUENTIAL"):
+        mapping.madvise(mmap.MADV_SEQUENTIAL)
+
+    return memoryview(mapping)
 
 
 class Client:
@@ -20,12 +49,23 @@ class Client:
             timeout=0.0001,
             package_reordering_threshold=15,
             waiting_time_threshold=40,
-            k_initial_rtt=100000,
+            k_initial_rtt=100 * MILLISECOND,
+            max_datagram_size=1500,
+            clock: Clock = None,
+            sock=None,
+            congestion_controller: CongestionController = None,
+            pacer: Pacer = None,
+            batched_io=False,
+            pmtu_discovery=False,
+            max_udp_payload_size=MAX_UDP_PAYLOAD,
+            max_ack_delay=25 * MILLISECOND,
+            ack_delay_exponent=3,
     ):
         self.server_ip = server_ip
         self.server_port = server_port
 
         self.timeout = timeout
+        self.clock = clock if clock is not None else MonotonicClock()
 
         self.ack_detect = True
         self.time_detect = True
@@ -34,130 +74,607 @@ class Client:
         self.waiting_time_threshold = waiting_time_threshold
 
         self.largest_acked = -1
-        self.last_ack_time = datetime.datetime.now()
-        self.unacked_packets = {}
-        self.transmission_times: dict[int, datetime.datetime] = {}
+        self.last_ack_time = self.clock.now()
+        self.sent_packets = SentPacketTracker()
 
+        # Time at which the oldest in-flight packet will be declared lost by the time threshold
+        self.loss_time: int | None = None
+
+        # RTT state in nanoseconds
         self.k_initial_rtt = k_initial_rtt
         self.smoothed_rtt = self.k_initial_rtt
-        self.rttvar = self.k_initial_rtt / 2
-        self.min_rtt = float("inf")
+        self.rttvar = self.k_initial_rtt // 2
+        self.min_rtt = 0
         self.latest_rtt = self.k_initial_rtt
+        self._has_rtt_sample = False
+        self.first_rtt_sample_time: int | None = None
+
+        # The server's delayed ACK settings. Without transport parameters to learn them from, they are
+        # configured to match the server
+        self.max_ack_delay = max_ack_delay
+        self.ack_delay_exponent = ack_delay_exponent
+
+        # Probe timeout state, see RFC 9002 section 6.2
+        self.pto_count = 0
+        self.time_of_last_ack_eliciting_packet: int | None = None
+
+        # Whether the server ACKs the last ack-eliciting packet without delay, see elicits_immediate_ack
+        self.immediate_ack_requested = False
+
+        self.max_datagram_size = max_datagram_size
+        self.congestion_controller = congestion_controller if congestion_controller is not None \
+            else NewReno(max_datagram_size)
+        self.pacer = pacer if pacer is not None else Pacer(max_datagram_size)
+
+        # Limit of path MTU discovery, which raises max_datagram_size from its configured value as far as the path
+        # allows
+        self.max_udp_payload_size = max_udp_payload_size
+        self.pmtud = PathMtuDiscovery(max_datagram_size, max_udp_payload_size, self.clock.now()) \
+            if pmtu_discovery else None
+
+        self._send_buffer = memoryview(bytearray(max_udp_payload_size if pmtu_discovery else max_datagram_size))
 
         self._largest_packet_number = -1
         self._largest_stream_id = -1
 
+        # Send side of the streams being sent by stream ID, the source lost data is framed again from
+        self.streams: dict[int, SendStream] = {}
+
+        # Stream payload bytes in packets that are neither acknowledged nor declared lost
+        self.stream_bytes_in_flight = 0
+
+        # Running totals for transfer statistics
+        self.packets_sent = 0
+        self.packets_lost = 0
+        self.probes_sent = 0
+
         self.id = random.randint(0, 10000)
 
+        # Destination connection ID of sent packets. A random one until the server's first packet
+        # carries the ID it issued for this connection, see RFC 9000 section 7.2
+        self.dst_conn_id = random.getrandbits(64)
+
+        # An injected socket (e.g. a simulated one) is used as is instead of opening a UDP socket
+        self._sock = sock
+
+        # Whether to batch datagrams per syscall with UDP GSO/GRO where the socket supports it
+        self.batched_io = batched_io
+        self._io: DatagramIO | None = None
+
     def __enter__(self):
-        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        if self._sock is None:
+            self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
         self._sock.connect((self.server_ip, self.server_port))
         self._sock.settimeout(self.timeout)
+        self._io = DatagramIO.create(self._sock, self.batched_io)
+
+        if self.pmtud is not None:
+            set_dont_fragment(self._sock)
 
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self._sock.close()
+        try:
+            self._io.flush()
+        finally:
+            self._sock.close()
 
     def send_packet(self, packet: NumberedPacket):
-        buffer = bytes(packet.to_bytes())
-        self._sock.send(buffer)
+        end = packet.serialize_into(self._send_buffer, 0)
+        self.send_datagram(self._send_buffer[:end])
+
+        self.on_packet_sent(packet, end)
+
+    def send_datagram(self, data, flush=False):
+        self._io.send(data)
+
+        if flush:
+            self._io.flush()
+
+    def on_packet_sent(self, packet: NumberedPacket, size: int):
+        now = self.clock.now()
+        ack_eliciting = any(not isinstance(frame, (AckFrame, PaddingFrame)) for frame in packet.frames)
+
+        sent_packet = SentPacket(packet.packet_number, now, size, ack_eliciting, self.stream_ranges(packet))
+        self.sent_packets.add(sent_packet)
+        self.packets_sent += 1
+        self.stream_bytes_in_flight += sent_packet.stream_bytes
+        self.congestion_controller.on_packet_sent(sent_packet)
+        self.pacer.on_packet_sent(size, now)
+
+        if ack_eliciting:
+            self.time_of_last_ack_eliciting_packet = now
+            self.immediate_ack_requested = elicits_immediate_ack(packet.frames)
+
+    @staticmethod
+    def stream_ranges(packet: NumberedPacket) -> tuple[StreamRange, ...]:
+        return tuple(
+            StreamRange(frame.stream_id, frame.offset or 0, len(frame.data), frame.finish)
+            for frame in packet.frames if isinstance(frame, StreamFrame)
+        )
+
+    def can_send(self) -> bool:
+        return self.congestion_controller.can_send()
+
+    def next_send_time(self) -> int:
+        congestion_controller = self.congestion_controller
+        self.pacer.update_rate(congestion_controller.congestion_window, self.smoothed_rtt, congestion_controller.pacing_rate)
+
+        return self.pacer.next_send_time(self.clock.now())
+
+    def create_packet(self, frames=None) -> QuicInitialPacket:
+        return QuicInitialPacket(
+            packet_number=self.get_packet_number(),
+            version=1,
+            dst_conn_id=self.dst_conn_id,
+            src_conn_id=self.id,
+            frames=frames,
+            largest_acked=self.largest_acked,
+        )
+
+    def build_packet(self, retransmit_only=False, immediate_ack=False) -> QuicInitialPacket:
+        # Lost data of every stream goes first, then new data fills the rest of the datagram
+        builder = PacketBuilder(self.create_packet(), self.max_datagram_size)
+
+        # Nothing may follow a packet that (nearly) drains the streams, so the server should not wait for more
+        if immediate_ack or sum(stream.pending_bytes for stream in self.streams.values()) <= self.max_datagram_size:
+            builder.add_frame(ImmediateAckFrame())
+
+        for stream in self.streams.values():
+            builder.add_stream_frames(stream, retransmit_only=True)
 
-        self.unacked_packets[packet.packet_number] = packet
-        self.transmission_times[packet.packet_number] = datetime.datetime.now()
+        if not retransmit_only:
+            for stream in self.streams.values():
+                builder.add_stream_frames(stream)
+
+        return builder.build()
+
+    def build_probe(self) -> QuicInitialPacket:
+        # Probes carry new or lost data if there is any, and otherwise the oldest data in flight,
+        # so that a probe can also repair a lost tail, see RFC 9002 section 6.2.4. Its ACK is not delayed,
+        # since the probe timer already waited out max_ack_delay
+        if any(stream.has_data() for stream in self.streams.values()):
+            return self.build_packet(immediate_ack=True)
+
+        builder = PacketBuilder(self.create_packet([ImmediateAckFrame()]), self.max_datagram_size)
+
+        # Earlier probes may have carried the same ranges again
+        added = set()
+
+        in_flight = (stream_range for sent_packet in self.sent_packets for stream_range in sent_packet.stream_ranges)
+        for stream_range in in_flight:
+            stream = self.streams.get(stream_range.stream_id)
+            key = (stream_range.stream_id, stream_range.offset)
+
+            if stream is None or key in added or stream.is_acked(stream_range):
+                continue
+
+            added.add(key)
+
+            if not builder.add_stream_range(stream, stream_range):
+                break
+
+        return builder.build()
+
+    def send_mtu_probe(self) -> bool:
+        # Sends a padded PING of the next size path MTU discovery wants to try, if any
+        if self.pmtud is None or (size := self.pmtud.next_probe_size(self.clock.now())) is None:
+            return False
+
+        # A probe waits for a window it fits in, rather than holding back data until it is declared lost
+        congestion_controller = self.congestion_controller
+        if congestion_controller.bytes_in_flight + size > congestion_controller.congestion_window:
+            return False
+
+        builder = PacketBuilder(self.create_packet([PingFrame()]), size)
+        builder.pad()
+        probe = builder.build()
+
+        # Sent on its own, so that a probe too big for the local interface fails right here
+        try:
+            end = probe.serialize_into(self._send_buffer, 0)
+            self.send_datagram(self._send_buffer[:end], flush=True)
+        except OSError as e:
+            if e.errno != errno.EMSGSIZE:
+                raise
+
+            self.pmtud.on_probe_too_big(self.clock.now())
+            return True
+
+        self.on_packet_sent(probe, end)
+        self.pmtud.on_probe_sent(probe.packet_number)
+
+        return True
+
+    def set_max_datagram_size(self, max_datagram_size: int):
+        logging.debug(f"Maximum datagram size is now {max_datagram_size}")
+
+        self.max_datagram_size = max_datagram_size
+        self.congestion_controller.set_max_datagram_size(max_datagram_size)
+        self.pacer.set_max_datagram_size(max_datagram_size)
 
     def chunkify_file(self, path: Path, chunk_size=1000, stream_id: int = None):
         if stream_id is None:
             stream_id = self.get_stream_id()
 
-        size = path.stat().st_size
-        chunk_count = math.ceil(size / chunk_size)
+        # Frames are views of the mapped file instead of copies
+        view = map_file(path)
+        size = len(view)
 
-        with path.open("rb") as f:
-            for i in range(chunk_count):
-                current_position = f.tell()
-                buffer = f.read(chunk_size)
+        for offset in range(0, size, chunk_size):
+            yield StreamFrame(
+                stream_id,
+                include_length=True,
+                offset=offset,
+                finish=size - offset <= chunk_size,
+                data=view[offset:offset + chunk_size],
+            )
 
-                yield StreamFrame(
-                    stream_id,
-                    include_length=True,
-                    offset=current_position,
-                    finish=size - current_position <= chunk_size,
-                    data=buffer,
-                )
+    def open_stream(self, data, chunk_size: int = None, stream_id: int = None) -> SendStream:
+        if stream_id is None:
+            stream_id = self.get_stream_id()
 
-    def is_lost(self, packet_number: int) -> bool:
-        k_time_threshold = 9 / 8
-        k_granularity = datetime.timedelta(milliseconds=1)
+        if stream_id in self.streams:
+            raise ValueError(f"Stream {stream_id} is already being sent")
+
+        stream = self.streams[stream_id] = SendStream(stream_id, data, chunk_size)
+        return stream
+
+    def close_stream(self, stream: SendStream):
+        del self.streams[stream.stream_id]
+
+    def send_stream(self, data, chunk_size: int = None, stream_id: int = None, max_in_flight: int = None) -> TransferStats:
+        """
+        Sends the data on a new stream in packets filled up to max_datagram_size, with frames of at most
+        chunk_size bytes if given, keeping as many in flight as the congestion window, the pacer and
+        max_in_flight (in packets) allow, and returns once all of them have been acknowledged.
+        """
+        stream = self.open_stream(data, chunk_size, stream_id)
+        stats = self.start_transfer()
+
+        try:
+            while True:
+                # The ACK that finishes the stream may be among the packets that already arrived
+                self.receive_ready()
+                if stream.finished:
+                    break
+
+                self.on_timeout()
+
+                if stream.has_data() and self.window_open(max_in_flight):
+                    send_time = self.next_send_time()
+
+                    if send_time <= self.clock.now():
+                        if not self.send_mtu_probe():
+                            self.send_packet(self.build_packet(immediate_ack=self.window_closing(max_in_flight)))
+                        continue
+
+                    deadline = send_time
+                else:
+                    deadline = self.next_timeout()
+                    if deadline is None:
+                        deadline = self.clock.now() + self.pto_duration()
+
+                self.receive_before(deadline)
+        finally:
+            self.close_stream(stream)
+
+        stats.bytes_sent += stream.size
+        return self.finish_transfer(stats)
+
+    def send_file(self, path: Path, chunk_size: int = None, stream_id: int = None, max_in_flight: int = None) -> TransferStats:
+        return self.send_stream(map_file(path), chunk_size, stream_id, max_in_flight)
+
+    def window_open(self, max_in_flight: int = None) -> bool:
+        return self.can_send() and (max_in_flight is None or len(self.sent_packets) < max_in_flight)
+
+    def window_closing(self, max_in_flight: int = None) -> bool:
+        # The next packet is the last one the window allows, so its ACK should not wait for more packets to follow
+        congestion_controller = self.congestion_controller
+        if congestion_controller.bytes_in_flight + self.max_datagram_size >= congestion_controller.congestion_window:
+            return True
 
+        return max_in_flight is not None and len(self.sent_packets) + 1 >= max_in_flight
+
+    def start_transfer(self) -> TransferStats:
+        stats = TransferStats(self.clock.now())
+
+        # The counters hold the running totals at the start until finish_transfer
+        stats.packets_sent = self.packets_sent
+        stats.packets_lost = self.packets_lost
+        stats.probes_sent = self.probes_sent
+
+        return stats
+
+    def finish_transfer(self, stats: TransferStats) -> TransferStats:
+        stats.end = self.clock.now()
+        stats.packets_sent = self.packets_sent - stats.packets_sent
+        stats.packets_lost = self.packets_lost - stats.packets_lost
+        stats.probes_sent = self.probes_sent - stats.probes_sent
+        stats.smoothed_rtt = self.smoothed_rtt
+        stats.min_rtt = self.min_rtt
+
+        return stats
+
+    def loss_delay(self) -> int:
+        k_granularity = MILLISECOND
+
+        # k_time_threshold = 9 / 8
+        max_rtt = max(self.smoothed_rtt, self.latest_rtt)
+        return max(max_rtt * 9 // 8, k_granularity)
+
+    def is_lost(self, packet_number: int) -> bool:
         lost = True
 
         if self.ack_detect:
             lost &= packet_number <= self.largest_acked - self.package_reordering_threshold
 
         if lost and self.time_detect:
-            max_rtt = max(self.smoothed_rtt, self.latest_rtt)
-            threshold_time = max(datetime.timedelta(microseconds=k_time_threshold * max_rtt), k_granularity)
-            lost &= self.transmission_times[packet_number] < self.last_ack_time - threshold_time
+            lost &= self.sent_packets.get(packet_number).time_sent <= self.last_ack_time - self.loss_delay()
 
         return lost
 
-    def resend_lost_packets(self) -> dict[int, NumberedPacket]:
-        lost_packets = {}
-        for packet_number, packet in self.unacked_packets.items():
-            if self.is_lost(packet_number):
-                new_packet_number = self.get_packet_number()
+    def detect_lost_packets(self, now: int = None) -> list[SentPacket]:
+        # Packets are sent in packet number order, so both thresholds declare a prefix of the
+        # in-flight packets lost and the walk can stop at the first packet that is not
+        reference_time = self.last_ack_time if now is None else now
+        loss_delay = self.loss_delay()
+        largest_lost = self.largest_acked - self.package_reordering_threshold
+
+        self.loss_time = None
+
+        lost = []
+        while (sent_packet := self.sent_packets.oldest()) is not None:
+            if self.ack_detect and sent_packet.packet_number > largest_lost:
+                break
+
+            # A packet is lost once loss_delay has passed since it was sent, which is when loss_time fires
+            if self.time_detect and sent_packet.time_sent > reference_time - loss_delay:
+                self.loss_time = sent_packet.time_sent + loss_delay
+                break
+
+            lost.append(self.sent_packets.remove(sent_packet.packet_number))
+
+        return lost
+
+    def in_persistent_congestion(self, lost: list[SentPacket]) -> bool:
+        # Lost packets come from the oldest end of the in-flight packets, so the span between the first
+        # and last one sent after the first RTT sample stands in for the RFC's contiguous lost period
+        if self.first_rtt_sample_time is None:
+            return False
+
+        times_sent = [
+            sent_packet.time_sent for sent_packet in lost
+            if sent_packet.ack_eliciting and sent_packet.time_sent >= self.first_rtt_sample_time
+        ]
+
+        if len(times_sent) < 2:
+            return False
+
+        # k_persistent_congestion_threshold = 3
+        return times_sent[-1] - times_sent[0] > self.pto_duration() * 3
+
+    def on_packets_lost(self, lost: list[SentPacket]):
+        now = self.clock.now()
+
+        self.packets_lost += len(lost)
+        self.stream_bytes_in_flight -= sum(sent_packet.stream_bytes for sent_packet in lost)
+
+        pmtud = self.pmtud
+        if pmtud is not None and pmtud.probe_packet_number is not None:
+            probes = [sent_packet for sent_packet in lost if pmtud.is_probe(sent_packet.packet_number)]
+
+            # A lost probe was most likely too big for the path, which says nothing about congestion
+            if probes:
+                lost = [sent_packet for sent_packet in lost if not pmtud.is_probe(sent_packet.packet_number)]
+                self.congestion_controller.on_packets_discarded(probes)
+                pmtud.on_probe_lost(now)
+
+        for sent_packet in lost:
+            for stream_range in sent_packet.stream_ranges:
+                stream = self.streams.get(stream_range.stream_id)
+
+                # A closed stream was acknowledged in full, e.g. through a probe that carried the same data
+                if stream is not None:
+                    stream.on_range_lost(stream_range)
+
+        persistent_congestion = self.in_persistent_congestion(lost)
+        self.congestion_controller.on_packets_lost(lost, now, persistent_congestion)
+
+        # Persistent loss may mean that packets of the discovered size no longer fit the path, see RFC 8899
+        # section 4.3, so they shrink back to the configured size until probing finds the new limit
+        if persistent_congestion and pmtud is not None and self.max_datagram_size > pmtud.base_size:
+            pmtud.on_black_hole(now)
+            self.set_max_datagram_size(pmtud.max_payload)
+
+    def pto_duration(self, max_ack_delay=True) -> int:
+        k_granularity = MILLISECOND
+        duration = self.smoothed_rtt + max(4 * self.rttvar, k_granularity)
+
+        # The server may hold back the ACK of the last packet for up to max_ack_delay
+        return duration + self.max_ack_delay if max_ack_delay else duration
+
+    def next_timeout(self) -> int | None:
+        if self.loss_time is not None:
+            return self.loss_time
+
+        # The probe timer only runs while ack-eliciting packets are in flight
+        if self.congestion_controller.bytes_in_flight == 0 or self.time_of_last_ack_eliciting_packet is None:
+            return None
+
+        # Unless the last packet asked for an immediate ACK, which the server does not delay
+        pto_duration = self.pto_duration(max_ack_delay=not self.immediate_ack_requested)
+
+        return self.time_of_last_ack_eliciting_packet + pto_duration * 2 ** self.pto_count
+
+    def on_timeout(self):
+        now = self.clock.now()
+        timeout = self.next_timeout()
 
-                logging.debug(f"Resending {packet_number} as {new_packet_number}")
-                lost_packets[packet.packet_number] = packet
-                packet.packet_number = new_packet_number
+        if timeout is None or now < timeout:
+            return
+
+        if self.loss_time is not None:
+            self.on_loss_timeout()
+            return
+
+        # Probes are sent regardless of the congestion window to elicit an ACK
+        self.pto_count += 1
+        for _ in range(2):
+            self.send_packet(self.build_probe())
+            self.probes_sent += 1
+
+    def on_loss_timeout(self) -> list[NumberedPacket]:
+        return self.resend_lost_packets(now=self.clock.now())
+
+    def resend_lost_packets(self, now: int = None) -> list[NumberedPacket]:
+        lost = self.detect_lost_packets(now)
+        if lost:
+            self.on_packets_lost(lost)
+
+        return self.send_retransmissions()
+
+    def send_retransmissions(self) -> list[NumberedPacket]:
+        # Lost stream data is framed again into new packets right away, ahead of new data. PINGs and ACKs
+        # carry no stream data, so they are never sent again
+        packets = []
+
+        while any(stream.retransmit for stream in self.streams.values()):
+            packet = self.build_packet(retransmit_only=True, immediate_ack=self.window_closing())
+
+            logging.debug(f"Resending {len(packet.frames)} lost ranges in {packet.packet_number}")
+            packets.append(packet)
 
-        for old_packet_number, packet in lost_packets.items():
-            self.unacked_packets.pop(old_packet_number)
-            self.unacked_packets[packet.packet_number] = packet
-            self.transmission_times.pop(old_packet_number)
             self.send_packet(packet)
 
-        return lost_packets
+        return packets
+
+    @property
+    def receive_size(self) -> int:
+        # Datagrams only grow past max_datagram_size while path MTU discovery is probing
+        pmtud = self.pmtud
+
+        if pmtud is not None and pmtud.state == SEARCHING:
+            return pmtud.max_size
+
+        return self.max_datagram_size
+
+    def receive_packet(self) -> tuple[QuicPacket, tuple[str, int], list[NumberedPacket]]:
+        buffer, addr = self._io.recvfrom(self.receive_size)
+        packet, _ = QuicPacket.from_buffer(memoryview(buffer))
+
+        return packet, addr, self.on_packet_received(packet)
+
+    def on_packet_received(self, packet: QuicPacket) -> list[NumberedPacket] | None:
+        if not isinstance(packet, NumberedPacket):
+            return None
+
+        if isinstance(packet, QuicInitialPacket):
+            self.dst_conn_id = packet.src_conn_id
+
+        for frame in packet.frames:
+            if frame.type == 2:
+                frame: AckFrame
+
+                self.on_ack_frame(frame)
+
+        return self.resend_lost_packets()
+
+    def receive_ready(self):
+        # Handles every packet that already arrived, without blocking
+        self._sock.settimeout(0)
+
+        try:
+            while True:
+                self.receive_packet()
+        except (socket.timeout, BlockingIOError):
+            pass
+        finally:
+            self._sock.settimeout(self.timeout)
+
+    def receive_before(self, deadline: int) -> bool:
+        # Waits until deadline at the latest for one packet and handles it
+        self._sock.settimeout(max(deadline - self.clock.now(), 0) / SECOND)
+
+        try:
+            self.receive_packet()
+            return True
+        except (socket.timeout, BlockingIOError):
+            return False
+        finally:
+            self._sock.settimeout(self.timeout)
+
+    def on_ack_frame(self, frame: AckFrame):
+        now = self.clock.now()
+
+        self.largest_acked = max(self.largest_acked, frame.largest_acknowledged)
+        self.last_ack_time = now
+        self.pto_count = 0
+
+        acked = []
+        largest_newly_acked = None
+
+        for smallest, largest in frame.ranges():
+            acked_range = self.on_ack_range(smallest, largest)
+
+            if acked_range and largest_newly_acked is None:
+                largest_newly_acked = acked_range[-1]
+
+            acked.extend(acked_range)
+
+        # Only the largest acknowledged packet gives an RTT sample, and only when it is newly acknowledged
+        if largest_newly_acked is not None and largest_newly_acked.packet_number == frame.largest_acknowledged:
+            if any(sent_packet.ack_eliciting for sent_packet in acked):
+                if self.first_rtt_sample_time is None:
+                    self.first_rtt_sample_time = now
+
+                self.update_rtt(now - largest_newly_acked.time_sent, self.decode_ack_delay(frame))
+
+        self.congestion_controller.on_packets_acked(acked, now)
+        self.stream_bytes_in_flight -= sum(sent_packet.stream_bytes for sent_packet in acked)
+
+        pmtud = self.pmtud
+        if pmtud is not None and pmtud.probe_packet_number is not None:
+            for sent_packet in acked:
+                if pmtud.is_probe(sent_packet.packet_number):
+                    pmtud.on_probe_acked(sent_packet.size, now)
+                    self.set_max_datagram_size(pmtud.max_payload)
+
+        for sent_packet in acked:
+            for stream_range in sent_packet.stream_ranges:
+                stream = self.streams.get(stream_range.stream_id)
 
-    def receive_packet(self) -> tuple[QuicPacket, tuple[str, int], dict[int, NumberedPacket]]:
-        buffer, addr = self._sock.recvfrom(1500)
-        packet = QuicPacket.from_bytes(BytesIO(buffer))
+                if stream is not None:
+                    stream.on_range_acked(stream_range)
 
-        resent_lost_packets = None
-        if isinstance(packet, NumberedPacket):
-            for frame in packet.frames:
-                if frame.type == 2:
-                    frame: AckFrame
+        return acked
 
-                    self.largest_acked = frame.largest_acknowledged
-                    self.last_ack_time = datetime.datetime.now()
+    def on_ack_range(self, smallest: int, largest: int) -> list[SentPacket]:
+        return self.sent_packets.ack_range(smallest, largest)
 
-                    for packet_number in range(frame.smallest_acknowledged, frame.largest_acknowledged + 1):
-                        self.unacked_packets.pop(packet_number, None)
-                        transmission_time = self.transmission_times.pop(packet_number, None)
+    def decode_ack_delay(self, frame: AckFrame) -> int:
+        # The server never delays an ACK beyond max_ack_delay, so any excess is not taken out of the RTT
+        return min((frame.ack_delay << self.ack_delay_exponent) * MICROSECOND, self.max_ack_delay)
 
-                        if transmission_time is not None:
-                            latest_rtt = (datetime.datetime.now() - transmission_time).microseconds
+    def update_rtt(self, latest_rtt: int, ack_delay: int = 0):
+        self.latest_rtt = latest_rtt
 
-                            if self.smoothed_rtt == self.k_initial_rtt:
-                                self.smoothed_rtt = latest_rtt
-                                self.rttvar = latest_rtt / 2
-                            else:
-                                self.min_rtt = min(self.min_rtt, latest_rtt)
-                                ack_delay = 0
-                                adjusted_rtt = latest_rtt
-                                if latest_rtt >= self.min_rtt + ack_delay:
-                                    adjusted_rtt = latest_rtt - ack_delay
-                                self.smoothed_rtt = (7 / 8) * self.smoothed_rtt + (1 / 8) * adjusted_rtt
-                                rttvar_sample = abs(self.smoothed_rtt - adjusted_rtt)
-                                self.rttvar = (3 / 4) * self.rttvar + (1 / 4) * rttvar_sample
+        if not self._has_rtt_sample:
+            self.min_rtt = latest_rtt
+            self.smoothed_rtt = latest_rtt
+            self.rttvar = latest_rtt // 2
+            self._has_rtt_sample = True
+            return
 
-                            self.latest_rtt = latest_rtt
+        self.min_rtt = min(self.min_rtt, latest_rtt)
 
-            resent_lost_packets = self.resend_lost_packets()
+        adjusted_rtt = latest_rtt
+        if latest_rtt >= self.min_rtt + ack_delay:
+            adjusted_rtt = latest_rtt - ack_delay
 
-        return packet, addr, resent_lost_packets
+        self.rttvar = (3 * self.rttvar + abs(self.smoothed_rtt - adjusted_rtt)) // 4
+        self.smoothed_rtt = (7 * self.smoothed_rtt + adjusted_rtt) // 8
 
     def get_packet_number(self):
         self._largest_packet_number += 1
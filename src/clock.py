@@ -0,0 +1,44 @@
+import time
+from abc import ABC, abstractmethod
+
+# All times and durations are integer nanoseconds
+MICROSECOND = 1_000
+MILLISECOND = 1_000_000
+SECOND = 1_000_000_000
+
+
+class Clock(ABC):
+    @abstractmethod
+    def now(self) -> int:
+        raise NotImplementedError()
+
+    @abstractmethod
+    def sleep(self, duration: int):
+        raise NotImplementedError()
+
+
+class MonotonicClock(Clock):
+    def now(self) -> int:
+        return time.monotonic_ns()
+
+    def sleep(self, duration: int):
+        if duration > 0:
+            time.sleep(duration / SECOND)
+
+
+class VirtualClock(Clock):
+    def __init__(self, start: int = 0):
+        self.time = start
+
+    def now(self) -> int:
+        return self.time
+
+    def advance(self, duration: int):
+        self.time += duration
+
+    def advance_to(self, time_: int):
+        self.time = max(self.time, time_)
+
+    def sleep(self, duration: int):
+        if duration > 0:
+            self.advance(duration)
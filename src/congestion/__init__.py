@@ -0,0 +1,87 @@
+from abc import ABC, abstractmethod
+
+from quic.sent_packets import SentPacket
+
+
+class CongestionController(ABC):
+    # Controller class for every algorithm name, filled in by CongestionController.register
+    _registry = {}
+
+    def __init__(self, max_datagram_size=1500):
+        self.max_datagram_size = max_datagram_size
+
+        # Bytes of ack-eliciting packets that were sent and not yet acknowledged or declared lost
+        self.bytes_in_flight = 0
+        self.congestion_window = 0
+
+        # Bytes per second for controllers that pace by rate, otherwise None and the pacer derives one from the window
+        self.pacing_rate: int | None = None
+
+    @classmethod
+    def register(cls, name: str):
+        def decorator(controller_class):
+            cls._registry[name] = controller_class
+
+            return controller_class
+
+        return decorator
+
+    @classmethod
+    def create(cls, name: str, **kwargs) -> "CongestionController":
+        controller_class = cls._registry.get(name)
+
+        if controller_class is None:
+            raise ValueError(f"Unknown congestion controller {name!r}")
+
+        return controller_class(**kwargs)
+
+    @staticmethod
+    def initial_window_size(max_datagram_size: int) -> int:
+        # See RFC 9002 section 7.2
+        return min(10 * max_datagram_size, max(14720, 2 * max_datagram_size))
+
+    def can_send(self) -> bool:
+        return self.bytes_in_flight < self.congestion_window
+
+    def on_packet_sent(self, sent_packet: SentPacket):
+        if sent_packet.ack_eliciting:
+            self.bytes_in_flight += sent_packet.size
+
+    def on_packets_acked(self, acked: list[SentPacket], now: int):
+        for sent_packet in acked:
+            if sent_packet.ack_eliciting:
+                self.bytes_in_flight -= sent_packet.size
+
+                self.on_packet_acked(sent_packet, now)
+
+    def on_packets_discarded(self, discarded: list[SentPacket]):
+        # Packets that left the network without saying anything about congestion, such as lost path MTU probes
+        for sent_packet in discarded:
+            if sent_packet.ack_eliciting:
+                self.bytes_in_flight -= sent_packet.size
+
+    def set_max_datagram_size(self, max_datagram_size: int):
+        self.max_datagram_size = max_datagram_size
+
+    def on_packets_lost(self, lost: list[SentPacket], now: int, persistent_congestion=False):
+        largest_lost = None
+
+        for sent_packet in lost:
+            if sent_packet.ack_eliciting:
+                self.bytes_in_flight -= sent_packet.size
+                largest_lost = sent_packet
+
+        if largest_lost is not None:
+            self.on_congestion_event(largest_lost.time_sent, now, persistent_congestion)
+
+    @abstractmethod
+    def on_packet_acked(self, sent_packet: SentPacket, now: int):
+        raise NotImplementedError()
+
+    @abstractmethod
+    def on_congestion_event(self, time_sent: int, now: int, persistent_congestion: bool):
+        raise NotImplementedError()
+
+
+# Importing the controller modules registers their names with CongestionController
+from quic.congestion import bbr, new_reno  # noqa: E402,F401
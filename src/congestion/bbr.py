@@ -0,0 +1,277 @@
+import random
+from collections import deque
+
+from quic.clock import MILLISECOND, SECOND
+from quic.congestion import CongestionController
+from quic.congestion.delivery_rate import DeliveryRateEstimator, RateSample
+from quic.sent_packets import SentPacket
+
+STARTUP = "startup"
+DRAIN = "drain"
+PROBE_BW = "probe_bw"
+PROBE_RTT = "probe_rtt"
+
+
+@CongestionController.register("bbr")
+class BBR(CongestionController):
+    """
+    Model-based congestion control after BBR v1 (draft-cardwell-iccrg-bbr-congestion-control-00).
+    The window and pacing rate follow the estimated bottleneck bandwidth and round-trip propagation time,
+    so random loss that does not come from a full queue does not shrink them.
+    """
+
+    # 2 / ln(2), the smallest gain that doubles the sending rate every round trip
+    high_gain = 2.885
+    pacing_gain_cycle = (1.25, 0.75, 1, 1, 1, 1, 1, 1)
+    probe_bw_cwnd_gain = 2
+
+    # Round trips over which the bottleneck bandwidth is the maximum delivery rate
+    btl_bw_filter_length = 10
+    rt_prop_filter_length = 10 * SECOND
+    probe_rtt_duration = 200 * MILLISECOND
+
+    # Startup ends after this many round trips without the bandwidth growing by full_bw_growth
+    full_bw_growth = 1.25
+    full_bw_rounds = 3
+
+    def __init__(self, max_datagram_size=1500, seed=None):
+        super().__init__(max_datagram_size)
+
+        self.random = random.Random(seed)
+        self.rate_estimator = DeliveryRateEstimator()
+
+        self.initial_window = self.initial_window_size(max_datagram_size)
+        self.minimum_window = 4 * max_datagram_size
+        self.congestion_window = self.initial_window
+
+        self.state = STARTUP
+        self.pacing_gain = self.high_gain
+        self.cwnd_gain = self.high_gain
+
+        self.btl_bw = 0
+        # (round, delivery rate) pairs with decreasing rates, so the first one is the windowed maximum
+        self._btl_bw_samples = deque()
+
+        self.rt_prop: int | None = None
+        self.rt_prop_stamp = 0
+        self.rt_prop_expired = False
+
+        self.round_count = 0
+        self._next_round_delivered = 0
+
+        self.filled_pipe = False
+        self._full_bw = 0
+        self._full_bw_count = 0
+
+        self._cycle_index = 0
+        self._cycle_stamp = 0
+        self._losses = 0
+
+        self._prior_cwnd = 0
+        self._probe_rtt_done_stamp: int | None = None
+        self._probe_rtt_round_done = False
+
+    def set_max_datagram_size(self, max_datagram_size: int):
+        super().set_max_datagram_size(max_datagram_size)
+
+        self.initial_window = self.initial_window_size(max_datagram_size)
+        self.minimum_window = 4 * max_datagram_size
+        self.congestion_window = max(self.congestion_window, self.minimum_window)
+
+    def bdp(self, gain: float = 1) -> int:
+        if self.rt_prop is None or self.btl_bw == 0:
+            return self.initial_window
+
+        return int(gain * self.btl_bw * self.rt_prop) // SECOND
+
+    def can_send(self) -> bool:
+        # Drain must empty the queue built during startup even when sends are not paced
+        if self.state == DRAIN:
+            return self.bytes_in_flight < self.bdp()
+
+        return super().can_send()
+
+    def on_packet_sent(self, sent_packet: SentPacket):
+        self.rate_estimator.on_packet_sent(sent_packet, self.bytes_in_flight)
+
+        super().on_packet_sent(sent_packet)
+
+    def on_packets_acked(self, acked: list[SentPacket], now: int):
+        prior_in_flight = self.bytes_in_flight
+
+        super().on_packets_acked(acked, now)
+
+        sample = self.rate_estimator.generate_sample(now)
+        if sample is None:
+            return
+
+        round_start = self._update_round(sample)
+        self._update_rt_prop(sample, now)
+        self._update_btl_bw(sample)
+
+        self._check_full_pipe(round_start)
+        self._check_drain(now)
+        self._update_gain_cycle(prior_in_flight, now)
+        self._check_probe_rtt(round_start, now)
+
+        self._set_pacing_rate()
+        self._set_congestion_window(prior_in_flight - self.bytes_in_flight)
+
+    def on_packet_acked(self, sent_packet: SentPacket, now: int):
+        self.rate_estimator.on_packet_acked(sent_packet, now)
+
+    def on_congestion_event(self, time_sent: int, now: int, persistent_congestion: bool):
+        self._losses += 1
+
+        if persistent_congestion:
+            self._save_congestion_window()
+            self.congestion_window = self.minimum_window
+
+    def _update_round(self, sample: RateSample) -> bool:
+        if sample.prior_delivered < self._next_round_delivered:
+            return False
+
+        self._next_round_delivered = self.rate_estimator.delivered
+        self.round_count += 1
+
+        return True
+
+    def _update_rt_prop(self, sample: RateSample, now: int):
+        self.rt_prop_expired = self.rt_prop is not None and now > self.rt_prop_stamp + self.rt_prop_filter_length
+
+        if self.rt_prop is None or sample.rtt <= self.rt_prop or self.rt_prop_expired:
+            self.rt_prop = sample.rtt
+            self.rt_prop_stamp = now
+
+    def _update_btl_bw(self, sample: RateSample):
+        # Samples over less than a round trip are inflated by ACK compression
+        if sample.interval < self.rt_prop:
+            return
+
+        samples = self._btl_bw_samples
+
+        while samples and samples[-1][1] <= sample.delivery_rate:
+            samples.pop()
+
+        samples.append((self.round_count, sample.delivery_rate))
+
+        while samples[0][0] <= self.round_count - self.btl_bw_filter_length:
+            samples.popleft()
+
+        self.btl_bw = samples[0][1]
+
+    def _check_full_pipe(self, round_start: bool):
+        if self.filled_pipe or not round_start:
+            return
+
+        if self.btl_bw >= self._full_bw * self.full_bw_growth:
+            self._full_bw = self.btl_bw
+            self._full_bw_count = 0
+            return
+
+        self._full_bw_count += 1
+        if self._full_bw_count >= self.full_bw_rounds:
+            self.filled_pipe = True
+
+    def _check_drain(self, now: int):
+        if self.state == STARTUP and self.filled_pipe:
+            self.state = DRAIN
+            self.pacing_gain = 1 / self.high_gain
+            self.cwnd_gain = self.high_gain
+
+        if self.state == DRAIN and self.bytes_in_flight <= self.bdp():
+            self._enter_probe_bw(now)
+
+    def _enter_startup(self):
+        self.state = STARTUP
+        self.pacing_gain = self.high_gain
+        self.cwnd_gain = self.high_gain
+
+    def _enter_probe_bw(self, now: int):
+        self.state = PROBE_BW
+        self.pacing_gain = 1
+        self.cwnd_gain = self.probe_bw_cwnd_gain
+
+        # Start anywhere but the draining 3/4 phase
+        self._cycle_index = len(self.pacing_gain_cycle) - 1 - self.random.randrange(len(self.pacing_gain_cycle) - 1)
+        self._advance_cycle_phase(now)
+
+    def _advance_cycle_phase(self, now: int):
+        self._cycle_stamp = now
+        self._cycle_index = (self._cycle_index + 1) % len(self.pacing_gain_cycle)
+        self.pacing_gain = self.pacing_gain_cycle[self._cycle_index]
+        self._losses = 0
+
+    def _update_gain_cycle(self, prior_in_flight: int, now: int):
+        if self.state != PROBE_BW:
+            return
+
+        is_full_length = now - self._cycle_stamp > self.rt_prop
+
+        if self.pacing_gain == 1:
+            next_phase = is_full_length
+        elif self.pacing_gain > 1:
+            next_phase = is_full_length and (self._losses > 0 or prior_in_flight >= self.bdp(self.pacing_gain))
+        else:
+            next_phase = is_full_length or prior_in_flight <= self.bdp()
+
+        if next_phase:
+            self._advance_cycle_phase(now)
+
+    def _save_congestion_window(self):
+        if self.state == PROBE_RTT:
+            self._prior_cwnd = max(self._prior_cwnd, self.congestion_window)
+        else:
+            self._prior_cwnd = self.congestion_window
+
+    def _check_probe_rtt(self, round_start: bool, now: int):
+        if self.state != PROBE_RTT and self.rt_prop_expired:
+            self._save_congestion_window()
+
+            self.state = PROBE_RTT
+            self.pacing_gain = 1
+            self.cwnd_gain = 1
+            self._probe_rtt_done_stamp = None
+
+        if self.state != PROBE_RTT:
+            return
+
+        # Hold the window at its minimum for probe_rtt_duration and at least one round trip
+        if self._probe_rtt_done_stamp is None:
+            if self.bytes_in_flight <= self.minimum_window:
+                self._probe_rtt_done_stamp = now + self.probe_rtt_duration
+                self._probe_rtt_round_done = False
+                self._next_round_delivered = self.rate_estimator.delivered
+            return
+
+        if round_start:
+            self._probe_rtt_round_done = True
+
+        if self._probe_rtt_round_done and now > self._probe_rtt_done_stamp:
+            self.rt_prop_stamp = now
+            self.congestion_window = max(self.congestion_window, self._prior_cwnd)
+
+            if self.filled_pipe:
+                self._enter_probe_bw(now)
+            else:
+                self._enter_startup()
+
+    def _set_pacing_rate(self):
+        rate = int(self.pacing_gain * self.btl_bw)
+
+        if rate > 0 and (self.filled_pipe or self.pacing_rate is None or rate > self.pacing_rate):
+            self.pacing_rate = rate
+
+    def _set_congestion_window(self, acked_bytes: int):
+        # Three datagrams on top of the BDP absorb delayed and aggregated ACKs
+        target = self.bdp(self.cwnd_gain) + 3 * self.max_datagram_size
+
+        if self.filled_pipe:
+            self.congestion_window = min(self.congestion_window + acked_bytes, target)
+        elif self.congestion_window < target or self.rate_estimator.delivered < self.initial_window:
+            self.congestion_window += acked_bytes
+
+        self.congestion_window = max(self.congestion_window, self.minimum_window)
+
+        if self.state == PROBE_RTT:
+            self.congestion_window = min(self.congestion_window, self.minimum_window)
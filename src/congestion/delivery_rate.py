@@ -0,0 +1,79 @@
+from quic.clock import SECOND
+from quic.sent_packets import SentPacket
+
+
+class RateSample:
+    __slots__ = ("delivery_rate", "delivered", "prior_delivered", "interval", "rtt")
+
+    def __init__(self, delivery_rate: int, delivered: int, prior_delivered: int, interval: int, rtt: int):
+        # Bytes per second
+        self.delivery_rate = delivery_rate
+        self.delivered = delivered
+        self.prior_delivered = prior_delivered
+        self.interval = interval
+        self.rtt = rtt
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.delivery_rate} B/s, delivered={self.delivered}, rtt={self.rtt})"
+
+
+class DeliveryRateEstimator:
+    """
+    Delivery rate sampling from per-packet delivery state, as in draft-cheng-iccrg-delivery-rate-estimation.
+    """
+
+    def __init__(self):
+        # Bytes of ack-eliciting packets acknowledged so far, and when the latest of them was
+        self.delivered = 0
+        self.delivered_time = 0
+
+        # Send time of the newest packet acknowledged so far, which starts the next send interval
+        self.first_sent_time = 0
+
+        # Acknowledged packet that was sent with the most delivered bytes, since the last sample
+        self._sample_packet: SentPacket | None = None
+
+    def on_packet_sent(self, sent_packet: SentPacket, bytes_in_flight: int):
+        # Intervals restart when the sender starts from an empty network
+        if bytes_in_flight == 0:
+            self.first_sent_time = sent_packet.time_sent
+            self.delivered_time = sent_packet.time_sent
+
+        sent_packet.delivered = self.delivered
+        sent_packet.delivered_time = self.delivered_time
+        sent_packet.first_sent_time = self.first_sent_time
+
+    def on_packet_acked(self, sent_packet: SentPacket, now: int):
+        self.delivered += sent_packet.size
+        self.delivered_time = now
+
+        sample_packet = self._sample_packet
+        if sample_packet is None or sent_packet.delivered > sample_packet.delivered or \
+                (sent_packet.delivered == sample_packet.delivered and sent_packet.time_sent > sample_packet.time_sent):
+            self._sample_packet = sent_packet
+            self.first_sent_time = sent_packet.time_sent
+
+    def generate_sample(self, now: int) -> RateSample | None:
+        sent_packet = self._sample_packet
+        if sent_packet is None:
+            return None
+
+        self._sample_packet = None
+
+        # The slower of the send and ACK rates over the packet's flight bounds the delivery rate
+        send_elapsed = sent_packet.time_sent - sent_packet.first_sent_time
+        ack_elapsed = self.delivered_time - sent_packet.delivered_time
+        interval = max(send_elapsed, ack_elapsed)
+
+        if interval <= 0:
+            return None
+
+        delivered = self.delivered - sent_packet.delivered
+
+        return RateSample(
+            delivered * SECOND // interval,
+            delivered,
+            sent_packet.delivered,
+            interval,
+            now - sent_packet.time_sent,
+        )
@@ -0,0 +1,62 @@
+import math
+
+from quic.congestion import CongestionController
+from quic.sent_packets import SentPacket
+
+
+@CongestionController.register("new_reno")
+class NewReno(CongestionController):
+    """
+    NewReno congestion control as described in RFC 9002 section 7 and appendix B.
+    """
+
+    # k_loss_reduction_factor = 1 / 2
+    loss_reduction_divisor = 2
+
+    def __init__(self, max_datagram_size=1500):
+        super().__init__(max_datagram_size)
+
+        self.initial_window = self.initial_window_size(max_datagram_size)
+        self.minimum_window = 2 * max_datagram_size
+
+        self.congestion_window = self.initial_window
+        self.ssthresh = math.inf
+
+        # Time the current recovery period started
+        self.congestion_recovery_start_time: int | None = None
+
+    def set_max_datagram_size(self, max_datagram_size: int):
+        super().set_max_datagram_size(max_datagram_size)
+
+        # The windows are recalculated for the new size, see RFC 9002 section 7.2
+        self.initial_window = self.initial_window_size(max_datagram_size)
+        self.minimum_window = 2 * max_datagram_size
+        self.congestion_window = max(self.congestion_window, self.minimum_window)
+
+    def in_congestion_recovery(self, time_sent: int) -> bool:
+        return self.congestion_recovery_start_time is not None and time_sent <= self.congestion_recovery_start_time
+
+    @property
+    def in_slow_start(self):
+        return self.congestion_window < self.ssthresh
+
+    def on_packet_acked(self, sent_packet: SentPacket, now: int):
+        # The window does not grow for packets sent before the recovery period started
+        if self.in_congestion_recovery(sent_packet.time_sent):
+            return
+
+        if self.in_slow_start:
+            self.congestion_window += sent_packet.size
+        else:
+            self.congestion_window += self.max_datagram_size * sent_packet.size // self.congestion_window
+
+    def on_congestion_event(self, time_sent: int, now: int, persistent_congestion: bool):
+        if not self.in_congestion_recovery(time_sent):
+            self.congestion_recovery_start_time = now
+
+            self.ssthresh = self.congestion_window // self.loss_reduction_divisor
+            self.congestion_window = max(self.ssthresh, self.minimum_window)
+
+        if persistent_congestion:
+            self.congestion_window = self.minimum_window
+            self.congestion_recovery_start_time = None
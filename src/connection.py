@@ -0,0 +1,124 @@
+from collections import OrderedDict
+
+from quic.clock import SECOND
+from quic.range_set import RangeSet
+
+
+class Connection:
+    """
+    Server-side state of one client connection: its ACK state, the receive side of its streams and counters.
+    """
+
+    __slots__ = (
+        "conn_id",
+        "peer_conn_id",
+        "addr",
+        "initial_key",
+        "received",
+        "unacked_count",
+        "largest_received_time",
+        "ack_deadline",
+        "streams",
+        "created",
+        "last_activity",
+        "packets_received",
+        "acks_sent",
+        "_largest_packet_number",
+    )
+
+    def __init__(self, conn_id: int, peer_conn_id: int, addr, now: int, initial_key=None):
+        # The ID the server issued, which the client puts in its packets once it learned it
+        self.conn_id = conn_id
+        self.peer_conn_id = peer_conn_id
+        self.addr = addr
+
+        # (address, connection ID) of the client's first Initial packets, before it switched to conn_id
+        self.initial_key = initial_key
+
+        self.received = RangeSet()
+        self.unacked_count = 0
+
+        # When the largest packet number was received, for the ACK delay, and when the delayed ACK is due
+        self.largest_received_time = now
+        self.ack_deadline: int | None = None
+
+        # Receive side of each stream by stream ID
+        self.streams = {}
+
+        self.created = now
+        self.last_activity = now
+        self.packets_received = 0
+        self.acks_sent = 0
+
+        self._largest_packet_number = -1
+
+    def get_packet_number(self):
+        self._largest_packet_number += 1
+        return self._largest_packet_number
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.conn_id:#x}, {self.addr}, packets_received={self.packets_received})"
+
+
+class ConnectionTable:
+    """
+    Connections by the connection ID the server issued, and by client address and destination connection ID
+    for Initial packets sent before the client learned that ID. Connections are kept in order of last activity,
+    so idle ones are evicted from the front and every operation takes constant time.
+    """
+
+    def __init__(self, idle_timeout=30 * SECOND):
+        self.idle_timeout = idle_timeout
+
+        self._by_conn_id: OrderedDict[int, Connection] = OrderedDict()
+        self._by_initial_key: dict[tuple, Connection] = {}
+
+    def lookup(self, dst_conn_id: int, addr) -> Connection | None:
+        connection = self._by_conn_id.get(dst_conn_id)
+
+        if connection is None:
+            connection = self._by_initial_key.get((addr, dst_conn_id))
+
+        return connection
+
+    def add(self, connection: Connection):
+        if connection.conn_id in self._by_conn_id:
+            raise ValueError(f"Connection ID {connection.conn_id:#x} is already in use")
+
+        self._by_conn_id[connection.conn_id] = connection
+
+        if connection.initial_key is not None:
+            self._by_initial_key[connection.initial_key] = connection
+
+    def touch(self, connection: Connection, now: int):
+        connection.last_activity = now
+        self._by_conn_id.move_to_end(connection.conn_id)
+
+    def remove(self, connection: Connection):
+        del self._by_conn_id[connection.conn_id]
+
+        if connection.initial_key is not None:
+            self._by_initial_key.pop(connection.initial_key, None)
+
+    def evict_idle(self, now: int) -> list[Connection]:
+        evicted = []
+
+        for connection in self._by_conn_id.values():
+            if now - connection.last_activity < self.idle_timeout:
+                break
+
+            evicted.append(connection)
+
+        for connection in evicted:
+            self.remove(connection)
+
+        return evicted
+
+    def __contains__(self, conn_id: int):
+        return conn_id in self._by_conn_id
+
+    def __iter__(self):
+        return iter(self._by_conn_id.values())
+
+    def __len__(self):
+        return len(self._by_conn_id)
@@ -0,0 +1,166 @@
+import errno
+import socket
+import struct
+from collections import deque
+
+# Linux UDP socket options, see udp(7). The socket module does not export them
+SOL_UDP = getattr(socket, "SOL_UDP", 17)
+UDP_SEGMENT = 103
+UDP_GRO = 104
+
+# Largest UDP payload over IPv4 and the kernel's limit on segments per send (UDP_MAX_SEGMENTS)
+MAX_UDP_PAYLOAD = 65507
+MAX_SEGMENTS = 64
+
+
+class DatagramIO:
+    """
+    Sends and receives one datagram per syscall. Base for batching backends, which may hold sends
+    back until flush().
+    """
+
+    def __init__(self, sock):
+        self.sock = sock
+
+        # Syscalls made, to compare backends
+        self.send_calls = 0
+        self.receive_calls = 0
+
+    @classmethod
+    def create(cls, sock, batched=False) -> "DatagramIO":
+        # Falls back to a syscall per datagram where GSO/GRO is not available, e.g. on simulated sockets
+        if batched and BatchedDatagramIO.supported(sock):
+            return BatchedDatagramIO(sock)
+
+        return DatagramIO(sock)
+
+    def send(self, data, addr=None):
+        if addr is None:
+            self.sock.send(data)
+        else:
+            self.sock.sendto(data, addr)
+
+        self.send_calls += 1
+
+    def flush(self):
+        pass
+
+    def recvfrom(self, bufsize: int):
+        self.receive_calls += 1
+        return self.sock.recvfrom(bufsize)
+
+
+class BatchedDatagramIO(DatagramIO):
+    """
+    UDP generic segmentation and receive offload on Linux. Datagrams of equal size to the same address are
+    queued and handed to the kernel by a single sendmsg with UDP_SEGMENT, and a single recvmsg returns
+    a run of datagrams coalesced by UDP_GRO, which are then returned one at a time.
+    """
+
+    def __init__(self, sock, max_segments=MAX_SEGMENTS):
+        super().__init__(sock)
+
+        self.max_segments = max_segments
+
+        self._batch = bytearray()
+        self._segment_size = 0
+        self._segments = 0
+        self._addr = None
+
+        self._received = deque()
+        self._ancillary_size = socket.CMSG_SPACE(struct.calcsize("=i"))
+
+        sock.setsockopt(SOL_UDP, UDP_GRO, 1)
+
+    @staticmethod
+    def supported(sock) -> bool:
+        if not isinstance(sock, socket.socket) or sock.type != socket.SOCK_DGRAM:
+            return False
+
+        try:
+            sock.getsockopt(SOL_UDP, UDP_SEGMENT)
+            sock.getsockopt(SOL_UDP, UDP_GRO)
+        except OSError:
+            return False
+
+        return True
+
+    def send(self, data, addr=None):
+        size = len(data)
+
+        if self._segments > 0 and (
+                addr != self._addr
+                or size > self._segment_size
+                or len(self._batch) + size > MAX_UDP_PAYLOAD
+        ):
+            self.flush()
+
+        if self._segments == 0:
+            self._segment_size = size
+            self._addr = addr
+
+        self._batch += data
+        self._segments += 1
+
+        # Only the last segment of a send may be shorter than the others
+        if size < self._segment_size or self._segments >= self.max_segments:
+            self.flush()
+
+    def flush(self):
+        if self._segments == 0:
+            return
+
+        try:
+            if self._segments == 1:
+                super().send(self._batch, self._addr)
+            else:
+                self._send_segments()
+        finally:
+            self._batch.clear()
+            self._segments = 0
+
+    def _send_segments(self):
+        ancillary = [(SOL_UDP, UDP_SEGMENT, struct.pack("=H", self._segment_size))]
+
+        try:
+            if self._addr is None:
+                self.sock.sendmsg([self._batch], ancillary)
+            else:
+                self.sock.sendmsg([self._batch], ancillary, 0, self._addr)
+        except OSError as e:
+            # Devices without checksum offload reject segmentation offload at send time
+            if e.errno != errno.EIO:
+                raise
+
+            self.max_segments = 1
+
+            with memoryview(self._batch) as view:
+                for start in range(0, len(view), self._segment_size):
+                    super().send(view[start:start + self._segment_size], self._addr)
+
+            return
+
+        self.send_calls += 1
+
+    def recvfrom(self, bufsize: int):
+        if not self._received:
+            # Queued datagrams are sent before waiting for a response to them, but not on a non-blocking poll
+            if self.sock.gettimeout() != 0:
+                self.flush()
+
+            self.receive_calls += 1
+            data, ancillary, _, addr = self.sock.recvmsg(1 << 16, self._ancillary_size)
+
+            segment_size = len(data)
+            for level, type_, value in ancillary:
+                if level == SOL_UDP and type_ == UDP_GRO:
+                    segment_size, = struct.unpack("=i", value[:struct.calcsize("=i")])
+
+            if not data:
+                self._received.append((data, addr))
+            else:
+                view = memoryview(data)
+                for start in range(0, len(view), segment_size):
+                    self._received.append((view[start:start + segment_size], addr))
+
+        return self._received.popleft()
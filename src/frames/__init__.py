@@ -1,26 +1,55 @@
-from io import BytesIO, SEEK_CUR
+from io import BytesIO
 
 
 class QuicFrame:
+    __slots__ = ("type",)
+
+    # Frame class for every possible type byte, filled in by QuicFrame.register
+    _dispatch = [None] * 256
+
     def __init__(self, type_: int):
         self.type = type_
 
-    def to_bytes(self):
-        buffer = bytearray()
+    @classmethod
+    def register(cls, *types: int):
+        def decorator(frame_class):
+            for type_ in types:
+                cls._dispatch[type_] = frame_class
+
+            return frame_class
+
+        return decorator
+
+    def encoded_size(self):
+        return 1
+
+    def serialize_into(self, buffer, offset: int) -> int:
+        buffer[offset] = self.type
 
-        buffer.append(self.type)
+        return offset + 1
+
+    def to_bytes(self):
+        buffer = bytearray(self.encoded_size())
+        self.serialize_into(buffer, 0)
 
         return buffer
 
     @classmethod
     def from_bytes(cls, buffer: BytesIO):
-        type_ = int.from_bytes(buffer.read(1))
+        frame, offset = cls.from_buffer(memoryview(buffer.getvalue()), buffer.tell())
+        buffer.seek(offset)
+
+        return frame
+
+    @classmethod
+    def from_buffer(cls, buffer: memoryview, offset: int):
+        frame_class = QuicFrame._dispatch[buffer[offset]]
+
+        if frame_class is None:
+            raise ValueError(f"Unrecognized frame type {buffer[offset]:#04x}")
+
+        return frame_class.from_buffer(buffer, offset)
 
-        if type_ == 2:
-            from quic.frames.ack import AckFrame
-            return AckFrame.from_bytes(buffer)
 
-        if type_ >> 3 == 1:
-            from quic.frames.stream import StreamFrame
-            buffer.seek(-1, SEEK_CUR)
-            return StreamFrame.from_bytes(buffer)
+# Importing the frame modules registers their types with QuicFrame
+from quic.frames import ack, immediate_ack, padding, ping, stream  # noqa: E402,F401
@@ -1,43 +1,80 @@
-from io import BytesIO
-
 from quic.frames import QuicFrame
-from quic.var_int import VarInt
+from quic.var_int import decode_many, encode_many, varint_length
 
 
+@QuicFrame.register(0x02)
 class AckFrame(QuicFrame):
-    def __init__(self, largest_acknowledged=None, ack_delay=0, ack_range_count=0, first_ack_range=0):
+    __slots__ = ("largest_acknowledged", "ack_delay", "first_ack_range", "ack_ranges")
+
+    def __init__(self, largest_acknowledged=None, ack_delay=0, first_ack_range=0, ack_ranges=None):
         super().__init__(2)
         self.largest_acknowledged = largest_acknowledged
         self.ack_delay = ack_delay
-        self.ack_range_count = ack_range_count
         self.first_ack_range = first_ack_range
 
-    def to_bytes(self):
-        buffer = bytearray()
+        # (gap, ack range length) pairs following the first range, as encoded on the wire
+        self.ack_ranges = [] if ack_ranges is None else ack_ranges
+
+    # Build an ACK frame from inclusive (smallest, largest) packet number ranges in descending order
+    @classmethod
+    def from_ranges(cls, ranges, ack_delay=0):
+        ranges = iter(ranges)
+        smallest, largest = next(ranges)
+
+        frame = cls(largest_acknowledged=largest, ack_delay=ack_delay, first_ack_range=largest - smallest)
+
+        for next_smallest, next_largest in ranges:
+            frame.ack_ranges.append((smallest - next_largest - 2, next_largest - next_smallest))
+            smallest = next_smallest
+
+        return frame
+
+    # Acknowledged inclusive (smallest, largest) packet number ranges in descending order
+    def ranges(self):
+        largest = self.largest_acknowledged
+        smallest = largest - self.first_ack_range
+        yield smallest, largest
 
-        buffer.append(self.type)
+        for gap, ack_range_length in self.ack_ranges:
+            largest = smallest - gap - 2
+            smallest = largest - ack_range_length
+            yield smallest, largest
 
-        buffer += VarInt(self.largest_acknowledged).to_bytes()
-        buffer += VarInt(self.ack_delay).to_bytes()
-        buffer += VarInt(self.ack_range_count).to_bytes()
-        buffer += VarInt(self.first_ack_range).to_bytes()
+    @property
+    def ack_range_count(self):
+        return len(self.ack_ranges)
+
+    @property
+    def fields(self):
+        fields = [self.largest_acknowledged, self.ack_delay, len(self.ack_ranges), self.first_ack_range]
+
+        for ack_range in self.ack_ranges:
+            fields.extend(ack_range)
 
-        return buffer
+        return fields
+
+    def encoded_size(self):
+        return 1 + sum(map(varint_length, self.fields))
+
+    def serialize_into(self, buffer, offset: int) -> int:
+        buffer[offset] = self.type
+
+        return encode_many(self.fields, buffer, offset + 1)
 
     @property
     def smallest_acknowledged(self):
         return self.largest_acknowledged - self.first_ack_range
 
     @classmethod
-    def from_bytes(cls, buffer: BytesIO):
-        largest_acknowledged = VarInt.from_bytes(buffer)
-        ack_delay = VarInt.from_bytes(buffer)
-        ack_range_count = VarInt.from_bytes(buffer)
-        first_ack_range = VarInt.from_bytes(buffer)
+    def from_buffer(cls, buffer: memoryview, offset: int):
+        fields, offset = decode_many(buffer, offset + 1, 4)
+        largest_acknowledged, ack_delay, ack_range_count, first_ack_range = fields
+
+        fields, offset = decode_many(buffer, offset, ack_range_count * 2)
 
         return cls(
-            largest_acknowledged=largest_acknowledged.value,
-            ack_delay=ack_delay.value,
-            ack_range_count=ack_range_count.value,
-            first_ack_range=first_ack_range.value,
-        )
+            largest_acknowledged=largest_acknowledged,
+            ack_delay=ack_delay,
+            first_ack_range=first_ack_range,
+            ack_ranges=list(zip(fields[::2], fields[1::2])),
+        ), offset
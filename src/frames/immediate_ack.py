@@ -0,0 +1,25 @@
+from quic.frames import QuicFrame
+from quic.frames.stream import StreamFrame
+
+
+# IMMEDIATE_ACK of the QUIC ACK frequency extension, which asks the receiver to send an ACK without delay
+@QuicFrame.register(0x1f)
+class ImmediateAckFrame(QuicFrame):
+    __slots__ = ()
+
+    def __init__(self):
+        super().__init__(0x1f)
+
+    @classmethod
+    def from_buffer(cls, buffer: memoryview, offset: int):
+        return cls(), offset + 1
+
+
+def elicits_immediate_ack(frames) -> bool:
+    # Whether the server ACKs a packet of these frames without delay: when it asks for it, or when it ends
+    # a stream, since no more packets may follow to reach the ACK threshold
+    for frame in frames:
+        if isinstance(frame, ImmediateAckFrame) or (isinstance(frame, StreamFrame) and frame.finish):
+            return True
+
+    return False
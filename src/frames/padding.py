@@ -0,0 +1,32 @@
+import re
+
+from quic.frames import QuicFrame
+
+# A run of padding bytes
+_PADDING = re.compile(rb"\x00*")
+
+
+@QuicFrame.register(0x00)
+class PaddingFrame(QuicFrame):
+    __slots__ = ("length",)
+
+    def __init__(self, length: int = 1):
+        super().__init__(0)
+        self.length = length
+
+    def encoded_size(self):
+        return self.length
+
+    def serialize_into(self, buffer, offset: int) -> int:
+        end = offset + self.length
+        buffer[offset:end] = bytes(self.length)
+
+        return end
+
+    @classmethod
+    def from_buffer(cls, buffer: memoryview, offset: int):
+        # A run of padding bytes is decoded as a single frame. The buffer is searched in place, since padding
+        # may fill most of a large datagram
+        end = _PADDING.match(buffer, offset).end()
+
+        return cls(end - offset), end
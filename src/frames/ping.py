@@ -0,0 +1,13 @@
+from quic.frames import QuicFrame
+
+
+@QuicFrame.register(0x01)
+class PingFrame(QuicFrame):
+    __slots__ = ()
+
+    def __init__(self):
+        super().__init__(1)
+
+    @classmethod
+    def from_buffer(cls, buffer: memoryview, offset: int):
+        return cls(), offset + 1
@@ -1,10 +1,11 @@
-from io import BytesIO
-
 from quic.frames import QuicFrame
-from quic.var_int import VarInt
+from quic.var_int import decode_varint, encode_many, varint_length
 
 
+@QuicFrame.register(*range(0x08, 0x10))
 class StreamFrame(QuicFrame):
+    __slots__ = ("stream_id", "offset", "include_length", "finish", "data")
+
     def __init__(
             self,
             stream_id: int,
@@ -31,44 +32,58 @@ class StreamFrame(QuicFrame):
         self.finish = finish
         self.data = data
 
-    def to_bytes(self):
-        buffer = super().to_bytes()
-
-        buffer += VarInt(self.stream_id).to_bytes()
+    @property
+    def fields(self):
+        fields = [self.stream_id]
 
         if self.offset is not None:
-            buffer += VarInt(self.offset).to_bytes()
+            fields.append(self.offset)
 
         if self.include_length:
-            buffer += VarInt(len(self.data)).to_bytes()
+            fields.append(len(self.data))
+
+        return fields
 
-        buffer += self.data
+    def encoded_size(self):
+        return 1 + sum(map(varint_length, self.fields)) + len(self.data)
 
-        return buffer
+    def serialize_into(self, buffer, offset: int) -> int:
+        buffer[offset] = self.type
+        offset = encode_many(self.fields, buffer, offset + 1)
+
+        end = offset + len(self.data)
+        buffer[offset:end] = self.data
+
+        return end
 
     @classmethod
-    def from_bytes(cls, buffer: BytesIO):
-        type_ = int.from_bytes(buffer.read(1))
+    def from_buffer(cls, buffer: memoryview, offset: int):
+        type_ = buffer[offset]
+        offset += 1
 
         finish = bool(type_ & 1)
         length_present = bool((type_ >> 1) & 1)
         offset_present = bool((type_ >> 2) & 1)
 
-        stream_id = VarInt.from_bytes(buffer).value
+        stream_id, offset = decode_varint(buffer, offset)
 
-        offset = None
+        stream_offset = None
         if offset_present:
-            offset = VarInt.from_bytes(buffer).value
+            stream_offset, offset = decode_varint(buffer, offset)
 
-        data = None
         if length_present:
-            length = VarInt.from_bytes(buffer).value
-            data = buffer.read(length)
+            length, offset = decode_varint(buffer, offset)
+            end = offset + length
+        else:
+            # Without a length the frame runs to the end of the packet
+            end = len(buffer)
+
+        data = buffer[offset:end]
 
         return cls(
             stream_id,
             include_length=length_present,
-            offset=offset,
+            offset=stream_offset,
             finish=finish,
             data=data,
-        )
+        ), end
@@ -0,0 +1,49 @@
+import tracemalloc
+from argparse import ArgumentParser
+
+from quic.client import Client
+from quic.datagram_io import DatagramIO
+from quic.frames.stream import StreamFrame
+from quic.packets.initial import QuicInitialPacket
+
+
+class NullSocket:
+    def send(self, data):
+        pass
+
+
+def measure(packet_count, chunk_size):
+    client = Client("127.0.0.1", 0)
+    client._sock = NullSocket()
+    client._io = DatagramIO(client._sock)
+
+    # Every frame shares one payload object so only the per-packet bookkeeping is measured
+    payload = bytes(chunk_size)
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+
+    for i in range(packet_count):
+        packet = QuicInitialPacket(
+            packet_number=client.get_packet_number(),
+            version=1,
+            dst_conn_id=1,
+            src_conn_id=0,
+            frames=[StreamFrame(0, include_length=True, offset=i * chunk_size, data=payload)],
+        )
+        client.send_packet(packet)
+
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return (after - before) / packet_count
+
+
+if __name__ == "__main__":
+    parser = ArgumentParser(description="Measure client memory per in-flight packet (payload excluded)")
+    parser.add_argument("--packets", type=int, default=(d := 100000), help=f"Number of in-flight packets (Default: {d})")
+    parser.add_argument("--chunk-size", type=int, default=(d := 1000), help=f"Stream frame payload size (Default: {d})")
+
+    args = parser.parse_args()
+
+    print(f"{measure(args.packets, args.chunk_size):.1f} bytes per in-flight packet")
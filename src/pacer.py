@@ -0,0 +1,59 @@
+from quic.clock import SECOND
+
+
+class Pacer:
+    """
+    Token bucket that spreads sends over the round trip, see RFC 9002 section 7.7.
+    Without a rate every send is allowed immediately.
+    """
+
+    # rate = N * congestion_window / smoothed_rtt with N = 5 / 4, so that pacing does not hold back a full window
+    rate_numerator = 5
+    rate_denominator = 4
+
+    def __init__(self, max_datagram_size=1500, burst_datagrams=4):
+        self.max_datagram_size = max_datagram_size
+        self.burst_datagrams = burst_datagrams
+        self.capacity = burst_datagrams * max_datagram_size
+
+        # Bytes per second, None while unpaced
+        self.rate: int | None = None
+
+        # Tokens are kept in byte-nanoseconds so refills between close sends are never rounded away
+        self._credit = self.capacity * SECOND
+        self._last_update: int | None = None
+
+    def set_max_datagram_size(self, max_datagram_size: int):
+        self.max_datagram_size = max_datagram_size
+        self.capacity = self.burst_datagrams * max_datagram_size
+
+    @property
+    def tokens(self) -> int:
+        return self._credit // SECOND
+
+    def update_rate(self, congestion_window: int, smoothed_rtt: int, pacing_rate: int = None):
+        if pacing_rate is not None:
+            self.rate = pacing_rate
+        else:
+            self.rate = self.rate_numerator * congestion_window * SECOND // (self.rate_denominator * max(smoothed_rtt, 1))
+
+    def _refill(self, now: int):
+        if self._last_update is not None and self.rate:
+            self._credit = min(self._credit + (now - self._last_update) * self.rate, self.capacity * SECOND)
+
+        self._last_update = now
+
+    def next_send_time(self, now: int, size: int = None) -> int:
+        self._refill(now)
+
+        missing = (self.max_datagram_size if size is None else size) * SECOND - self._credit
+        if missing <= 0 or not self.rate:
+            return now
+
+        return now + -(-missing // self.rate)
+
+    def on_packet_sent(self, size: int, now: int):
+        self._refill(now)
+
+        # Sends the pacer did not allow, like probes, still use up tokens and delay the next ones
+        self._credit -= size * SECOND
@@ -0,0 +1,96 @@
+from quic.frames import QuicFrame
+from quic.frames.padding import PaddingFrame
+from quic.frames.stream import StreamFrame
+from quic.packets.numbered_packet import NumberedPacket
+from quic.send_stream import SendStream
+from quic.sent_packets import StreamRange
+from quic.var_int import varint_length
+
+
+class PacketBuilder:
+    """
+    Fills one packet with frames up to max_size bytes. Stream data is cut to the space that is left, so that
+    several streams, retransmitted ranges and new data share a datagram, and the frame that ends the packet
+    leaves out its length field since it runs to the end of the payload.
+    """
+
+    def __init__(self, packet: NumberedPacket, max_size: int):
+        self.packet = packet
+        self.max_size = max_size
+
+        # The payload length field takes one byte while the packet is empty, and grows with the payload
+        self.size = packet.encoded_size() - 1 + varint_length(max_size)
+
+    @property
+    def remaining(self) -> int:
+        return self.max_size - self.size
+
+    def add_frame(self, frame: QuicFrame) -> bool:
+        size = frame.encoded_size()
+
+        if size > self.remaining:
+            return False
+
+        self.packet.frames.append(frame)
+        self.size += size
+
+        return True
+
+    def stream_space(self, stream_id: int, offset: int) -> int:
+        # Stream data that fits in a frame at offset, counting the length field the frame may keep
+        remaining = self.remaining
+        return remaining - 1 - varint_length(stream_id) - varint_length(offset) - varint_length(remaining)
+
+    def add_stream_frames(self, stream: SendStream, retransmit_only=False):
+        while stream.retransmit or (not retransmit_only and stream.has_data()):
+            space = self.stream_space(stream.stream_id, stream.next_offset())
+
+            if space <= 0:
+                # A packet that cannot fit any stream data would never make progress
+                if not self.packet.frames:
+                    raise ValueError(f"A packet of {self.max_size} bytes has no room for stream data")
+                break
+
+            self.add_frame(stream.next_frame(space))
+
+    def add_stream_range(self, stream: SendStream, stream_range: StreamRange) -> bool:
+        # Sends a range again without it having been declared lost, e.g. in a probe
+        space = self.stream_space(stream.stream_id, stream_range.offset)
+
+        if space < 0 or (space == 0 and stream_range.length > 0):
+            return False
+
+        length = min(stream_range.length, space)
+        finish = stream_range.finish and length == stream_range.length
+        return self.add_frame(stream.frame(stream_range.offset, length, finish))
+
+    def pad(self):
+        # Fills the packet to max_size, e.g. for a path MTU probe
+        size = self.packet.encoded_size()
+        if size >= self.max_size:
+            return
+
+        padding = PaddingFrame(self.max_size - size)
+        self.packet.frames.append(padding)
+
+        # The payload length field may have grown with the padding. If taking that back out shrinks the field
+        # again, the packet ends up a byte or two short
+        padding.length -= self.packet.encoded_size() - self.max_size
+        self.size = self.max_size
+
+    def build(self) -> NumberedPacket:
+        frames = self.packet.frames
+
+        if frames and isinstance(last := frames[-1], StreamFrame) and last.include_length:
+            frames[-1] = StreamFrame(
+                last.stream_id,
+                include_length=False,
+                offset=last.offset,
+                finish=last.finish,
+                data=last.data,
+            )
+
+        return self.packet
+
+    def __bool__(self):
+        return bool(self.packet.frames)
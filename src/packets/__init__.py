@@ -2,25 +2,60 @@ from io import BytesIO
 
 
 class QuicPacket:
+    __slots__ = ("header_form", "fixed_bit")
+
+    # Packet class for each header form, filled in by QuicPacket.register
+    _dispatch = [None] * 2
+
     def __init__(self, header_form=None, fixed_bit=1):
         self.header_form = header_form
         self.fixed_bit = fixed_bit
 
     @classmethod
-    def from_bytes(cls, data: BytesIO):
-        first_byte = int.from_bytes(data.read(1))
+    def register(cls, *keys: int):
+        def decorator(packet_class):
+            for key in keys:
+                cls._dispatch[key] = packet_class
+
+            return packet_class
+
+        return decorator
+
+    @classmethod
+    def from_bytes(cls, data: BytesIO, **kwargs):
+        packet, offset = cls.from_buffer(memoryview(data.getvalue()), data.tell(), **kwargs)
+        data.seek(offset)
+
+        return packet
+
+    @classmethod
+    def from_buffer(cls, buffer: memoryview, offset: int = 0, **kwargs):
+        first_byte = buffer[offset]
 
         header_form = (first_byte & 0b10000000) >> 7
         fixed_bit = (first_byte & 0b01000000) >> 6
 
-        data.seek(0)
+        packet_class = QuicPacket._dispatch[header_form]
+
+        if packet_class is None:
+            raise ValueError(f"Unrecognized header form {header_form}")
+
+        return packet_class.from_buffer(buffer, offset, header_form=header_form, fixed_bit=fixed_bit)
+
+    def encoded_size(self):
+        return 1
 
-        if header_form == 0:
-            from quic.packets.short import QuicShortPacket
-            return QuicShortPacket.from_bytes(data, header_form=header_form, fixed_bit=fixed_bit)
-        else:
-            from quic.packets.long import QuicLongPacket
-            return QuicLongPacket.from_bytes(data, header_form=header_form, fixed_bit=fixed_bit)
+    def serialize_into(self, buffer, offset: int) -> int:
+        buffer[offset] = (self.header_form << 7) | (self.fixed_bit << 6)
+
+        return offset + 1
 
     def to_bytes(self):
-        return bytearray(((self.header_form << 7) | (self.fixed_bit << 6)).to_bytes())
+        buffer = bytearray(self.encoded_size())
+        self.serialize_into(buffer, 0)
+
+        return buffer
+
+
+# Importing the packet modules registers them with QuicPacket
+from quic.packets import long, short  # noqa: E402,F401
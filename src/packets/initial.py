@@ -1,69 +1,109 @@
-from io import BytesIO
-
 from quic.frames import QuicFrame
 from quic.packets.long import QuicLongPacket
 from quic.packets.numbered_packet import NumberedPacket
-from quic.var_int import VarInt
+from quic.var_int import decode_varint, encode_varint, varint_length
 
 
+@QuicLongPacket.register(0)
 class QuicInitialPacket(QuicLongPacket, NumberedPacket):
-    def __init__(self, packet_number: int = None, token: bytes = b"", frames=None, **kwargs):
-        kwargs.pop("header_form", None)
-        kwargs["long_packet_type"] = 0
-
-        NumberedPacket.__init__(self, packet_number, frames)
-        QuicLongPacket.__init__(self, **kwargs)
-
+    __slots__ = ("packet_number", "frames", "token", "largest_acked", "_packet_number_length")
+
+    def __init__(
+            self,
+            packet_number: int = None,
+            token: bytes = b"",
+            frames=None,
+            version=None,
+            dst_conn_id=None,
+            src_conn_id=None,
+            type_specific_bits=None,
+            fixed_bit=1,
+            largest_acked=-1,
+            packet_number_length=None,
+            **kwargs,
+    ):
+        # Fields are assigned directly rather than through both base constructors,
+        # since one of these is built for every packet sent or received
+        self.header_form = 1
+        self.fixed_bit = fixed_bit
+        self.long_packet_type = 0
+        self._type_specific_bits = type_specific_bits
+        self.version = version
+        self.dst_conn_id = dst_conn_id
+        self.src_conn_id = src_conn_id
+
+        self.packet_number = packet_number
+        self.frames = [] if frames is None else frames
         self.token = token
 
+        # The largest packet number the peer acknowledged, which the packet number is encoded relative to,
+        # and for a received packet, the length it was encoded in
+        self.largest_acked = largest_acked
+        self._packet_number_length = packet_number_length
+
     @classmethod
-    def from_bytes(cls, data: BytesIO, **kwargs):
-        token_length = VarInt.from_bytes(data)
+    def from_buffer(cls, buffer: memoryview, offset: int = 0, **kwargs):
+        token_length, offset = decode_varint(buffer, offset)
 
-        token = data.read(token_length.value)
+        token = buffer[offset:offset + token_length]
+        offset += token_length
 
-        length = VarInt.from_bytes(data)
+        length, offset = decode_varint(buffer, offset)
 
-        packet_number_length = 0b0011 & kwargs["type_specific_bits"]
+        packet_number_length = (0b0011 & kwargs["type_specific_bits"]) + 1
 
-        packet_number_bytes = data.read(packet_number_length)
-        packet_number = int.from_bytes(packet_number_bytes)
+        # Truncated to its least significant bytes until decode_packet_number expands it
+        packet_number = int.from_bytes(buffer[offset:offset + packet_number_length])
+        offset += packet_number_length
 
         frames = []
 
-        payload_size = length.value - packet_number_length
+        end = offset + length - packet_number_length
 
-        start = data.tell()
+        if end > len(buffer):
+            raise ValueError(f"Packet payload ends at {end}, beyond the {len(buffer)} bytes received")
 
-        while data.tell() != start + payload_size:
-            frame = QuicFrame.from_bytes(data)
+        # Frames without a length field extend to the end of the payload
+        payload = buffer[:end]
 
-            if frame is not None:
-                frames.append(frame)
+        while offset < end:
+            frame, offset = QuicFrame.from_buffer(payload, offset)
+            frames.append(frame)
 
         return cls(
             packet_number=packet_number,
             token=token,
             frames=frames,
+            packet_number_length=packet_number_length,
             **kwargs,
+        ), end
+
+    def encoded_size(self):
+        payload_length = self.packet_number_length + sum(frame.encoded_size() for frame in self.frames)
+
+        return (
+                super().encoded_size()
+                + varint_length(len(self.token)) + len(self.token)
+                + varint_length(payload_length) + payload_length
         )
 
-    def to_bytes(self):
-        encoded_packet_number = self.encode_packet_number()
-        self._type_specific_bits = len(encoded_packet_number)
+    def serialize_into(self, buffer, offset: int) -> int:
+        packet_number_length = self.packet_number_length
+        self._type_specific_bits = packet_number_length - 1
 
-        buffer = super().to_bytes()
-        buffer += VarInt.length_of(len(self.token)).to_bytes()
-        buffer += self.token
+        offset = super().serialize_into(buffer, offset)
 
-        packed_frames = b""
-        for frame in self.frames:
-            packed_frames += frame.to_bytes()
+        offset = encode_varint(len(self.token), buffer, offset)
+        buffer[offset:offset + len(self.token)] = self.token
+        offset += len(self.token)
 
-        buffer += VarInt(len(packed_frames) + len(encoded_packet_number)).to_bytes()
+        payload_length = packet_number_length + sum(frame.encoded_size() for frame in self.frames)
+        offset = encode_varint(payload_length, buffer, offset)
 
-        buffer += encoded_packet_number
+        buffer[offset:offset + packet_number_length] = self.encode_packet_number()
+        offset += packet_number_length
 
-        buffer += packed_frames
+        for frame in self.frames:
+            offset = frame.serialize_into(buffer, offset)
 
-        return buffer
+        return offset
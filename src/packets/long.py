@@ -1,10 +1,13 @@
-from io import BytesIO
-
 from quic.packets import QuicPacket
-from quic.var_int import VarInt
 
 
+@QuicPacket.register(1)
 class QuicLongPacket(QuicPacket):
+    __slots__ = ("long_packet_type", "_type_specific_bits", "version", "dst_conn_id", "src_conn_id")
+
+    # Packet class for each long packet type, filled in by QuicLongPacket.register
+    _dispatch = [None] * 4
+
     def __init__(
             self,
             long_packet_type=None,
@@ -23,46 +26,56 @@ class QuicLongPacket(QuicPacket):
         self.src_conn_id = src_conn_id
 
     @classmethod
-    def from_bytes(cls, data: BytesIO, **kwargs):
-        first_byte = int.from_bytes(data.read(1))
+    def from_buffer(cls, buffer: memoryview, offset: int = 0, **kwargs):
+        first_byte = buffer[offset]
 
         long_packet_type = (first_byte & 0b00110000) >> 4
         type_specific_bits = (first_byte & 0b00001111)
         kwargs["type_specific_bits"] = type_specific_bits
 
-        version_bytes = data.read(4)
-        kwargs["version"] = int.from_bytes(version_bytes)
+        kwargs["version"] = int.from_bytes(buffer[offset + 1:offset + 5])
+        offset += 5
+
+        dst_conn_id_length = buffer[offset]
+        offset += 1
+        kwargs["dst_conn_id"] = int.from_bytes(buffer[offset:offset + dst_conn_id_length])
+        offset += dst_conn_id_length
+
+        src_conn_id_length = buffer[offset]
+        offset += 1
+        kwargs["src_conn_id"] = int.from_bytes(buffer[offset:offset + src_conn_id_length])
+        offset += src_conn_id_length
 
-        dst_conn_id_length_bytes = data.read(1)
-        dst_conn_id_length = int.from_bytes(dst_conn_id_length_bytes)
+        packet_class = QuicLongPacket._dispatch[long_packet_type]
 
-        dst_conn_id_bytes = data.read(dst_conn_id_length)
-        kwargs["dst_conn_id"] = int.from_bytes(dst_conn_id_bytes)
+        if packet_class is None:
+            raise ValueError(f"Unrecognized long packet type {long_packet_type}")
 
-        src_conn_id_length_bytes = data.read(1)
-        src_conn_id_length = int.from_bytes(src_conn_id_length_bytes)
+        return packet_class.from_buffer(buffer, offset, **kwargs)
 
-        src_conn_id_bytes = data.read(src_conn_id_length)
-        kwargs["src_conn_id"] = int.from_bytes(src_conn_id_bytes)
+    @staticmethod
+    def conn_id_length(conn_id: int):
+        return (conn_id.bit_length() + 7) // 8
 
-        if long_packet_type == 0:
-            from quic.packets.initial import QuicInitialPacket
-            return QuicInitialPacket.from_bytes(data, **kwargs)
+    def encoded_size(self):
+        return super().encoded_size() + 6 + self.conn_id_length(self.dst_conn_id) + self.conn_id_length(self.src_conn_id)
 
-        raise Exception(f"Unrecognized long packet type {long_packet_type}")
+    def serialize_into(self, buffer, offset: int) -> int:
+        start = offset
+        offset = super().serialize_into(buffer, offset)
+        buffer[start] |= (self.long_packet_type << 4) | (0b00001111 & self._type_specific_bits)
 
-    def to_bytes(self):
-        buffer = super().to_bytes()
-        buffer[0] = buffer[0] | (0b00001111 & self._type_specific_bits)
+        buffer[offset:offset + 4] = self.version.to_bytes(4)
+        offset += 4
 
-        buffer += self.version.to_bytes(4)
+        for conn_id in (self.dst_conn_id, self.src_conn_id):
+            conn_id_length = self.conn_id_length(conn_id)
+            buffer[offset] = conn_id_length
+            buffer[offset + 1:offset + 1 + conn_id_length] = conn_id.to_bytes(conn_id_length)
+            offset += 1 + conn_id_length
 
-        dst_conn_id_length = VarInt.length_of(self.dst_conn_id)
-        buffer.append(int.from_bytes(dst_conn_id_length.to_bytes()))
-        buffer += self.dst_conn_id.to_bytes(dst_conn_id_length.value)
+        return offset
 
-        src_conn_id_length = VarInt.length_of(self.src_conn_id)
-        buffer.append(int.from_bytes(src_conn_id_length.to_bytes()))
-        buffer += self.src_conn_id.to_bytes(src_conn_id_length.value)
 
-        return buffer
+# Importing the long packet modules registers their types with QuicLongPacket
+from quic.packets import initial  # noqa: E402,F401
@@ -1,8 +1,11 @@
 from abc import ABC, abstractmethod
-from math import log2, ceil
 
 
 class NumberedPacket(ABC):
+    # Concrete packets declare the packet_number and frames slots, so that they can
+    # also inherit from a slotted header class
+    __slots__ = ()
+
     def __init__(self, packet_number, frames=None, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
@@ -13,18 +16,42 @@ class NumberedPacket(ABC):
 
         self.frames = frames
 
+    @property
+    def packet_number_length(self):
+        # The length a received packet number was encoded in, or for a packet to send, enough bytes to represent
+        # twice the range of packets the peer has not acknowledged, at most 4, see RFC 9000 appendix A.2
+        if self._packet_number_length is not None:
+            return self._packet_number_length
+
+        return min(((self.packet_number - self.largest_acked - 1).bit_length() + 8) // 8, 4)
+
     def encode_packet_number(self):
-        num_unacked = self.packet_number + 1
+        # Only the least significant bytes are sent
+        packet_number_length = self.packet_number_length
+        return (self.packet_number & ((1 << 8 * packet_number_length) - 1)).to_bytes(packet_number_length)
+
+    def decode_packet_number(self, largest_pn: int) -> int:
+        # Expands the truncated packet number of a received packet to the value closest to the one after
+        # largest_pn, the largest packet number received so far, see RFC 9000 appendix A.3
+        pn_win = 1 << 8 * self.packet_number_length
+        pn_hwin = pn_win // 2
+        pn_mask = pn_win - 1
 
-        min_bits = log2(num_unacked) + 1
-        num_bytes = ceil(min_bits / 8)
+        expected_pn = largest_pn + 1
+        candidate_pn = (expected_pn & ~pn_mask) | (self.packet_number & pn_mask)
 
-        return self.packet_number.to_bytes(num_bytes)
+        if candidate_pn <= expected_pn - pn_hwin and candidate_pn < (1 << 62) - pn_win:
+            candidate_pn += pn_win
+        elif candidate_pn > expected_pn + pn_hwin and candidate_pn >= pn_win:
+            candidate_pn -= pn_win
 
-    @staticmethod
-    def decode_packet_number():
-        pass
+        self.packet_number = candidate_pn
+        return candidate_pn
+
+    @abstractmethod
+    def encoded_size(self):
+        raise NotImplementedError()
 
     @abstractmethod
-    def to_bytes(self):
+    def serialize_into(self, buffer, offset: int) -> int:
         raise NotImplementedError()
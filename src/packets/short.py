@@ -1,10 +1,10 @@
-import struct
-from io import BytesIO
-
 from quic.packets import QuicPacket
 
 
+@QuicPacket.register(0)
 class QuicShortPacket(QuicPacket):
+    __slots__ = ("spin_bit", "reserved_bits", "key_phase", "_packet_number_length", "dst_conn_id", "packet_number")
+
     def __init__(
             self,
             fixed_bit=1,
@@ -18,26 +18,48 @@ class QuicShortPacket(QuicPacket):
         self.spin_bit = spin_bit
         self.reserved_bits = 0
         self.key_phase = key_phase
-        self._packet_number_length = packet_number_length - 1 if packet_number else None
+        self._packet_number_length = packet_number_length - 1 if packet_number_length else None
         self.dst_conn_id = dst_conn_id
         self.packet_number = packet_number
 
     @classmethod
-    def from_bytes(cls, data: BytesIO, **kwargs):
-        data = int.from_bytes(data)
+    def from_buffer(cls, buffer: memoryview, offset: int = 0, dst_conn_id_length: int = 0, **kwargs):
+        first_byte = buffer[offset]
+        offset += 1
 
-        packet = cls()
+        packet_number_length = (first_byte & 0b00000011) + 1
 
-        struct.pack_into(">B", packet, 0, data)
+        dst_conn_id = int.from_bytes(buffer[offset:offset + dst_conn_id_length])
+        offset += dst_conn_id_length
 
-        packet_number_bytes = s.recv(packet.packet_number_length)
-        packet.packet_number = int.from_bytes(packet_number_bytes)
+        packet_number = int.from_bytes(buffer[offset:offset + packet_number_length])
+        offset += packet_number_length
 
-        return packet
+        return cls(
+            fixed_bit=(first_byte & 0b01000000) >> 6,
+            spin_bit=(first_byte & 0b00100000) >> 5,
+            key_phase=(first_byte & 0b00000100) >> 2,
+            packet_number_length=packet_number_length,
+            dst_conn_id=dst_conn_id,
+            packet_number=packet_number,
+        ), offset
 
     @property
     def packet_number_length(self):
         return self._packet_number_length + 1
 
-    def to_bytes(self):
-        return bytes(self) + self.packet_number.to_bytes(self.packet_number_length)
+    def encoded_size(self):
+        return super().encoded_size() + (self.dst_conn_id.bit_length() + 7) // 8 + self.packet_number_length
+
+    def serialize_into(self, buffer, offset: int) -> int:
+        start = offset
+        offset = super().serialize_into(buffer, offset)
+        buffer[start] |= (self.spin_bit << 5) | (self.key_phase << 2) | self._packet_number_length
+
+        dst_conn_id_length = (self.dst_conn_id.bit_length() + 7) // 8
+        buffer[offset:offset + dst_conn_id_length] = self.dst_conn_id.to_bytes(dst_conn_id_length)
+        offset += dst_conn_id_length
+
+        buffer[offset:offset + self.packet_number_length] = self.packet_number.to_bytes(self.packet_number_length)
+
+        return offset + self.packet_number_length
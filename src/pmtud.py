@@ -0,0 +1,143 @@
+import logging
+import socket
+import sys
+
+from quic.clock import SECOND
+
+# Linux socket options that set the don't fragment bit and let datagrams above the cached path MTU through,
+# so that a probe either arrives whole or is lost instead of being fragmented, see ip(7)
+IP_MTU_DISCOVER = 10
+IPV6_MTU_DISCOVER = 23
+IP_PMTUDISC_PROBE = 3
+
+# States of RFC 8899 section 5.2, without BASE since the configured datagram size is assumed to work
+SEARCHING = "searching"
+SEARCH_COMPLETE = "search_complete"
+
+
+def set_dont_fragment(sock):
+    family = getattr(sock, "family", None)
+
+    if not sys.platform.startswith("linux") or family not in (socket.AF_INET, socket.AF_INET6):
+        return
+
+    if family == socket.AF_INET:
+        sock.setsockopt(socket.IPPROTO_IP, IP_MTU_DISCOVER, IP_PMTUDISC_PROBE)
+    else:
+        sock.setsockopt(socket.IPPROTO_IPV6, IPV6_MTU_DISCOVER, IP_PMTUDISC_PROBE)
+
+
+class PathMtuDiscovery:
+    """
+    Datagram packetization layer path MTU discovery as described in RFC 8899. Padded probe packets binary search
+    for the largest UDP payload the path delivers, between base_size, which is assumed to work, and max_size.
+    An acknowledged probe raises max_payload, and a size is given up on once max_probes of its probes were lost.
+    """
+
+    # MAX_PROBES
+    max_probes = 3
+
+    # The search ends once the largest size that worked and the smallest that failed are this close
+    search_granularity = 16
+
+    # PMTU_RAISE_TIMER, after which a completed search starts over in case the path now allows more
+    raise_interval = 600 * SECOND
+
+    def __init__(self, base_size: int, max_size: int, now: int = 0):
+        if max_size < base_size:
+            raise ValueError(f"Maximum size {max_size} is below the base size {base_size}")
+
+        self.base_size = base_size
+        self.max_size = max_size
+
+        # PLPMTU, the largest payload known to get through
+        self.max_payload = base_size
+
+        self.state = SEARCHING
+
+        # Packet number of the probe in flight, if any
+        self.probe_packet_number: int | None = None
+        self.probes_sent = 0
+
+        self._probe_size: int | None = None
+        self._probe_count = 0
+
+        # Smallest size that failed, or one past max_size
+        self._failed_size = max_size + 1
+        self._raise_time: int | None = None
+
+        self._check_complete(now)
+
+    def next_probe_size(self, now: int) -> int | None:
+        # Size of the probe to send now, or None while a probe is in flight or the search is complete
+        if self.state == SEARCH_COMPLETE:
+            if now < self._raise_time:
+                return None
+
+            self._restart()
+
+        if self.probe_packet_number is not None:
+            return None
+
+        if self._probe_size is None:
+            self._probe_size = (self.max_payload + self._failed_size) // 2
+
+        return self._probe_size
+
+    def is_probe(self, packet_number: int) -> bool:
+        return packet_number == self.probe_packet_number
+
+    def on_probe_sent(self, packet_number: int):
+        self.probe_packet_number = packet_number
+        self.probes_sent += 1
+
+    def on_probe_acked(self, size: int, now: int):
+        self.probe_packet_number = None
+        self.max_payload = max(self.max_payload, size)
+
+        self._probe_size = None
+        self._probe_count = 0
+
+        logging.debug(f"Path MTU probe of {size} bytes acknowledged")
+        self._check_complete(now)
+
+    def on_probe_lost(self, now: int):
+        self.probe_packet_number = None
+        self._probe_count += 1
+
+        if self._probe_count >= self.max_probes:
+            self.on_probe_too_big(now)
+
+    def on_probe_too_big(self, now: int):
+        # The size does not get through, e.g. because it exceeds the MTU of the local interface
+        logging.debug(f"Path MTU probe of {self._probe_size} bytes failed")
+
+        self.probe_packet_number = None
+        self._failed_size = self._probe_size
+
+        self._probe_size = None
+        self._probe_count = 0
+
+        self._check_complete(now)
+
+    def on_black_hole(self, now: int):
+        # Packets of max_payload stopped getting through, so the search starts over from the base size
+        logging.debug(f"Path MTU of {self.max_payload} bytes no longer works")
+
+        self.max_payload = self.base_size
+        self._restart()
+        self._check_complete(now)
+
+    def _restart(self):
+        self.state = SEARCHING
+        self._failed_size = self.max_size + 1
+        self._probe_size = None
+        self._probe_count = 0
+
+    def _check_complete(self, now: int):
+        if self._failed_size - self.max_payload <= self.search_granularity:
+            self.state = SEARCH_COMPLETE
+            self._raise_time = now + self.raise_interval
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.state}, max_payload={self.max_payload})"
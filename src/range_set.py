@@ -0,0 +1,69 @@
+from bisect import bisect_left
+
+
+class RangeSet:
+    def __init__(self, ranges=()):
+        # Disjoint, non-adjacent ranges sorted in ascending order
+        self._ranges: list[range] = []
+
+        for r in ranges:
+            self.add(r.start, r.stop)
+
+    def add(self, start: int, stop: int = None):
+        if stop is None:
+            stop = start + 1
+
+        ranges = self._ranges
+
+        if not ranges or start > ranges[-1].stop:
+            ranges.append(range(start, stop))
+            return
+
+        # First range that ends at or after start, so it touches or overlaps the new range
+        first = bisect_left(ranges, start, key=lambda r: r.stop)
+
+        last = first
+        while last < len(ranges) and ranges[last].start <= stop:
+            start = min(start, ranges[last].start)
+            stop = max(stop, ranges[last].stop)
+            last += 1
+
+        ranges[first:last] = [range(start, stop)]
+
+    def covers(self, start: int, stop: int) -> bool:
+        # Whether every value in [start, stop) is in the set
+        index = bisect_left(self._ranges, start + 1, key=lambda r: r.stop)
+        return index < len(self._ranges) and self._ranges[index].start <= start and stop <= self._ranges[index].stop
+
+    def shift(self) -> range:
+        return self._ranges.pop(0)
+
+    @property
+    def smallest(self):
+        return self._ranges[0].start
+
+    @property
+    def largest(self):
+        return self._ranges[-1].stop - 1
+
+    def __contains__(self, value: int):
+        index = bisect_left(self._ranges, value + 1, key=lambda r: r.stop)
+        return index < len(self._ranges) and value in self._ranges[index]
+
+    def __iter__(self):
+        return iter(self._ranges)
+
+    def __reversed__(self):
+        return reversed(self._ranges)
+
+    def __len__(self):
+        return len(self._ranges)
+
+    def __bool__(self):
+        return bool(self._ranges)
+
+    def __eq__(self, other):
+        return isinstance(other, RangeSet) and self._ranges == other._ranges
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self._ranges!r})"
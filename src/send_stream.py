@@ -0,0 +1,120 @@
+from collections import deque
+
+from quic.frames.stream import StreamFrame
+from quic.range_set import RangeSet
+from quic.sent_packets import StreamRange
+
+
+class SendStream:
+    """
+    Send side of one stream. Frames are cut from the stream's data source (bytes, or a view of a mapped file)
+    only when they are sent, and ranges declared lost are queued to be framed again from the source, so sent
+    packets only have to remember which ranges they carried.
+    """
+
+    def __init__(self, stream_id: int, data, chunk_size: int = None):
+        self.stream_id = stream_id
+        self.data = memoryview(data)
+
+        # Largest frame payload, or None to only be limited by the space left in the packet
+        self.chunk_size = chunk_size
+
+        # Offset of the first byte that was never sent
+        self.offset = 0
+        self.finish_sent = False
+
+        # Lost ranges, sent again before new data, and the number of bytes in them
+        self.retransmit: deque[StreamRange] = deque()
+        self.retransmit_bytes = 0
+
+        # Acknowledged data, and whether the end of the stream was acknowledged
+        self.acked = RangeSet()
+        self.finish_acked = False
+
+    @property
+    def size(self) -> int:
+        return len(self.data)
+
+    @property
+    def finished(self) -> bool:
+        # All data and the end of the stream were acknowledged, though copies sent in probes may still be in flight
+        return self.finish_acked and (self.size == 0 or self.acked.covers(0, self.size))
+
+    @property
+    def pending_bytes(self) -> int:
+        # Stream data still to be sent, lost or never sent
+        return self.retransmit_bytes + self.size - self.offset
+
+    def has_data(self) -> bool:
+        return bool(self.retransmit) or not self.finish_sent
+
+    def next_offset(self) -> int:
+        return self.retransmit[0].offset if self.retransmit else self.offset
+
+    def next_frame(self, max_length: int = None) -> StreamFrame | None:
+        if self.retransmit:
+            stream_range = self.retransmit[0]
+
+            # The rest of a range that does not fit stays at the front of the queue
+            if max_length is not None and stream_range.length > max_length:
+                self.retransmit[0] = StreamRange(
+                    self.stream_id,
+                    stream_range.offset + max_length,
+                    stream_range.length - max_length,
+                    stream_range.finish,
+                )
+                self.retransmit_bytes -= max_length
+                return self.frame(stream_range.offset, max_length, False)
+
+            self.retransmit.popleft()
+            self.retransmit_bytes -= stream_range.length
+            return self.frame(stream_range.offset, stream_range.length, stream_range.finish)
+
+        if self.finish_sent:
+            return None
+
+        length = self.size - self.offset
+        for limit in (self.chunk_size, max_length):
+            if limit is not None:
+                length = min(length, limit)
+
+        finish = self.offset + length == self.size
+
+        frame = self.frame(self.offset, length, finish)
+        self.offset += length
+        self.finish_sent = finish
+
+        return frame
+
+    def frame(self, offset: int, length: int, finish: bool) -> StreamFrame:
+        return StreamFrame(
+            self.stream_id,
+            include_length=True,
+            offset=offset,
+            finish=finish,
+            data=self.data[offset:offset + length],
+        )
+
+    def is_acked(self, stream_range: StreamRange) -> bool:
+        end = stream_range.offset + stream_range.length
+
+        if stream_range.finish and not self.finish_acked:
+            return False
+
+        return stream_range.length == 0 or self.acked.covers(stream_range.offset, end)
+
+    def on_range_acked(self, stream_range: StreamRange):
+        if stream_range.length > 0:
+            self.acked.add(stream_range.offset, stream_range.offset + stream_range.length)
+
+        if stream_range.finish:
+            self.finish_acked = True
+
+    def on_range_lost(self, stream_range: StreamRange):
+        # Data that another copy of it already delivered is not sent again
+        if not self.is_acked(stream_range):
+            self.retransmit.append(stream_range)
+            self.retransmit_bytes += stream_range.length
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.stream_id}, offset={self.offset}/{self.size})"
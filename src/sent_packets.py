@@ -0,0 +1,165 @@
+class StreamRange:
+    """
+    Stream data carried by a sent packet, kept instead of the frame itself so that lost data can be framed
+    again from the stream's source without holding on to the payload.
+    """
+
+    __slots__ = ("stream_id", "offset", "length", "finish")
+
+    def __init__(self, stream_id: int, offset: int, length: int, finish: bool):
+        self.stream_id = stream_id
+        self.offset = offset
+        self.length = length
+        self.finish = finish
+
+    def __eq__(self, other):
+        if not isinstance(other, StreamRange):
+            return NotImplemented
+
+        return (self.stream_id, self.offset, self.length, self.finish) == \
+            (other.stream_id, other.offset, other.length, other.finish)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.stream_id}, {self.offset}, {self.length}, finish={self.finish})"
+
+
+class SentPacket:
+    __slots__ = (
+        "packet_number",
+        "time_sent",
+        "size",
+        "ack_eliciting",
+        "stream_ranges",
+        "delivered",
+        "delivered_time",
+        "first_sent_time",
+    )
+
+    def __init__(self, packet_number: int, time_sent, size: int, ack_eliciting: bool, stream_ranges=()):
+        self.packet_number = packet_number
+        self.time_sent = time_sent
+        self.size = size
+        self.ack_eliciting = ack_eliciting
+        self.stream_ranges: tuple[StreamRange, ...] = stream_ranges or ()
+
+        # Connection delivery state when the packet was sent, stamped by the delivery rate estimator
+        self.delivered = 0
+        self.delivered_time = time_sent
+        self.first_sent_time = time_sent
+
+    @property
+    def stream_bytes(self) -> int:
+        return sum(stream_range.length for stream_range in self.stream_ranges)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.packet_number}, size={self.size})"
+
+
+class SentPacketTracker:
+    # Acknowledged slots at the head are only dropped from the list in batches of at least this many
+    compact_threshold = 1024
+
+    def __init__(self):
+        # Slot i holds packet number self._base + i, or None once that packet was acknowledged or lost
+        self._packets: list[SentPacket | None] = []
+        self._base = 0
+        self._head = 0
+        self._count = 0
+
+    def add(self, sent_packet: SentPacket):
+        index = sent_packet.packet_number - self._base
+
+        if index < len(self._packets):
+            raise ValueError(f"Packet number {sent_packet.packet_number} was already used")
+
+        if self._count == 0:
+            self._packets.clear()
+            self._base = sent_packet.packet_number
+            self._head = 0
+        elif index > len(self._packets):
+            self._packets.extend([None] * (index - len(self._packets)))
+
+        self._packets.append(sent_packet)
+        self._count += 1
+
+    def get(self, packet_number: int) -> SentPacket | None:
+        index = packet_number - self._base
+
+        if self._head <= index < len(self._packets):
+            return self._packets[index]
+
+        return None
+
+    def remove(self, packet_number: int) -> SentPacket | None:
+        index = packet_number - self._base
+
+        if not self._head <= index < len(self._packets):
+            return None
+
+        sent_packet = self._packets[index]
+
+        if sent_packet is not None:
+            self._packets[index] = None
+            self._count -= 1
+            self._advance()
+
+        return sent_packet
+
+    def ack_range(self, smallest: int, largest: int) -> list[SentPacket]:
+        packets = self._packets
+        start = max(smallest - self._base, self._head)
+        stop = min(largest - self._base + 1, len(packets))
+
+        acked = []
+        for index in range(start, stop):
+            sent_packet = packets[index]
+
+            if sent_packet is not None:
+                acked.append(sent_packet)
+                packets[index] = None
+
+        if acked:
+            self._count -= len(acked)
+            self._advance()
+
+        return acked
+
+    def oldest(self) -> SentPacket | None:
+        if self._count == 0:
+            return None
+
+        return self._packets[self._head]
+
+    def _advance(self):
+        packets = self._packets
+        head = self._head
+
+        while head < len(packets) and packets[head] is None:
+            head += 1
+
+        if head == len(packets):
+            self._base += head
+            packets.clear()
+            head = 0
+        elif head >= self.compact_threshold and head * 2 >= len(packets):
+            del packets[:head]
+            self._base += head
+            head = 0
+
+        self._head = head
+
+    def __contains__(self, packet_number: int):
+        return self.get(packet_number) is not None
+
+    def __iter__(self):
+        for index in range(self._head, len(self._packets)):
+            sent_packet = self._packets[index]
+
+            if sent_packet is not None:
+                yield sent_packet
+
+    def __len__(self):
+        return self._count
+
+    def __bool__(self):
+        return self._count != 0
@@ -1,75 +1,300 @@
 import logging
 import random
 import socket
-from io import BytesIO
 
+from quic.clock import Clock, MICROSECOND, MILLISECOND, MonotonicClock, SECOND
+from quic.connection import Connection, ConnectionTable
+from quic.datagram_io import DatagramIO, MAX_UDP_PAYLOAD
 from quic.frames.ack import AckFrame
+from quic.frames.immediate_ack import elicits_immediate_ack
+from quic.frames.stream import StreamFrame
 from quic.packets import QuicPacket
 from quic.packets.initial import QuicInitialPacket
 from quic.packets.numbered_packet import NumberedPacket
+from quic.stream_reassembler import StreamReassembler
+
+
+def _discard(data):
+    pass
 
 
 class Server:
-    def __init__(self, bind_host="127.0.0.1", bind_port=5555, timeout=0.01, ack_threshold=10):
+    """
+    Receives packets and acknowledges them once ack_threshold of them arrived, a gap appeared, a packet asked
+    for an immediate ACK or ended a stream, or the first unacknowledged one waited max_ack_delay. ACKs report
+    how long the largest packet waited, in units of 2 ** ack_delay_exponent microseconds, so that the client
+    can take the delay out of its RTT samples.
+
+    Stream data is put back in order per connection, and open_stream decides where it goes.
+    """
+
+    def __init__(
+            self,
+            bind_host="127.0.0.1",
+            bind_port=5555,
+            timeout=0.01,
+            ack_threshold=10,
+            max_datagram_size=1500,
+            max_ack_ranges=64,
+            idle_timeout=30 * SECOND,
+            clock: Clock = None,
+            sock=None,
+            batched_io=False,
+            worker_index=0,
+            worker_count=1,
+            max_udp_payload_size=MAX_UDP_PAYLOAD,
+            max_ack_delay=25 * MILLISECOND,
+            ack_delay_exponent=3,
+    ):
         self.bind_host = bind_host
         self.bind_port = bind_port
 
         self.timeout = timeout
+        self.clock = clock if clock is not None else MonotonicClock()
         self.ack_threshold = ack_threshold
+        self.max_ack_ranges = max_ack_ranges
+        self.max_ack_delay = max_ack_delay
+        self.ack_delay_exponent = ack_delay_exponent
+
+        # Connections waiting for a delayed ACK, by connection ID. They all wait max_ack_delay from their first
+        # unacknowledged packet, so insertion order is deadline order
+        self._pending_acks: dict[int, Connection] = {}
+
+        self.max_datagram_size = max_datagram_size
+        self._send_buffer = memoryview(bytearray(max_datagram_size))
+
+        # Largest datagram received. Clients may probe for any path MTU, which nothing negotiates, so by default
+        # it is the UDP maximum rather than max_datagram_size, below which a probe would arrive truncated
+        self.max_udp_payload_size = max_udp_payload_size
 
         self.id = random.randint(0, 10000)
 
-        self._current_ack_range_length = 0
-        self._largest_acked = -1
+        self.connections = ConnectionTable(idle_timeout)
+
+        # Issued connection IDs tell which of worker_count processes sharing the port holds the connection
+        self.worker_index = worker_index
+        self.worker_count = worker_count
+
+        # Running totals for server statistics
+        self.connections_accepted = 0
+        self.packets_received = 0
+        self.acks_sent = 0
+        self.packets_dropped = 0
+
+        # An injected socket (e.g. a simulated one, or one bound by ShardedServer) is used as is
+        # instead of opening and binding a UDP socket
+        self._sock = sock
+
+        # Whether to batch datagrams per syscall with UDP GSO/GRO where the socket supports it
+        self.batched_io = batched_io
+        self._io: DatagramIO | None = None
 
     def __enter__(self):
-        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        if self._sock is None:
+            self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self._sock.bind((self.bind_host, self.bind_port))
+
         self._sock.settimeout(self.timeout)
-        self._sock.bind((self.bind_host, self.bind_port))
+        self._io = DatagramIO.create(self._sock, self.batched_io)
 
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self._sock.close()
+        try:
+            self._io.flush()
+        finally:
+            self._sock.close()
 
     def send_packet(self, packet: NumberedPacket, addr):
-        buffer = bytes(packet.to_bytes())
-        # logging.debug(f"Sending buffer: {buffer[:100]} (length: {len(buffer)})")
-        self._sock.sendto(buffer, addr)
+        end = packet.serialize_into(self._send_buffer, 0)
+        # logging.debug(f"Sending buffer: {self._send_buffer[:100]} (length: {end})")
+        self._io.send(self._send_buffer[:end], addr)
 
     def receive_packet(self) -> tuple[QuicPacket, tuple[str, int]]:
-        buffer, addr = self._sock.recvfrom(1500)
-        # logging.debug(f"Received header from {addr}")
+        # Datagrams that do not parse are dropped, and the next one is waited for
+        while True:
+            buffer, addr = self.receive_datagram()
 
-        packet = QuicPacket.from_bytes(BytesIO(buffer))
+            if (packet := self.parse_datagram(buffer, addr)) is not None:
+                break
 
-        if isinstance(packet, NumberedPacket):
-            response = QuicInitialPacket(
-                packet_number=packet.packet_number + 100000,
-                version=1,
-                dst_conn_id=0,
-                src_conn_id=self.id,
-            )
+        self.on_packet_received(packet, addr)
 
-            expected_packet_number = self._largest_acked + self._current_ack_range_length + 1
+        return packet, addr
 
-            if packet.packet_number == expected_packet_number and self._current_ack_range_length != self.ack_threshold:
-                self._current_ack_range_length += 1
+    def parse_datagram(self, buffer, addr) -> QuicPacket | None:
+        # A stray or malformed datagram is logged and counted instead of stopping the receive loop
+        try:
+            packet, _ = QuicPacket.from_buffer(memoryview(buffer))
+        except (ValueError, IndexError) as e:
+            logging.warning(f"Dropped malformed datagram of {len(buffer)} bytes from {addr}: {e}")
+            self.packets_dropped += 1
+            return None
 
-            elif packet.packet_number > expected_packet_number or self._current_ack_range_length == self.ack_threshold:
-                if self._current_ack_range_length != 0:
-                    ack = AckFrame(
-                        largest_acknowledged=self._largest_acked + self._current_ack_range_length,
-                        first_ack_range=self._current_ack_range_length - 1,
-                    )
+        return packet
 
-                    logging.debug(f"ACKing {ack.smallest_acknowledged} - {ack.largest_acknowledged}")
+    def receive_datagram(self):
+        # Waits up to timeout for a datagram, sending delayed ACKs as they fall due in the meantime
+        now = self.clock.now()
+        end = None if self.timeout is None else now + int(self.timeout * SECOND)
 
-                    response.frames.append(ack)
+        try:
+            while True:
+                self.send_due_acks(now)
 
-                    self.send_packet(response, addr)
+                deadline = self.next_ack_deadline()
+                if end is not None and (deadline is None or end < deadline):
+                    deadline = end
 
-                self._largest_acked = packet.packet_number - 1
-                self._current_ack_range_length = 1
+                self._sock.settimeout(None if deadline is None else max(deadline - now, 0) / SECOND)
 
-        return packet, addr
+                try:
+                    return self._io.recvfrom(self.max_udp_payload_size)
+                except (socket.timeout, BlockingIOError):
+                    now = self.clock.now()
+
+                    if end is not None and now >= end:
+                        raise
+        finally:
+            self._sock.settimeout(self.timeout)
+
+    def next_ack_deadline(self) -> int | None:
+        # When the earliest delayed ACK is due, for event-driven servers to set a timer
+        for connection in self._pending_acks.values():
+            return connection.ack_deadline
+
+        return None
+
+    def send_due_acks(self, now: int):
+        while self._pending_acks:
+            connection = next(iter(self._pending_acks.values()))
+
+            if connection.ack_deadline > now:
+                break
+
+            self.send_ack(connection)
+
+    def on_packet_received(self, packet: QuicPacket, addr) -> Connection | None:
+        if not isinstance(packet, NumberedPacket):
+            return None
+
+        now = self.clock.now()
+        for connection in self.connections.evict_idle(now):
+            self.on_connection_closed(connection)
+
+        connection = self.get_connection(packet, addr, now)
+        connection.packets_received += 1
+        self.packets_received += 1
+
+        received = connection.received
+
+        # Packet numbers arrive truncated relative to the largest one the client saw acknowledged
+        packet.decode_packet_number(received.largest if received else -1)
+
+        # ACK immediately when a packet does not directly follow the largest one received,
+        # so that the client learns about gaps as early as possible
+        out_of_order = bool(received) and packet.packet_number != received.largest + 1
+
+        if not received or packet.packet_number > received.largest:
+            connection.largest_received_time = now
+
+        received.add(packet.packet_number)
+        connection.unacked_count += 1
+
+        if connection.ack_deadline is None:
+            connection.ack_deadline = now + self.max_ack_delay
+            self._pending_acks[connection.conn_id] = connection
+
+        if len(received) > self.max_ack_ranges:
+            received.shift()
+
+        if connection.unacked_count >= self.ack_threshold or out_of_order or elicits_immediate_ack(packet.frames):
+            self.send_ack(connection)
+        else:
+            self.send_due_acks(now)
+
+        for frame in packet.frames:
+            if isinstance(frame, StreamFrame):
+                self.on_stream_frame(connection, frame)
+
+        return connection
+
+    def on_stream_frame(self, connection: Connection, frame: StreamFrame):
+        stream = connection.streams.get(frame.stream_id)
+
+        if stream is None:
+            stream = connection.streams[frame.stream_id] = self.open_stream(connection, frame.stream_id)
+
+        try:
+            stream.on_stream_frame(frame)
+        except ValueError as e:
+            # Data past the final size or the receive window is dropped, and the rest of the packet still counts
+            logging.warning(f"Dropped data of stream {frame.stream_id} of {connection}: {e}")
+
+    def open_stream(self, connection: Connection, stream_id: int):
+        # Receive side of a new stream, anything with an on_stream_frame method. Subclasses hand the data to
+        # the application, by default it is discarded once in order
+        return StreamReassembler(_discard)
+
+    def get_connection(self, packet: NumberedPacket, addr, now: int) -> Connection:
+        connection = self.connections.lookup(packet.dst_conn_id, addr)
+
+        if connection is None:
+            connection = Connection(self.new_conn_id(), packet.src_conn_id, addr, now, (addr, packet.dst_conn_id))
+            self.connections.add(connection)
+            self.connections_accepted += 1
+
+            logging.debug(f"New connection {connection}")
+        else:
+            self.connections.touch(connection, now)
+
+            # The client may have moved to a new address
+            connection.addr = addr
+
+        return connection
+
+    def new_conn_id(self) -> int:
+        # The first byte modulo worker_count is the worker index, and it is never 0, so the ID is always
+        # encoded in 8 bytes and the byte is at a fixed offset for steering (see sharded_server)
+        first_bytes = range(self.worker_index or self.worker_count, 256, self.worker_count)
+
+        while (conn_id := random.choice(first_bytes) << 56 | random.getrandbits(56)) in self.connections:
+            pass
+
+        return conn_id
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "connections_accepted": self.connections_accepted,
+            "connections_open": len(self.connections),
+            "packets_received": self.packets_received,
+            "acks_sent": self.acks_sent,
+            "packets_dropped": self.packets_dropped,
+        }
+
+    def on_connection_closed(self, connection: Connection):
+        self._pending_acks.pop(connection.conn_id, None)
+        logging.debug(f"Evicted idle connection {connection}")
+
+    def send_ack(self, connection: Connection):
+        ack_delay = (self.clock.now() - connection.largest_received_time) // MICROSECOND >> self.ack_delay_exponent
+        ack = AckFrame.from_ranges(((r.start, r.stop - 1) for r in reversed(connection.received)), ack_delay)
+
+        logging.debug(f"ACKing {ack.smallest_acknowledged} - {ack.largest_acknowledged} with {ack.ack_range_count} more ranges")
+
+        response = QuicInitialPacket(
+            packet_number=connection.get_packet_number(),
+            version=1,
+            dst_conn_id=connection.peer_conn_id,
+            src_conn_id=connection.conn_id,
+            frames=[ack],
+        )
+
+        self.send_packet(response, connection.addr)
+
+        connection.unacked_count = 0
+        connection.ack_deadline = None
+        self._pending_acks.pop(connection.conn_id, None)
+
+        connection.acks_sent += 1
+        self.acks_sent += 1
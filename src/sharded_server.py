@@ -0,0 +1,181 @@
+import ctypes
+import logging
+import multiprocessing
+import os
+import queue
+import socket
+import struct
+from collections import Counter
+
+from quic.server import Server
+
+SO_REUSEPORT = getattr(socket, "SO_REUSEPORT", 15)
+SO_ATTACH_REUSEPORT_CBPF = 51
+
+# Classic BPF instruction classes and modes, see linux/filter.h
+BPF_LD_B_ABS = 0x00 | 0x10 | 0x20
+BPF_ALU_MOD_K = 0x04 | 0x90 | 0x00
+BPF_RET_A = 0x06 | 0x10
+
+# Long header: flags (1), version (4), destination connection ID length (1), then the ID itself
+DST_CONN_ID_OFFSET = 6
+
+
+def steering_program(worker_count: int) -> bytes:
+    """
+    Classic BPF program selecting the socket of the reuseport group by the first byte of the destination
+    connection ID. The program sees the UDP payload, and datagrams too short to have the byte go to socket 0.
+    """
+    instructions = [
+        (BPF_LD_B_ABS, 0, 0, DST_CONN_ID_OFFSET),
+        (BPF_ALU_MOD_K, 0, 0, worker_count),
+        (BPF_RET_A, 0, 0, 0),
+    ]
+
+    return b"".join(struct.pack("=HBBI", *instruction) for instruction in instructions)
+
+
+def attach_steering_program(sock: socket.socket, worker_count: int):
+    instructions = steering_program(worker_count)
+    program = (ctypes.c_char * len(instructions)).from_buffer_copy(instructions)
+
+    # struct sock_fprog, which points to the instructions. The kernel copies them during setsockopt
+    fprog = struct.pack("HP", len(instructions) // 8, ctypes.addressof(program))
+    sock.setsockopt(socket.SOL_SOCKET, SO_ATTACH_REUSEPORT_CBPF, fprog)
+
+
+def reuseport_sockets(bind_host: str, bind_port: int, count: int) -> list[socket.socket]:
+    # Sockets join the reuseport group in bind order, which is the index the steering program returns
+    socks = []
+
+    try:
+        for _ in range(count):
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            socks.append(sock)
+
+            sock.setsockopt(socket.SOL_SOCKET, SO_REUSEPORT, 1)
+            sock.bind((bind_host, bind_port))
+
+            # Binding port 0 picks a free port for the first socket, which the others share
+            bind_port = sock.getsockname()[1]
+
+        attach_steering_program(socks[0], count)
+    except OSError:
+        for sock in socks:
+            sock.close()
+        raise
+
+    return socks
+
+
+def run_worker(server_class, server_kwargs: dict, socks: list, worker_index: int, stop_event, result_queue):
+    sock = socks[worker_index]
+
+    for other in socks:
+        if other is not sock:
+            other.close()
+
+    with server_class(
+            sock=sock,
+            worker_index=worker_index,
+            worker_count=len(socks),
+            **server_kwargs,
+    ) as server:
+        while not stop_event.is_set():
+            try:
+                server.receive_packet()
+            except socket.timeout:
+                pass
+
+    result_queue.put((worker_index, server.stats()))
+
+
+class ShardedServer:
+    """
+    Runs a server in each of `workers` forked processes, all bound to one port with SO_REUSEPORT.
+    Datagrams are steered by the first byte of their destination connection ID, and each server issues IDs
+    whose first byte selects its own worker, so a connection stays with the process holding its state
+    even if the client's address changes.
+    """
+
+    # Seconds to wait for each worker's statistics after asking the workers to stop
+    stop_timeout = 5
+
+    def __init__(self, bind_host="127.0.0.1", bind_port=5555, workers: int = None, server_class=Server, **server_kwargs):
+        self.bind_host = bind_host
+        self.bind_port = bind_port
+        self.workers = workers or os.cpu_count()
+        self.server_class = server_class
+        self.server_kwargs = server_kwargs
+
+        # Statistics of each worker, filled in when the workers stop
+        self.worker_stats: list[dict[str, int] | None] = [None] * self.workers
+
+        self._context = multiprocessing.get_context("fork")
+        self._stop_event = self._context.Event()
+        self._result_queue = self._context.Queue()
+        self._processes = []
+
+    def __enter__(self):
+        socks = reuseport_sockets(self.bind_host, self.bind_port, self.workers)
+        self.bind_port = socks[0].getsockname()[1]
+
+        try:
+            for worker_index in range(self.workers):
+                process = self._context.Process(
+                    name=f"Server worker {worker_index}",
+                    target=run_worker,
+                    args=(self.server_class, self.server_kwargs, socks, worker_index, self._stop_event, self._result_queue),
+                    daemon=True,
+                )
+                process.start()
+                self._processes.append(process)
+        finally:
+            # The workers hold their own copies of the sockets
+            for sock in socks:
+                sock.close()
+
+        logging.info(f"Started {self.workers} server workers on {self.bind_host}:{self.bind_port}")
+
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    @property
+    def address(self):
+        return self.bind_host, self.bind_port
+
+    def stop(self) -> dict[str, int]:
+        self._stop_event.set()
+
+        for _ in self._processes:
+            try:
+                worker_index, stats = self._result_queue.get(timeout=self.stop_timeout)
+            except queue.Empty:
+                logging.error("Server workers did not report their statistics")
+                break
+
+            self.worker_stats[worker_index] = stats
+
+        for process in self._processes:
+            process.join(self.stop_timeout)
+
+            # A worker that is stuck would otherwise block stop forever
+            if process.is_alive():
+                logging.error("Server worker %d did not stop, terminating it", process.pid)
+                process.terminate()
+                process.join()
+
+        self._processes.clear()
+
+        return self.stats()
+
+    def stats(self) -> dict[str, int]:
+        total = Counter()
+
+        for stats in self.worker_stats:
+            if stats is not None:
+                total.update(stats)
+
+        return dict(total)
@@ -0,0 +1,191 @@
+import random
+import socket
+from collections import deque
+from heapq import heappop, heappush
+from itertools import count
+
+from quic.clock import SECOND, VirtualClock
+
+
+class Simulator(VirtualClock):
+    """
+    Discrete-event scheduler that is also the virtual clock of everything it simulates.
+    Sleeping on it runs the events that fall within the sleep instead of waiting.
+    """
+
+    def __init__(self, start: int = 0):
+        super().__init__(start)
+
+        self._events = []
+        self._sequence = count()
+
+    def schedule(self, time_: int, callback):
+        heappush(self._events, (time_, next(self._sequence), callback))
+
+    def call_later(self, delay: int, callback):
+        self.schedule(self.time + delay, callback)
+
+    def run_until(self, deadline: int | None, until=None) -> bool:
+        # Run events up to deadline (or until none are left when it is None), stopping early once until() holds
+        while self._events and (deadline is None or self._events[0][0] <= deadline):
+            time_, _, callback = heappop(self._events)
+            self.advance_to(time_)
+            callback()
+
+            if until is not None and until():
+                return True
+
+        if deadline is not None:
+            self.advance_to(deadline)
+
+        return False
+
+    def run(self):
+        self.run_until(None)
+
+    def sleep(self, duration: int):
+        if duration > 0:
+            self.run_until(self.time + duration)
+
+    @property
+    def pending_events(self):
+        return len(self._events)
+
+
+class SimulatedLink:
+    def __init__(
+            self,
+            simulator: Simulator,
+            latency: int = 0,
+            loss: float = 0,
+            bandwidth: int = None,
+            queue_size: int = None,
+            mtu: int = None,
+            seed=None,
+    ):
+        self.simulator = simulator
+        self.latency = latency
+        self.loss = loss
+        # Bytes per second, or None for a link without serialization delay
+        self.bandwidth = bandwidth
+        # Bytes waiting for the link before new datagrams are tail-dropped, or None for an unbounded queue
+        self.queue_size = queue_size
+        # Largest datagram the link carries, larger ones are dropped as if they had the don't fragment bit set
+        self.mtu = mtu
+        self.random = random.Random(seed)
+
+        self.sent = 0
+        self.dropped = 0
+        self._busy_until = 0
+
+    @property
+    def delivered(self):
+        return self.sent - self.dropped
+
+    def transmit(self, data: bytes, deliver):
+        self.sent += 1
+
+        if (self.mtu is not None and len(data) > self.mtu) or (self.loss and self.random.random() < self.loss):
+            self.dropped += 1
+            return
+
+        now = self.simulator.now()
+        departure = now
+        if self.bandwidth is not None:
+            if self.queue_size is not None and (self._busy_until - now) * self.bandwidth // SECOND > self.queue_size:
+                self.dropped += 1
+                return
+
+            departure = max(departure, self._busy_until) + len(data) * SECOND // self.bandwidth
+            self._busy_until = departure
+
+        self.simulator.schedule(departure + self.latency, lambda: deliver(data))
+
+
+class SimulatedNetwork:
+    def __init__(self, simulator: Simulator):
+        self.simulator = simulator
+        self.links: dict[tuple, SimulatedLink] = {}
+        self.sockets: dict[tuple, SimulatedSocket] = {}
+
+    def socket(self, addr: tuple[str, int]) -> "SimulatedSocket":
+        sock = SimulatedSocket(self, addr)
+        self.sockets[addr] = sock
+
+        return sock
+
+    def link(self, src: tuple[str, int], dst: tuple[str, int], **kwargs) -> SimulatedLink:
+        link = SimulatedLink(self.simulator, **kwargs)
+        self.links[(src, dst)] = link
+
+        return link
+
+    def transmit(self, data, src: tuple[str, int], dst: tuple[str, int]):
+        link = self.links.get((src, dst))
+        if link is None:
+            link = self.link(src, dst)
+
+        # Senders reuse their buffers, so the datagram is copied when it enters the network
+        link.transmit(bytes(data), lambda datagram: self._deliver(datagram, src, dst))
+
+    def _deliver(self, data: bytes, src, dst):
+        sock = self.sockets.get(dst)
+
+        if sock is not None and not sock.closed:
+            sock.deliver(data, src)
+
+
+class SimulatedSocket:
+    """
+    Datagram socket stand-in for Client and Server. Blocking receives advance the simulation
+    instead of waiting, and on_datagram lets an endpoint react to arrivals from inside the event loop.
+    """
+
+    def __init__(self, network: SimulatedNetwork, addr: tuple[str, int]):
+        self.network = network
+        self.addr = addr
+        self.peer = None
+        self.timeout = None
+        self.closed = False
+        self.on_datagram = None
+
+        self._inbox = deque()
+
+    def connect(self, addr):
+        self.peer = addr
+
+    def bind(self, addr):
+        pass
+
+    def settimeout(self, timeout):
+        self.timeout = timeout
+
+    def close(self):
+        self.closed = True
+
+    def send(self, data):
+        self.network.transmit(data, self.addr, self.peer)
+        return len(data)
+
+    def sendto(self, data, addr):
+        self.network.transmit(data, self.addr, addr)
+        return len(data)
+
+    def deliver(self, data: bytes, addr):
+        self._inbox.append((data, addr))
+
+        if self.on_datagram is not None:
+            self.on_datagram()
+
+    def recvfrom(self, bufsize: int):
+        if not self._inbox:
+            simulator = self.network.simulator
+            deadline = None if self.timeout is None else simulator.now() + int(self.timeout * SECOND)
+            simulator.run_until(deadline, until=lambda: bool(self._inbox))
+
+        if not self._inbox:
+            raise socket.timeout("timed out")
+
+        data, addr = self._inbox.popleft()
+
+        return data[:bufsize], addr
@@ -0,0 +1,116 @@
+from bisect import bisect_right
+from typing import Callable
+
+
+def _segment_end(segment: tuple[int, bytes]) -> int:
+    return segment[0] + len(segment[1])
+
+
+class StreamReassembler:
+    """
+    Puts the data of one stream back in order. The contiguous prefix is handed to the consumer (a callable, or
+    anything with a write method such as a file) as soon as it arrives, and only data past a gap is buffered,
+    so memory follows the reordering window rather than the stream size.
+
+    Data handed to the consumer may be a view into a received datagram, valid only during the call.
+    """
+
+    def __init__(self, consumer, max_buffered=16 * 1024 * 1024):
+        self._consume: Callable = consumer.write if hasattr(consumer, "write") else consumer
+
+        # Stream data must end within max_buffered bytes of the delivered offset, like a flow control window
+        self.max_buffered = max_buffered
+
+        self.delivered = 0
+        self.buffered = 0
+        self.final_size: int | None = None
+
+        # Disjoint (offset, data) segments past the delivered offset, sorted by offset
+        self._segments: list[tuple[int, bytes]] = []
+
+    @property
+    def finished(self) -> bool:
+        return self.final_size is not None and self.delivered == self.final_size
+
+    def on_stream_frame(self, frame):
+        self.add(frame.offset or 0, frame.data, frame.finish)
+
+    def add(self, offset: int, data, finish=False):
+        end = offset + len(data)
+
+        if finish:
+            if self.final_size is not None and self.final_size != end:
+                raise ValueError(f"Final size changed from {self.final_size} to {end}")
+
+            if self.delivered > end or (self._segments and _segment_end(self._segments[-1]) > end):
+                raise ValueError(f"Final size {end} is below data already received")
+
+            self.final_size = end
+
+        if self.final_size is not None and end > self.final_size:
+            raise ValueError(f"Data up to {end} exceeds the final size {self.final_size}")
+
+        if end > self.delivered + self.max_buffered:
+            raise ValueError(f"Data up to {end} exceeds the receive window ending at {self.delivered + self.max_buffered}")
+
+        # Retransmitted data that was already delivered
+        if end <= self.delivered:
+            return
+
+        if offset < self.delivered:
+            data = data[self.delivered - offset:]
+            offset = self.delivered
+
+        if offset == self.delivered:
+            self._deliver(data)
+            self._drain()
+        else:
+            self._insert(offset, data)
+
+    def _deliver(self, data):
+        if len(data) > 0:
+            self._consume(data)
+            self.delivered += len(data)
+
+    def _drain(self):
+        segments = self._segments
+        drained = 0
+
+        # Segments that became contiguous are removed in one slice, so that draining a long backlog takes linear time
+        try:
+            for start, data in segments:
+                if start > self.delivered:
+                    break
+
+                drained += 1
+                self.buffered -= len(data)
+
+                if start + len(data) > self.delivered:
+                    self._deliver(data[self.delivered - start:])
+        finally:
+            del segments[:drained]
+
+    def _insert(self, offset: int, data):
+        segments = self._segments
+        end = offset + len(data)
+
+        # First segment that ends after the new data starts
+        index = bisect_right(segments, offset, key=_segment_end)
+
+        # Only the gaps between buffered segments are stored, so overlapping retransmissions are merged
+        position = offset
+        while position < end:
+            if index < len(segments) and segments[index][0] <= position:
+                position = _segment_end(segments[index])
+                index += 1
+                continue
+
+            gap_end = min(end, segments[index][0]) if index < len(segments) else end
+
+            # Copied, so that a small segment does not keep a whole receive buffer alive
+            piece = bytes(data[position - offset:gap_end - offset])
+            segments.insert(index, (position, piece))
+            self.buffered += len(piece)
+
+            position = gap_end
+            index += 1
@@ -1,22 +1,26 @@
 import logging
+import multiprocessing
+import os
 import random
 import socket
 import sys
 from _csv import writer
 from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from hashlib import md5
 from logging import FileHandler
 from pathlib import Path
 from queue import Queue
 from threading import Thread, Event
-from time import sleep
 from timeit import default_timer
 
-from tqdm import trange
+from tqdm import tqdm, trange
 from tqdm.contrib.logging import logging_redirect_tqdm
 
-from quic.frames.stream import StreamFrame
-from quic.packets.initial import QuicInitialPacket
+from quic.clock import MICROSECOND, SECOND
+from quic.congestion import CongestionController
+from quic.simulator import SimulatedNetwork, Simulator
+from quic.stream_reassembler import StreamReassembler
 from unreliable_client import UnreliableClient
 from unreliable_server import UnreliableServer
 
@@ -43,6 +47,38 @@ def log_exception(exc_type, exc_value, exc_traceback):
     logging.exception("Unhandled exception occurred", exc_info=(exc_type, exc_value, exc_traceback))
 
 
+class HashedStream(StreamReassembler):
+    """
+    Receive side of a stream that keeps only the MD5 of its data, which is hashed as soon as it is in order.
+    """
+
+    def __init__(self):
+        self.md5 = md5()
+
+        super().__init__(self.md5.update)
+
+
+class HashingServer(UnreliableServer):
+    def open_stream(self, connection, stream_id: int) -> HashedStream:
+        return HashedStream()
+
+
+def hash_chunks(server: HashingServer, expected_size: int):
+    # Each test has a single client, which sends the file on its first stream
+    connection = next(iter(server.connections), None)
+
+    if connection is None or not connection.streams:
+        logging.debug("No stream data received")
+        return md5().hexdigest()
+
+    stream = connection.streams[min(connection.streams)]
+
+    if stream.delivered < expected_size:
+        logging.debug(f"Missing data at offset {stream.delivered} with {stream.buffered} bytes buffered after it")
+
+    return stream.md5.hexdigest()
+
+
 def run_server(
         server_host,
         server_port,
@@ -53,36 +89,31 @@ def run_server(
         stop_event: Event,
         result_queue: Queue,
         seed=random.randrange(sys.maxsize),
+        batched_io=False,
 ):
-    chunks = {}
-
-    with UnreliableServer(server_host, server_port, fail_chance, ack_threshold, seed=seed) as server:
+    with HashingServer(server_host, server_port, fail_chance, ack_threshold, seed=seed, batched_io=batched_io) as server:
         logging.info(f"Server started {server_host}:{server_port}")
         start_event.set()
 
         while not stop_event.is_set():
             try:
-                packet, _ = server.receive_packet()
-                if hasattr(packet, "frames") and len(packet.frames) > 0:
-                    frame: StreamFrame = packet.frames[0]
-                    chunks[frame.offset] = frame.data
+                server.receive_packet()
             except socket.timeout:
                 pass
                 # logging.warning("Server reached timeout")
 
         logging.info("Server stopping")
 
-    for offset in range(0, expected_size, 1000):
-        if offset not in chunks:
-            logging.debug(f"Missing offset {offset}")
+    result_queue.put(hash_chunks(server, expected_size))
+    result_queue.put(server.packet_count)
+
 
-    sorted_keys = sorted(chunks.keys())
-    server_md5 = md5()
-    for key in sorted_keys:
-        server_md5.update(chunks[key])
+def transfer_file(client: UnreliableClient, path: Path):
+    stats = client.send_file(path)
 
-    result_queue.put(server_md5.hexdigest())
-    result_queue.put(server.packet_count)
+    logging.info(f"rtt={client.smoothed_rtt}")
+    logging.info(stats)
+    logging.info("Finished sending")
 
 
 def run_test(
@@ -97,6 +128,8 @@ def run_test(
         time_detect=True,
         client_seed=random.randrange(sys.maxsize),
         server_seed=random.randrange(sys.maxsize),
+        congestion_control="new_reno",
+        batched_io=False,
 ):
     start_event.clear()
     stop_event.clear()
@@ -117,7 +150,8 @@ def run_test(
             start_event,
             stop_event,
             result_queue,
-            server_seed
+            server_seed,
+            batched_io,
         )
     )
     server_thread.start()
@@ -133,71 +167,16 @@ def run_test(
             fail_chance,
             seed=client_seed,
             package_reordering_threshold=ack_threshold,
+            congestion_controller=CongestionController.create(congestion_control),
+            batched_io=batched_io,
     ) as client:
 
         client.ack_detect = ack_detect
         client.time_detect = time_detect
 
-        for frame in client.chunkify_file(path):
-            packet = QuicInitialPacket(
-                packet_number=client.get_packet_number(),
-                version=1,
-                dst_conn_id=1,
-                src_conn_id=0,
-                frames=[frame],
-            )
-
-            logging.debug(f"Packet #{packet.packet_number} contains offset {frame.offset}")
-            client.send_packet(packet)
-
-            # logging.debug("Number of unACKed packets: %d", len(client.unacked_packets))
-
-            while True:
-                try:
-                    client.receive_packet()
-                except socket.timeout:
-                    break
-
-        rtt = client.smoothed_rtt
-        logging.info(f"{rtt=}")
-        logging.info("Sending lost tail packets")
-
-        while any(filter(lambda packet: len(packet.frames) > 0, client.unacked_packets.values())):
-            if client.ack_detect:
-                for i in range(client.package_reordering_threshold):
-                    probe_packet = QuicInitialPacket(
-                        packet_number=client.get_packet_number(),
-                        version=1,
-                        dst_conn_id=1,
-                        src_conn_id=0,
-                    )
-
-                    # logging.info("Sending probe packet")
-                    client.send_packet(probe_packet)
-
-            if client.time_detect:
-                sleep((rtt / 1000000) * client.waiting_time_threshold)
-                probe_packet = QuicInitialPacket(
-                    packet_number=client.get_packet_number(),
-                    version=1,
-                    dst_conn_id=1,
-                    src_conn_id=0,
-                )
-
-                # logging.info("Sending probe packet")
-                client.send_packet(probe_packet)
-                client.resend_lost_packets()
-
-            while True:
-                try:
-                    client.receive_packet()
-                except socket.timeout:
-                    # logging.warning("Reached timeout")
-                    break
+        transfer_file(client, path)
 
         end = default_timer()
-
-        logging.info("Finished sending")
         stop_event.set()
 
     client_hash = md5(path.read_bytes()).hexdigest()
@@ -215,6 +194,192 @@ def run_test(
     return end - start, success, client.packet_count, server_packet_count
 
 
+def run_simulated_test(
+        path: Path,
+        fail_chance: float,
+        ack_threshold: int,
+        server_host="127.0.0.1",
+        server_port=5555,
+        ack_detect=True,
+        time_detect=True,
+        client_seed=random.randrange(sys.maxsize),
+        server_seed=random.randrange(sys.maxsize),
+        latency=25 * MICROSECOND,
+        congestion_control="new_reno",
+        batched_io=False,
+):
+    """
+    Same test as run_test, but over an in-process simulated network in virtual time.
+    The reported time is the simulated transfer time.
+    """
+    simulator = Simulator()
+    network = SimulatedNetwork(simulator)
+
+    server_addr = (server_host, server_port)
+    client_addr = ("127.0.0.1", server_port + 1)
+
+    # Losses come from the unreliable endpoints, as in run_test, so the links only add latency
+    network.link(client_addr, server_addr, latency=latency)
+    network.link(server_addr, client_addr, latency=latency)
+
+    server_sock = network.socket(server_addr)
+
+    with HashingServer(
+            server_host,
+            server_port,
+            fail_chance,
+            ack_threshold,
+            seed=server_seed,
+            clock=simulator,
+            sock=server_sock,
+            batched_io=batched_io,
+    ) as server:
+
+        ack_deadline = None
+
+        def on_datagram():
+            nonlocal ack_deadline
+
+            server.receive_packet()
+
+            # Delayed ACKs fall due between arrivals, so the next one gets a simulator event
+            deadline = server.next_ack_deadline()
+            if deadline is not None and deadline != ack_deadline:
+                ack_deadline = deadline
+                simulator.schedule(deadline, lambda: server.send_due_acks(simulator.now()))
+
+        server_sock.on_datagram = on_datagram
+
+        with UnreliableClient(
+                server_host,
+                server_port,
+                fail_chance,
+                seed=client_seed,
+                package_reordering_threshold=ack_threshold,
+                clock=simulator,
+                congestion_controller=CongestionController.create(congestion_control),
+                sock=network.socket(client_addr),
+                batched_io=batched_io,
+        ) as client:
+
+            client.ack_detect = ack_detect
+            client.time_detect = time_detect
+
+            start = simulator.now()
+            transfer_file(client, path)
+            end = simulator.now()
+
+    client_hash = md5(path.read_bytes()).hexdigest()
+    server_hash = hash_chunks(server, path.stat().st_size)
+
+    success = client_hash == server_hash
+    if not success:
+        logging.error("Hash mismatch!")
+
+    return (end - start) / SECOND, success, client.packet_count, server.packet_count
+
+
+FAIL_CHANCES = [i / 100 for i in range(0, 11)]
+
+DETECTION_MODES = [
+    {
+        "ack_detect": True,
+        "time_detect": True,
+    },
+    {
+        "ack_detect": False,
+        "time_detect": True,
+    },
+    {
+        "ack_detect": True,
+        "time_detect": False,
+    },
+]
+
+# Server port of the current worker process, assigned by init_worker
+worker_port = 5555
+
+
+def get_test_name(ack_detect: bool, time_detect: bool):
+    return ("ack" if ack_detect else "") + \
+        ("_" if ack_detect and time_detect else "") + \
+        ("time" if time_detect else "")
+
+
+def new_results():
+    results = {}
+
+    for test_name in ("ack_time", "ack", "time"):
+        for suffix in ("", "_success", "_client_packets", "_server_packets", "_total_packets"):
+            results[test_name + suffix] = [None] * len(FAIL_CHANCES)
+
+    return results
+
+
+def record_result(results: dict, test_name: str, index: int, result):
+    test_time, success, client_packets, server_packets = result
+
+    results[test_name][index] = test_time
+    results[f"{test_name}_success"][index] = success
+    results[f"{test_name}_client_packets"][index] = client_packets
+    results[f"{test_name}_server_packets"][index] = server_packets
+    results[f"{test_name}_total_packets"][index] = client_packets + server_packets
+
+
+def write_results(output_dir: Path, client_seed, server_seed, results: dict):
+    filename = output_dir / f"{client_seed}_{server_seed}.csv"
+    with filename.open("w", newline="") as f:
+        csvwriter = writer(f)
+
+        csvwriter.writerow(["Test Name"] + FAIL_CHANCES)
+
+        for test_name, times in results.items():
+            csvwriter.writerow([test_name] + times)
+
+    logging.info(filename)
+    logging.info(results)
+
+    return filename
+
+
+def run_case(
+        payload_path: Path,
+        fail_chance: float,
+        ack_threshold: int,
+        client_seed,
+        server_seed,
+        start_event: Event,
+        stop_event: Event,
+        simulate=False,
+        latency=25 * MICROSECOND,
+        server_port=5555,
+        **kwargs,
+):
+    if simulate:
+        return run_simulated_test(
+            payload_path,
+            fail_chance,
+            ack_threshold,
+            server_port=server_port,
+            client_seed=client_seed,
+            server_seed=server_seed,
+            latency=latency,
+            **kwargs,
+        )
+
+    return run_test(
+        payload_path,
+        start_event,
+        stop_event,
+        fail_chance,
+        ack_threshold,
+        server_port=server_port,
+        client_seed=client_seed,
+        server_seed=server_seed,
+        **kwargs,
+    )
+
+
 def main(
         payload_path: Path,
         output_dir: Path,
@@ -223,6 +388,10 @@ def main(
         client_seed=random.randrange(sys.maxsize),
         server_seed=random.randrange(sys.maxsize),
         show_graph=False,
+        simulate=False,
+        latency=25 * MICROSECOND,
+        congestion_control="new_reno",
+        batched_io=False,
 ):
     if client_seed is None:
         client_seed = random.randrange(sys.maxsize)
@@ -231,87 +400,115 @@ def main(
         server_seed = random.randrange(sys.maxsize)
 
     start_event = Event()
-
-    matrix = [
-        {
-            "ack_detect": True,
-            "time_detect": True,
-        },
-        {
-            "ack_detect": False,
-            "time_detect": True,
-        },
-        {
-            "ack_detect": True,
-            "time_detect": False,
-        },
-    ]
-
-    results = {
-        "ack_time": [],
-        "ack_time_success": [],
-        "ack_time_client_packets": [],
-        "ack_time_server_packets": [],
-        "ack_time_total_packets": [],
-        "ack": [],
-        "ack_success": [],
-        "ack_client_packets": [],
-        "ack_server_packets": [],
-        "ack_total_packets": [],
-        "time": [],
-        "time_success": [],
-        "time_client_packets": [],
-        "time_server_packets": [],
-        "time_total_packets": [],
-    }
+    results = new_results()
 
     logging.info(f"{client_seed=}")
     logging.info(f"{server_seed=}")
-    for fail_chance in (i / 100 for i in range(0, 11)):
-        # for fail_chance in (i / 100 for i in range(1, 2)):
-        # if fail_chance != 0:
-        #     continue
-
-        for kwargs in matrix:
-            # if kwargs["time_detect"]:
-            #     continue
-
-            test_name = ("ack" if kwargs["ack_detect"] else "") + \
-                        ("_" if kwargs["ack_detect"] and kwargs["time_detect"] else "") + \
-                        ("time" if kwargs["time_detect"] else "")
+    for index, fail_chance in enumerate(FAIL_CHANCES):
+        for kwargs in DETECTION_MODES:
+            test_name = get_test_name(**kwargs)
             logging.info(f"{fail_chance} {test_name}")
 
-            test_time, success, client_packets, server_packets = run_test(
+            result = run_case(
                 payload_path,
-                start_event,
-                stop_event,
                 fail_chance,
                 ack_threshold,
-                client_seed=client_seed,
-                server_seed=server_seed,
+                client_seed,
+                server_seed,
+                start_event,
+                stop_event,
+                simulate=simulate,
+                latency=latency,
+                congestion_control=congestion_control,
+                batched_io=batched_io,
                 **kwargs,
             )
 
-            results[test_name].append(test_time)
-            results[f"{test_name}_success"].append(success)
-            results[f"{test_name}_client_packets"].append(client_packets)
-            results[f"{test_name}_server_packets"].append(server_packets)
-            results[f"{test_name}_total_packets"].append(client_packets + server_packets)
+            record_result(results, test_name, index, result)
 
-    filename = output_dir / f"{client_seed}_{server_seed}.csv"
-    with filename.open("w", newline="") as f:
-        csvwriter = writer(f)
+    write_results(output_dir, client_seed, server_seed, results)
 
-        csvwriter.writerow(["Test Name"] + [i / 100 for i in range(0, 11)])
 
-        for test_name, times in results.items():
-            csvwriter.writerow([test_name] + times)
+def init_worker(port_queue):
+    global worker_port
+    worker_port = port_queue.get()
+
+
+def run_job(payload_path: Path, fail_chance: float, ack_threshold: int, client_seed, server_seed, simulate, latency, kwargs):
+    # Each worker owns its server port, so real-socket runs in different workers never collide
+    return run_case(
+        payload_path,
+        fail_chance,
+        ack_threshold,
+        client_seed,
+        server_seed,
+        Event(),
+        Event(),
+        simulate=simulate,
+        latency=latency,
+        server_port=worker_port,
+        **kwargs,
+    )
 
-    logging.info(filename)
-    logging.info(results)
 
-    # if show_graph:
-    #     plot_data.main([filename.open()], filename.with_suffix(".png"))
+def main_parallel(
+        payload_path: Path,
+        output_dir: Path,
+        iterations: int,
+        workers: int,
+        ack_threshold=5,
+        client_seed=None,
+        server_seed=None,
+        simulate=False,
+        latency=25 * MICROSECOND,
+        base_port=5555,
+        congestion_control="new_reno",
+        batched_io=False,
+):
+    """
+    Runs every (seeds, fail chance, detection mode) job of all iterations on a process pool
+    and writes one CSV per iteration, laid out as by main.
+    """
+    seeds = [
+        (
+            client_seed if client_seed is not None else random.randrange(sys.maxsize),
+            server_seed if server_seed is not None else random.randrange(sys.maxsize),
+        )
+        for _ in range(iterations)
+    ]
+    results = [new_results() for _ in seeds]
+
+    port_queue = multiprocessing.Queue()
+    for i in range(workers):
+        port_queue.put(base_port + i)
+
+    with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(port_queue,)) as executor:
+        futures = {}
+
+        for iteration, (iteration_client_seed, iteration_server_seed) in enumerate(seeds):
+            for index, fail_chance in enumerate(FAIL_CHANCES):
+                for kwargs in DETECTION_MODES:
+                    future = executor.submit(
+                        run_job,
+                        payload_path,
+                        fail_chance,
+                        ack_threshold,
+                        iteration_client_seed,
+                        iteration_server_seed,
+                        simulate,
+                        latency,
+                        {**kwargs, "congestion_control": congestion_control, "batched_io": batched_io},
+                    )
+                    futures[future] = (iteration, index, get_test_name(**kwargs))
+
+        for future in tqdm(as_completed(futures), total=len(futures)):
+            iteration, index, test_name = futures[future]
+            record_result(results[iteration], test_name, index, future.result())
+
+    return [
+        write_results(output_dir, iteration_client_seed, iteration_server_seed, iteration_results)
+        for (iteration_client_seed, iteration_server_seed), iteration_results in zip(seeds, results)
+    ]
 
 
 if __name__ == "__main__":
@@ -323,6 +520,17 @@ if __name__ == "__main__":
     parser.add_argument("--client-seed", type=int, help="Seed for client. Leave unspecified for random seed")
     parser.add_argument("--server-seed", type=int, help="Seed for server. Leave unspecified for random seed")
     parser.add_argument("--file-logging", action="store_true", default=False, help="Enable logging to file (test_reliability.log)")
+    parser.add_argument("--simulate", action="store_true", default=False, help="Run over a simulated network in virtual time")
+    parser.add_argument("--latency", type=int, default=(d := 25), help=f"One-way latency in microseconds for --simulate (Default: {d})")
+    parser.add_argument(
+        "--congestion-control",
+        choices=sorted(CongestionController._registry),
+        default=(d := "new_reno"),
+        help=f"Congestion control algorithm of the client (Default: {d})",
+    )
+    parser.add_argument("--batched-io", action="store_true", default=False, help="Batch datagrams per syscall with UDP GSO/GRO (Linux)")
+    parser.add_argument("--workers", type=int, default=(d := 1), help=f"Number of worker processes, 0 for one per CPU (Default: {d})")
+    parser.add_argument("--base-port", type=int, default=(d := 5555), help=f"Server port of the first worker, the others count up (Default: {d})")
     parser.add_argument("--show", action="store_true", default=False, help="Show graph after execution (not implemented)")
 
     args = parser.parse_args()
@@ -331,18 +539,41 @@ if __name__ == "__main__":
         logger.addHandler(file_handler)
 
     sys.excepthook = log_exception
-    stop_event = Event()
-    try:
+    workers = args.workers or os.cpu_count()
+
+    if workers > 1:
         with logging_redirect_tqdm():
-            for i in trange(args.iterations):
-                main(
-                    args.payload_path,
-                    args.output_dir,
-                    stop_event,
-                    args.ack_threshold,
-                    client_seed=args.client_seed,
-                    server_seed=args.server_seed,
-                    show_graph=args.show,
-                )
-    except KeyboardInterrupt:
-        stop_event.set()
+            main_parallel(
+                args.payload_path,
+                args.output_dir,
+                args.iterations,
+                workers,
+                args.ack_threshold,
+                client_seed=args.client_seed,
+                server_seed=args.server_seed,
+                simulate=args.simulate,
+                latency=args.latency * MICROSECOND,
+                base_port=args.base_port,
+                congestion_control=args.congestion_control,
+                batched_io=args.batched_io,
+            )
+    else:
+        stop_event = Event()
+        try:
+            with logging_redirect_tqdm():
+                for i in trange(args.iterations):
+                    main(
+                        args.payload_path,
+                        args.output_dir,
+                        stop_event,
+                        args.ack_threshold,
+                        client_seed=args.client_seed,
+                        server_seed=args.server_seed,
+                        show_graph=args.show,
+                        simulate=args.simulate,
+                        latency=args.latency * MICROSECOND,
+                        congestion_control=args.congestion_control,
+                        batched_io=args.batched_io,
+                    )
+        except KeyboardInterrupt:
+            stop_event.set()
@@ -0,0 +1,42 @@
+from quic.clock import SECOND
+
+
+class TransferStats:
+    __slots__ = (
+        "bytes_sent",
+        "packets_sent",
+        "packets_lost",
+        "probes_sent",
+        "start",
+        "end",
+        "smoothed_rtt",
+        "min_rtt",
+    )
+
+    def __init__(self, start: int):
+        # Stream payload bytes, each counted once however often it was retransmitted
+        self.bytes_sent = 0
+
+        # Every packet put on the wire, including retransmissions and probes
+        self.packets_sent = 0
+        self.packets_lost = 0
+        self.probes_sent = 0
+
+        self.start = start
+        self.end = start
+
+        self.smoothed_rtt = 0
+        self.min_rtt = 0
+
+    @property
+    def duration(self) -> int:
+        return self.end - self.start
+
+    @property
+    def throughput(self) -> float:
+        # Bytes per second
+        return self.bytes_sent * SECOND / self.duration if self.duration > 0 else 0.0
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.bytes_sent} bytes in {self.duration / SECOND:.3f}s, " \
+               f"packets_sent={self.packets_sent}, packets_lost={self.packets_lost}, probes_sent={self.probes_sent})"
@@ -1,9 +1,10 @@
-import datetime
 import logging
 import random
 import sys
 
 from quic.client import Client
+from quic.clock import Clock
+from quic.congestion import CongestionController
 from quic.packets.numbered_packet import NumberedPacket
 
 
@@ -15,8 +16,20 @@ class UnreliableClient(Client):
             fail_chance,
             package_reordering_threshold=15,
             seed=random.randrange(sys.maxsize),
+            clock: Clock = None,
+            sock=None,
+            congestion_controller: CongestionController = None,
+            batched_io=False,
     ):
-        super().__init__(server_ip, server_port, package_reordering_threshold=package_reordering_threshold)
+        super().__init__(
+            server_ip,
+            server_port,
+            package_reordering_threshold=package_reordering_threshold,
+            clock=clock,
+            sock=sock,
+            congestion_controller=congestion_controller,
+            batched_io=batched_io,
+        )
 
         self.fail_chance = fail_chance
         self.random = random.Random(seed)
@@ -26,8 +39,7 @@ class UnreliableClient(Client):
     def send_packet(self, packet: NumberedPacket):
         if self.random.random() <= self.fail_chance:
             logging.debug(f"Packet failed with chance {self.fail_chance}")
-            self.unacked_packets[packet.packet_number] = packet
-            self.transmission_times[packet.packet_number] = datetime.datetime.now()
+            self.on_packet_sent(packet, packet.encoded_size())
         else:
             super().send_packet(packet)
             self.packet_count += 1
@@ -2,6 +2,7 @@ import logging
 import random
 import sys
 
+from quic.clock import Clock
 from quic.frames.ack import AckFrame
 from quic.packets.numbered_packet import NumberedPacket
 from quic.server import Server
@@ -15,8 +16,11 @@ class UnreliableServer(Server):
             fail_chance=0,
             ack_threshold=10,
             seed=random.randrange(sys.maxsize),
+            clock: Clock = None,
+            sock=None,
+            batched_io=False,
     ):
-        super().__init__(bind_host, bind_port, ack_threshold=ack_threshold)
+        super().__init__(bind_host, bind_port, ack_threshold=ack_threshold, clock=clock, sock=sock, batched_io=batched_io)
 
         self.fail_chance = fail_chance
         self.random = random.Random(seed)
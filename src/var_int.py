@@ -1,29 +1,97 @@
 from io import BytesIO
-from math import log2, ceil
+from struct import Struct
 
+_STRUCTS = {
+    1: Struct(">B"),
+    2: Struct(">H"),
+    4: Struct(">I"),
+    8: Struct(">Q"),
+}
 
-class VarInt:
-    def __init__(self, value: int):
-        self.value = value
+# Indexed by (value + 1).bit_length(), so that every value strictly below a length's limit uses that length
+_LENGTHS = (1,) * 7 + (2,) * 8 + (4,) * 16 + (8,) * 32
+
+# Per length: struct, two-bit length prefix already shifted into place
+_ENCODERS = tuple(
+    (length, _STRUCTS[length], (length.bit_length() - 1) << (length * 8 - 2))
+    for length in _LENGTHS
+)
+
+# Per two-bit prefix: length, struct, mask that strips the prefix
+_DECODERS = tuple(
+    (length, _STRUCTS[length], (1 << (length * 8 - 2)) - 1)
+    for length in (1, 2, 4, 8)
+)
+
+
+def _too_large(value: int) -> ValueError:
+    return ValueError(f"Value {value} is too large for a variable-length integer")
+
+
+def varint_length(value: int) -> int:
+    try:
+        return _LENGTHS[(value + 1).bit_length()]
+    except IndexError:
+        raise _too_large(value) from None
+
+
+def encode_varint(value: int, buf, offset: int) -> int:
+    try:
+        length, struct, prefix = _ENCODERS[(value + 1).bit_length()]
+    except IndexError:
+        raise _too_large(value) from None
+
+    struct.pack_into(buf, offset, prefix | value)
+
+    return offset + length
+
+
+def decode_varint(buf, offset: int) -> tuple[int, int]:
+    first_byte = buf[offset]
 
-        if self.value < 0x3fffffffffffffff:
-            self.length = 8
+    if first_byte < 0x40:
+        return first_byte, offset + 1
 
-        if self.value < 0x3fffffff:
-            self.length = 4
+    length, struct, mask = _DECODERS[first_byte >> 6]
 
-        if self.value < 0x3fff:
-            self.length = 2
+    return struct.unpack_from(buf, offset)[0] & mask, offset + length
 
-        if self.value < 0x3f:
-            self.length = 1
+
+def encode_many(values, buf, offset: int) -> int:
+    # The table lookup fails past the largest length, as in encode_varint
+    try:
+        for value in values:
+            length, struct, prefix = _ENCODERS[(value + 1).bit_length()]
+            struct.pack_into(buf, offset, prefix | value)
+            offset += length
+    except IndexError:
+        raise _too_large(value) from None
+
+    return offset
+
+
+def decode_many(buf, offset: int, count: int) -> tuple[list[int], int]:
+    values = []
+
+    for _ in range(count):
+        first_byte = buf[offset]
+        length, struct, mask = _DECODERS[first_byte >> 6]
+        values.append(struct.unpack_from(buf, offset)[0] & mask)
+        offset += length
+
+    return values, offset
+
+
+class VarInt:
+    def __init__(self, value: int):
+        self.value = value
+        self.length = varint_length(value)
 
     def to_bytes(self):
-        msb2 = int(log2(self.length))
-        value = (msb2 << (self.length * 8 - 2)) | self.value
-        if self.length < 0:
-            print("NEGATIVE LENGTH", self.length)
-        return value.to_bytes(self.length)
+        buffer = bytearray(self.length)
+        encode_varint(self.value, buffer, 0)
+
+        return bytes(buffer)
 
     def __repr__(self):
         return f"{self.__class__.__name__}({self.value})"
@@ -45,14 +113,18 @@ class VarInt:
 
     @classmethod
     def from_bytes(cls, buffer: BytesIO):
-        first_byte = int.from_bytes(buffer.read(1))
-        msb2 = first_byte >> 6
-        length = 2 ** msb2
-        value_head = (first_byte & 0b00111111) << ((length - 1) * 8)
-        value = value_head | int.from_bytes(buffer.read(length - 1))
+        first_byte = buffer.read(1)
+        length = 1 << (first_byte[0] >> 6)
+        value, _ = decode_varint(first_byte + buffer.read(length - 1), 0)
 
         return cls(value)
 
+    @classmethod
+    def from_buffer(cls, buffer: memoryview, offset: int):
+        value, offset = decode_varint(buffer, offset)
+
+        return cls(value), offset
+
     @classmethod
     def length_of(cls, value: int):
-        return VarInt(ceil(value.bit_length() / 8))
+        return VarInt((value.bit_length() + 7) // 8)
@@ -0,0 +1,58 @@
+import asyncio
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import IsolatedAsyncioTestCase
+
+from quic.async_client import AsyncClient
+from quic.async_server import AsyncServer
+from quic.clock import SECOND
+
+
+class LossyAsyncClient(AsyncClient):
+    def send_packet(self, packet):
+        # Every seventh packet is lost on the way out
+        if packet.packet_number % 7 == 3:
+            end = packet.serialize_into(self._send_buffer, 0)
+            self.on_packet_sent(packet, end)
+        else:
+            super().send_packet(packet)
+
+
+class TestAsyncClient(IsolatedAsyncioTestCase):
+    async def transfer(self, data: bytes, client_class=AsyncClient, **kwargs):
+        async with AsyncServer("127.0.0.1", 0, ack_threshold=10) as server:
+            async def receive():
+                async for stream in server.accept_streams():
+                    return await stream.read()
+
+            receiver = asyncio.create_task(receive())
+
+            with TemporaryDirectory() as directory:
+                path = Path(directory) / "payload"
+                path.write_bytes(data)
+
+                async with client_class(*server.address) as client:
+                    stats = await asyncio.wait_for(client.send_file(path, **kwargs), 10)
+
+            received = await asyncio.wait_for(receiver, 1)
+
+        return client, stats, received
+
+    async def test_send_file(self):
+        data = bytes(range(256)) * 1000
+        client, stats, received = await self.transfer(data)
+
+        self.assertEqual(data, received)
+        self.assertEqual(len(data), stats.bytes_sent)
+        self.assertEqual(0, len(client.sent_packets))
+        self.assertLess(stats.duration, 10 * SECOND)
+
+    async def test_send_file_with_loss(self):
+        data = bytes(range(256)) * 200
+        client, stats, received = await self.transfer(data, LossyAsyncClient, max_in_flight=20)
+
+        self.assertEqual(data, received)
+        self.assertGreater(stats.packets_lost, 0)
+
+        # Packets are filled up to max_datagram_size rather than carrying one chunk each
+        self.assertLessEqual(stats.packets_sent - stats.packets_lost - stats.probes_sent, len(data) // 1400 + 1)
@@ -0,0 +1,76 @@
+import asyncio
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import IsolatedAsyncioTestCase
+
+from quic.async_client import AsyncClient
+from quic.async_server import AsyncServer
+from quic.clock import MILLISECOND, SECOND
+from quic.frames.stream import StreamFrame
+
+
+class TestAsyncServer(IsolatedAsyncioTestCase):
+    async def test_delayed_ack(self):
+        async with AsyncServer("127.0.0.1", 0, ack_threshold=10, max_ack_delay=20 * MILLISECOND) as server, \
+                AsyncClient(*server.address) as client:
+            frame = StreamFrame(0, offset=0, include_length=True, data=b"data")
+            client.send_packet(client.create_packet([frame]))
+
+            # A single packet stays below the ACK threshold, so the timer acknowledges it
+            while len(client.sent_packets) > 0:
+                await asyncio.sleep(MILLISECOND / SECOND)
+
+            self.assertGreaterEqual(client.latest_rtt, 20 * MILLISECOND)
+            self.assertIsNone(server.next_ack_deadline())
+
+    async def test_streams_in_order(self):
+        async with AsyncServer("127.0.0.1", 0) as server, AsyncClient(*server.address) as client:
+            frames = [
+                StreamFrame(1, offset=4, include_length=True, finish=True, data=b"efgh"),
+                StreamFrame(0, offset=0, include_length=True, data=b"0123"),
+                StreamFrame(1, offset=0, include_length=True, data=b"abcd"),
+                StreamFrame(1, offset=0, include_length=True, data=b"abcd"),
+                StreamFrame(0, offset=4, include_length=True, finish=True, data=b""),
+            ]
+
+            for frame in frames:
+                client.send_packet(client.create_packet([frame]))
+
+            streams = {}
+            async for stream in server.accept_streams():
+                streams[stream.stream_id] = await asyncio.wait_for(stream.read(), 1)
+                if len(streams) == 2:
+                    break
+
+        self.assertEqual({0: b"0123", 1: b"abcdefgh"}, streams)
+
+    async def test_concurrent_clients(self):
+        payloads = [bytes([i]) * 50_000 for i in range(4)]
+        received = {}
+
+        async with AsyncServer("127.0.0.1", 0) as server:
+            async def receive():
+                async for stream in server.accept_streams():
+                    received[stream.addr] = await stream.read()
+                    if len(received) == len(payloads):
+                        return
+
+            async def send(path: Path):
+                async with AsyncClient(*server.address) as client:
+                    await client.send_file(path)
+                    return client._transport.get_extra_info("sockname")
+
+            receiver = asyncio.create_task(receive())
+
+            with TemporaryDirectory() as directory:
+                paths = []
+                for i, payload in enumerate(payloads):
+                    paths.append(Path(directory) / str(i))
+                    paths[-1].write_bytes(payload)
+
+                addrs = await asyncio.wait_for(asyncio.gather(*map(send, paths)), 10)
+
+            await asyncio.wait_for(receiver, 1)
+
+        self.assertEqual(dict(zip(addrs, payloads)), received)
+        self.assertEqual(len(payloads), len(server.connections))
@@ -1,12 +1,21 @@
+import io
+import math
 import unittest
-from datetime import datetime, timedelta
 from pathlib import Path
+from tempfile import TemporaryDirectory
 from unittest import TestCase
-from unittest.mock import MagicMock, mock_open, patch
+from unittest.mock import MagicMock, patch
 
 from quic.client import Client
+from quic.clock import MICROSECOND, MILLISECOND, SECOND, VirtualClock
+from quic.frames.ack import AckFrame
+from quic.frames.immediate_ack import ImmediateAckFrame
 from quic.frames.stream import StreamFrame
 from quic.packets.initial import QuicInitialPacket
+from quic.sent_packets import SentPacket, StreamRange
+from quic.server import Server
+from quic.simulator import SimulatedNetwork, Simulator
+from quic.stream_reassembler import StreamReassembler
 
 
 class TestClient(TestCase):
@@ -30,37 +39,39 @@ class TestClient(TestCase):
             src_conn_id=1,
             dst_conn_id=2,
         )
-        with patch("socket.socket"), Client("", 0) as c:
+        clock = VirtualClock(5 * SECOND)
+        with patch("socket.socket"), Client("", 0, clock=clock) as c:
             c.send_packet(packet)
-            assert c.unacked_packets[packet.packet_number] == packet
-            assert datetime.now() - c.transmission_times[packet.packet_number] < timedelta(seconds=1)
+            sent_packet = c.sent_packets.get(packet.packet_number)
+            assert sent_packet.stream_ranges == ()
+            assert sent_packet.size == packet.encoded_size()
+            assert not sent_packet.ack_eliciting
+            assert sent_packet.time_sent == clock.now()
 
     def test_is_lost(self):
         # use epoch as a default date. https://xkcd.com/2676
-        epoch = datetime(year=1970, month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
+        epoch = 0
         with patch("socket.socket"), Client("", 0) as c:
             c.ack_detect, c.time_detect, c.largest_acked = True, False, 16
             assert c.is_lost(packet_number=1)
             assert not c.is_lost(packet_number=2)
-            c.ack_detect, c.time_detect, c.smoothed_rtt, c.latest_rtt = False, True, 1000, 1000
-            c.last_ack_time = epoch + timedelta(seconds=2)
-            c.transmission_times = {
-                1: epoch + timedelta(seconds=2) - timedelta(seconds=1),
-                2: epoch + timedelta(seconds=2)
-            }
+            c.ack_detect, c.time_detect, c.smoothed_rtt, c.latest_rtt = False, True, MILLISECOND, MILLISECOND
+            c.last_ack_time = epoch + 2 * SECOND
+            c.sent_packets.add(SentPacket(1, epoch + 2 * SECOND - SECOND, 0, True, None))
+            c.sent_packets.add(SentPacket(2, epoch + 2 * SECOND, 0, True, None))
             assert c.is_lost(packet_number=1)
             assert not c.is_lost(packet_number=2)
 
-    @patch("pathlib.Path.stat")
-    @patch("pathlib.Path.open", new_callable=mock_open, read_data=b"A" * 5000)
-    def test_chunkify_file_no_remainder(self, mock_file, mock_stat):
-        mock_stat.return_value = MagicMock()
-        mock_stat.return_value.st_size = 5000
-        path = Path("/fake/path")
-        file_handle = mock_file.return_value.__enter__.return_value
-        file_handle.tell.side_effect = [0, 1000, 2000, 3000, 4000]
-        client = Client("", 0)
-        client.get_stream_id = MagicMock(return_value=1)
+    def chunkify(self, data: bytes):
+        with TemporaryDirectory() as directory:
+            path = Path(directory) / "payload"
+            path.write_bytes(data)
+
+            client = Client("", 0)
+            client.get_stream_id = MagicMock(return_value=1)
+            return list(client.chunkify_file(path, chunk_size=1000))
+
+    def test_chunkify_file_no_remainder(self):
         expected_chunks = [
             StreamFrame(1, include_length=True, offset=0, finish=False, data=b"A" * 1000),
             StreamFrame(1, include_length=True, offset=1000, finish=False, data=b"A" * 1000),
@@ -68,7 +79,7 @@ class TestClient(TestCase):
             StreamFrame(1, include_length=True, offset=3000, finish=False, data=b"A" * 1000),
             StreamFrame(1, include_length=True, offset=4000, finish=True, data=b"A" * 1000),
         ]
-        chunks = list(client.chunkify_file(path, chunk_size=1000))
+        chunks = self.chunkify(b"A" * 5000)
         self.assertEqual(len(expected_chunks), len(chunks))
         for chunk, expected in zip(chunks, expected_chunks):
             self.assertEqual(expected.stream_id, chunk.stream_id)
@@ -76,22 +87,13 @@ class TestClient(TestCase):
             self.assertEqual(expected.finish, chunk.finish)
             self.assertEqual(expected.data, chunk.data)
 
-    @patch("pathlib.Path.stat")
-    @patch("pathlib.Path.open", new_callable=mock_open, read_data=b"A" * 2500)
-    def test_chunkify_file_with_remainder(self, mock_file, mock_stat):
-        mock_stat.return_value = MagicMock()
-        mock_stat.return_value.st_size = 2500
-        path = Path("/fake/path")
-        file_handle = mock_file.return_value.__enter__.return_value
-        file_handle.tell.side_effect = [0, 1000, 2000]
-        client = Client("", 0)
-        client.get_stream_id = MagicMock(return_value=1)
+    def test_chunkify_file_with_remainder(self):
         expected_chunks = [
             StreamFrame(1, include_length=True, offset=0, finish=False, data=b"A" * 1000),
             StreamFrame(1, include_length=True, offset=1000, finish=False, data=b"A" * 1000),
             StreamFrame(1, include_length=True, offset=2000, finish=True, data=b"A" * 500)
         ]
-        chunks = list(client.chunkify_file(path, chunk_size=1000))
+        chunks = self.chunkify(b"A" * 2500)
         self.assertEqual(len(expected_chunks), len(chunks))
         for chunk, expected in zip(chunks, expected_chunks):
             self.assertEqual(expected.stream_id, chunk.stream_id)
@@ -99,44 +101,268 @@ class TestClient(TestCase):
             self.assertEqual(expected.finish, chunk.finish)
             self.assertEqual(expected.data, chunk.data)
 
-    @patch("pathlib.Path.stat")
-    @patch("pathlib.Path.open", new_callable=mock_open, read_data=b"")
-    def test_chunkify_file_empty(self, mock_file, mock_stat):
-        mock_stat.return_value = MagicMock()
-        mock_stat.return_value.st_size = 0
-        path = Path("/fake/path")
-        file_handle = mock_file.return_value.__enter__.return_value
-        file_handle.tell.side_effect = [0]
-        client = Client("", 0)
-        client.get_stream_id = MagicMock(return_value=1)
-        chunks = list(client.chunkify_file(path, chunk_size=1000))
+    def test_chunkify_file_empty(self):
+        chunks = self.chunkify(b"")
         self.assertEqual(0, len(chunks))
 
+    def test_chunkify_file_maps_file(self):
+        chunks = self.chunkify(bytes(range(250)) * 8)
+
+        # Frames are views of one mapping of the file, which outlives the file handle
+        self.assertIsInstance(chunks[0].data, memoryview)
+        self.assertIs(chunks[0].data.obj, chunks[1].data.obj)
+        self.assertEqual(bytes(range(250)) * 4, bytes(chunks[1].data))
+
     def test_resend_lost_packets(self):
-        epoch = datetime(year=1970, month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
-        c = Client('', 0)
-        c.get_packet_number = MagicMock(return_value=1)
+        epoch = 0
         with patch("socket.socket"), Client("", 0) as c:
-            c.unacked_packets = {
-                1: MagicMock(packet_number=1),
-                2: MagicMock(packet_number=2),
-                3: MagicMock(packet_number=3),
-            }
-            c.transmission_times = {
-                1: epoch,
-                2: epoch,
-                3: epoch
-            }
+            stream = c.open_stream(bytes(range(250)), chunk_size=100)
+            ranges = [StreamRange(stream.stream_id, 0, 100, False), StreamRange(stream.stream_id, 100, 100, False)]
+            c.sent_packets.add(SentPacket(1, epoch, 0, True, (ranges[0],)))
+            c.sent_packets.add(SentPacket(2, epoch, 0, True, (ranges[1],)))
+            c.sent_packets.add(SentPacket(3, epoch, 0, True))
             c.largest_acked = 3
             c.package_reordering_threshold = 1
             c.ack_detect = True
             c.time_detect = False
             c.get_packet_number = MagicMock(side_effect=[4, 5, 6])
-            lost_packets = c.resend_lost_packets()
-            self.assertEqual(2, len(lost_packets))
-            self.assertIn(1, lost_packets)
-            self.assertIn(2, lost_packets)
-            self.assertEqual(c.unacked_packets[4], lost_packets[1])
-            self.assertEqual(c.unacked_packets[5], lost_packets[2])
-            self.assertEqual(4, lost_packets[1].packet_number)
-            self.assertEqual(5, lost_packets[2].packet_number)
+            resent = c.resend_lost_packets()
+            self.assertEqual([4], [packet.packet_number for packet in resent])
+            self.assertNotIn(1, c.sent_packets)
+            self.assertNotIn(2, c.sent_packets)
+
+            # Too little data is left to fill another packet, so the server is asked to ACK this one right away
+            self.assertIsInstance(resent[0].frames[0], ImmediateAckFrame)
+
+            # The lost ranges are framed again from the stream's data and packed into one new packet,
+            # whose last frame runs to the end of the packet
+            frames = resent[0].frames[1:]
+            self.assertEqual([bytes(range(100)), bytes(range(100, 200))], [bytes(frame.data) for frame in frames])
+            self.assertEqual([True, False], [frame.include_length for frame in frames])
+            self.assertEqual(tuple(ranges), c.sent_packets.get(4).stream_ranges)
+            self.assertFalse(stream.retransmit)
+
+    def test_receive_multi_range_ack(self):
+        ack = AckFrame.from_ranges([(5, 6), (0, 2)])
+        response = QuicInitialPacket(packet_number=0, version=1, src_conn_id=1, dst_conn_id=0, frames=[ack])
+        with patch("socket.socket"), Client("", 0) as c:
+            c.time_detect = False
+            c.package_reordering_threshold = 10
+            for _ in range(8):
+                c.send_packet(QuicInitialPacket(
+                    packet_number=c.get_packet_number(),
+                    version=1,
+                    src_conn_id=0,
+                    dst_conn_id=1,
+                ))
+            c._sock.recvfrom.return_value = (response.to_bytes(), ("", 0))
+            c.receive_packet()
+            self.assertEqual([3, 4, 7], [sent_packet.packet_number for sent_packet in c.sent_packets])
+            self.assertEqual(6, c.largest_acked)
+
+    def test_detect_lost_packets(self):
+        epoch = 0
+        with patch("socket.socket"), Client("", 0) as c:
+            c.ack_detect, c.time_detect, c.smoothed_rtt, c.latest_rtt = False, True, MILLISECOND, MILLISECOND
+            c.sent_packets.add(SentPacket(1, epoch, 0, True, None))
+            c.sent_packets.add(SentPacket(2, epoch + 10 * MILLISECOND, 0, True, None))
+            c.sent_packets.add(SentPacket(3, epoch + 10 * MILLISECOND, 0, True, None))
+            c.last_ack_time = epoch + 5 * MILLISECOND
+
+            lost = c.detect_lost_packets()
+            self.assertEqual([1], [sent_packet.packet_number for sent_packet in lost])
+            self.assertEqual(epoch + 10 * MILLISECOND + c.loss_delay(), c.loss_time)
+            self.assertEqual([2, 3], [sent_packet.packet_number for sent_packet in c.sent_packets])
+
+            lost = c.detect_lost_packets(now=c.loss_time + MICROSECOND)
+            self.assertEqual([2, 3], [sent_packet.packet_number for sent_packet in lost])
+            self.assertIsNone(c.loss_time)
+
+    def test_rtt_sample(self):
+        clock = VirtualClock()
+        frame = StreamFrame(0, include_length=True, offset=0, data=b"A")
+        with patch("socket.socket"), Client("", 0, clock=clock) as c:
+            for _ in range(2):
+                c.send_packet(QuicInitialPacket(
+                    packet_number=c.get_packet_number(),
+                    version=1,
+                    src_conn_id=0,
+                    dst_conn_id=1,
+                    frames=[frame],
+                ))
+
+            # RTT samples longer than a second are not truncated
+            clock.advance(3 * SECOND)
+            c.on_ack_frame(AckFrame(largest_acknowledged=0))
+            self.assertEqual(3 * SECOND, c.latest_rtt)
+            self.assertEqual(3 * SECOND, c.smoothed_rtt)
+            self.assertEqual(3 * SECOND, c.min_rtt)
+
+            clock.advance(SECOND)
+            c.on_ack_frame(AckFrame(largest_acknowledged=1))
+            self.assertEqual(4 * SECOND, c.latest_rtt)
+            self.assertEqual((7 * 3 * SECOND + 4 * SECOND) // 8, c.smoothed_rtt)
+            self.assertEqual((3 * (3 * SECOND // 2) + SECOND) // 4, c.rttvar)
+
+            # Acknowledging the same packet again gives no new sample
+            clock.advance(SECOND)
+            c.on_ack_frame(AckFrame(largest_acknowledged=1))
+            self.assertEqual(4 * SECOND, c.latest_rtt)
+
+    def test_ack_delay(self):
+        clock = VirtualClock()
+        frame = StreamFrame(0, include_length=True, offset=0, data=b"A")
+        with patch("socket.socket"), Client("", 0, clock=clock) as c:
+            for _ in range(2):
+                c.send_packet(c.create_packet([frame]))
+
+            clock.advance(10 * MILLISECOND)
+            c.on_ack_frame(AckFrame(largest_acknowledged=0))
+
+            # The time the server held back the ACK is taken out of the sample
+            clock.advance(20 * MILLISECOND)
+            c.on_ack_frame(AckFrame(largest_acknowledged=1, ack_delay=20 * MILLISECOND // MICROSECOND >> 3))
+            self.assertEqual(30 * MILLISECOND, c.latest_rtt)
+            self.assertEqual(10 * MILLISECOND, c.smoothed_rtt)
+
+            # But never more than max_ack_delay of it
+            self.assertEqual(c.max_ack_delay, c.decode_ack_delay(AckFrame(largest_acknowledged=1, ack_delay=10 ** 6)))
+
+    def test_probe_timeout(self):
+        clock = VirtualClock()
+        frame = StreamFrame(0, include_length=True, offset=0, data=b"A")
+        with patch("socket.socket"), Client("", 0, clock=clock) as c:
+            c.time_detect = False
+            self.assertIsNone(c.next_timeout())
+
+            c.send_packet(c.create_packet([frame]))
+            self.assertEqual(c.pto_duration(), c.next_timeout())
+            self.assertEqual(c.sent_packets.get(0).size, c.congestion_controller.bytes_in_flight)
+
+            c.on_timeout()
+            self.assertEqual(1, len(c.sent_packets))
+
+            # Two probes go out when the timer fires, and the next timer is backed off. The probes ask for an
+            # immediate ACK, so it does not wait for a delayed one
+            clock.advance(c.pto_duration())
+            c.on_timeout()
+            self.assertEqual(3, len(c.sent_packets))
+            self.assertEqual(1, c.pto_count)
+            self.assertEqual(clock.now() + 2 * c.pto_duration(max_ack_delay=False), c.next_timeout())
+
+            c.on_ack_frame(AckFrame(largest_acknowledged=2, first_ack_range=2))
+            self.assertEqual(0, c.pto_count)
+            self.assertEqual(0, c.congestion_controller.bytes_in_flight)
+            self.assertIsNone(c.next_timeout())
+
+    def test_send_stream(self):
+        simulator = Simulator()
+        network = SimulatedNetwork(simulator)
+        client_addr, server_addr = ("127.0.0.1", 6000), ("127.0.0.1", 5555)
+        link = network.link(client_addr, server_addr, latency=MILLISECOND, loss=0.1, seed=1)
+        network.link(server_addr, client_addr, latency=MILLISECOND)
+
+        server_sock = network.socket(server_addr)
+        received = io.BytesIO()
+        reassembler = StreamReassembler(received)
+
+        def on_datagram():
+            packet, _ = server.receive_packet()
+            for frame in packet.frames:
+                if isinstance(frame, StreamFrame):
+                    reassembler.on_stream_frame(frame)
+
+        data = b"".join(bytes([i]) * 100 for i in range(200))
+
+        with Server(*server_addr, ack_threshold=3, clock=simulator, sock=server_sock) as server, \
+                Client(*server_addr, clock=simulator, sock=network.socket(client_addr)) as c:
+            server_sock.on_datagram = on_datagram
+
+            stats = c.send_stream(data, chunk_size=100, max_in_flight=20)
+
+            self.assertEqual(data, received.getvalue())
+            self.assertTrue(reassembler.finished)
+            self.assertEqual({}, c.streams)
+            self.assertEqual(20000, stats.bytes_sent)
+            self.assertEqual(link.sent, stats.packets_sent)
+            self.assertGreater(stats.packets_lost, 0)
+            self.assertEqual(simulator.now(), stats.end)
+            self.assertEqual(stats.bytes_sent * SECOND / stats.duration, stats.throughput)
+
+    def test_send_file_window(self):
+        simulator = Simulator()
+        network = SimulatedNetwork(simulator)
+        client_addr, server_addr = ("127.0.0.1", 6000), ("127.0.0.1", 5555)
+        network.link(client_addr, server_addr, latency=MILLISECOND)
+        network.link(server_addr, client_addr, latency=MILLISECOND)
+
+        server_sock = network.socket(server_addr)
+        in_flight = []
+
+        with TemporaryDirectory() as directory, \
+                Server(*server_addr, ack_threshold=2, clock=simulator, sock=server_sock) as server, \
+                Client(*server_addr, clock=simulator, sock=network.socket(client_addr)) as c:
+            server_sock.on_datagram = server.receive_packet
+
+            path = Path(directory) / "payload"
+            # Eleven full packets
+            path.write_bytes(bytes(15500))
+
+            send_packet = c.send_packet
+
+            def record_send(packet):
+                send_packet(packet)
+                in_flight.append(len(c.sent_packets))
+
+            c.send_packet = record_send
+            stats = c.send_file(path, max_in_flight=4)
+
+        self.assertEqual(15500, stats.bytes_sent)
+        # The server ACKs every second packet, but the eleventh ends the stream, so it is acknowledged without probing
+        self.assertEqual(0, stats.probes_sent)
+        self.assertEqual(11, stats.packets_sent)
+        self.assertEqual(4, max(in_flight))
+
+    def test_path_mtu_discovery(self):
+        simulator = Simulator()
+        network = SimulatedNetwork(simulator)
+        client_addr, server_addr = ("127.0.0.1", 6000), ("127.0.0.1", 5555)
+        link = network.link(client_addr, server_addr, latency=MILLISECOND, mtu=9000)
+        network.link(server_addr, client_addr, latency=MILLISECOND)
+
+        server_sock = network.socket(server_addr)
+        received = io.BytesIO()
+        reassembler = StreamReassembler(received)
+
+        def on_datagram():
+            packet, _ = server.receive_packet()
+            for frame in packet.frames:
+                if isinstance(frame, StreamFrame):
+                    reassembler.on_stream_frame(frame)
+
+        data = bytes(range(256)) * 8000
+        client_sock = network.socket(client_addr)
+
+        # The server keeps its default receive size, which takes probes up to any size the client searches
+        with Server(*server_addr, ack_threshold=2, clock=simulator, sock=server_sock) as server, \
+                Client(*server_addr, clock=simulator, sock=client_sock, pmtu_discovery=True, max_udp_payload_size=9100) as c:
+            server_sock.on_datagram = on_datagram
+            # Datagrams up to the limit of the search are received while probing
+            self.assertEqual(9100, c.receive_size)
+
+            stats = c.send_stream(data)
+
+        self.assertEqual(data, received.getvalue())
+        self.assertTrue(8900 < c.max_datagram_size <= 9000)
+        self.assertEqual(c.max_datagram_size, c.congestion_controller.max_datagram_size)
+        self.assertLess(stats.packets_sent, len(data) // 4000)
+
+        # Only probes above the link MTU were lost, and their loss did not shrink the congestion window
+        self.assertEqual(link.dropped, stats.packets_lost)
+        self.assertGreater(stats.packets_lost, 0)
+        self.assertEqual(math.inf, c.congestion_controller.ssthresh)
+
+    def test_receive_size(self):
+        c = Client("", 0, max_datagram_size=1200)
+
+        self.assertEqual(1200, c.receive_size)
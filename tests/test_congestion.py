@@ -0,0 +1,160 @@
+from heapq import heappop, heappush
+from unittest import TestCase
+
+from quic.clock import MILLISECOND, SECOND
+from quic.congestion import CongestionController
+from quic.congestion.bbr import BBR, PROBE_BW, STARTUP
+from quic.congestion.delivery_rate import DeliveryRateEstimator
+from quic.congestion.new_reno import NewReno
+from quic.sent_packets import SentPacket
+
+
+def sent(packet_number, time_sent=0, size=1000, ack_eliciting=True):
+    return SentPacket(packet_number, time_sent, size, ack_eliciting, None)
+
+
+def drive(cc: CongestionController, rate: int, rtt: int, duration: int, lose_every=None):
+    # Sends whenever the window allows through a bottleneck of rate bytes per second,
+    # and acknowledges every packet one round trip after it leaves the bottleneck
+    now = 0
+    packet_number = 0
+    busy_until = 0
+    in_flight = []
+
+    while now < duration:
+        while cc.can_send():
+            sent_packet = sent(packet_number, time_sent=now)
+            cc.on_packet_sent(sent_packet)
+
+            busy_until = max(busy_until, now) + sent_packet.size * SECOND // rate
+            heappush(in_flight, (busy_until + rtt, packet_number, sent_packet))
+            packet_number += 1
+
+        now, _, sent_packet = heappop(in_flight)
+
+        if lose_every is not None and sent_packet.packet_number % lose_every == 0:
+            cc.on_packets_lost([sent_packet], now)
+        else:
+            cc.on_packets_acked([sent_packet], now)
+
+
+class TestNewReno(TestCase):
+    def test_create(self):
+        self.assertIsInstance(CongestionController.create("new_reno", max_datagram_size=1200), NewReno)
+
+        with self.assertRaises(ValueError):
+            CongestionController.create("unknown")
+
+    def test_bytes_in_flight(self):
+        cc = NewReno()
+        self.assertEqual(14720, cc.congestion_window)
+
+        cc.on_packet_sent(sent(0))
+        cc.on_packet_sent(sent(1, ack_eliciting=False))
+        self.assertEqual(1000, cc.bytes_in_flight)
+
+        for packet_number in range(2, 15):
+            cc.on_packet_sent(sent(packet_number))
+
+        self.assertTrue(cc.can_send())
+        cc.on_packet_sent(sent(15))
+        self.assertFalse(cc.can_send())
+
+        cc.on_packets_acked([sent(0), sent(1, ack_eliciting=False)], MILLISECOND)
+        self.assertEqual(14000, cc.bytes_in_flight)
+        self.assertTrue(cc.can_send())
+
+    def test_slow_start_and_congestion_avoidance(self):
+        cc = NewReno()
+        cc.on_packet_sent(sent(0))
+        cc.on_packets_acked([sent(0)], MILLISECOND)
+        self.assertEqual(14720 + 1000, cc.congestion_window)
+
+        cc.ssthresh = cc.congestion_window
+        cc.on_packet_sent(sent(1))
+        cc.on_packets_acked([sent(1)], 2 * MILLISECOND)
+        self.assertEqual(15720 + 1500 * 1000 // 15720, cc.congestion_window)
+
+    def test_recovery_period(self):
+        cc = NewReno()
+        for packet_number in range(4):
+            cc.on_packet_sent(sent(packet_number, time_sent=packet_number * MILLISECOND))
+
+        cc.on_packets_lost([sent(0, time_sent=0)], 10 * MILLISECOND)
+        self.assertEqual(14720 // 2, cc.congestion_window)
+        self.assertEqual(14720 // 2, cc.ssthresh)
+        self.assertEqual(3000, cc.bytes_in_flight)
+
+        # Losses and ACKs of packets sent before the recovery period started change nothing
+        cc.on_packets_lost([sent(1, time_sent=MILLISECOND)], 11 * MILLISECOND)
+        cc.on_packets_acked([sent(2, time_sent=2 * MILLISECOND)], 12 * MILLISECOND)
+        self.assertEqual(14720 // 2, cc.congestion_window)
+        self.assertEqual(1000, cc.bytes_in_flight)
+
+        # A loss of a packet sent after it starts a new one
+        cc.on_packet_sent(sent(4, time_sent=20 * MILLISECOND))
+        cc.on_packets_lost([sent(4, time_sent=20 * MILLISECOND)], 30 * MILLISECOND)
+        self.assertEqual(14720 // 4, cc.congestion_window)
+
+    def test_persistent_congestion(self):
+        cc = NewReno()
+        cc.on_packet_sent(sent(0))
+        cc.on_packets_lost([sent(0)], 10 * MILLISECOND, persistent_congestion=True)
+
+        self.assertEqual(cc.minimum_window, cc.congestion_window)
+        self.assertIsNone(cc.congestion_recovery_start_time)
+
+
+class TestDeliveryRateEstimator(TestCase):
+    def test_sample(self):
+        estimator = DeliveryRateEstimator()
+        self.assertIsNone(estimator.generate_sample(0))
+
+        packets = [sent(packet_number) for packet_number in range(10)]
+        for bytes_in_flight, sent_packet in enumerate(packets):
+            estimator.on_packet_sent(sent_packet, bytes_in_flight * 1000)
+
+        for sent_packet in packets:
+            estimator.on_packet_acked(sent_packet, 20 * MILLISECOND)
+
+        sample = estimator.generate_sample(20 * MILLISECOND)
+        self.assertEqual(10000, sample.delivered)
+        self.assertEqual(20 * MILLISECOND, sample.interval)
+        self.assertEqual(20 * MILLISECOND, sample.rtt)
+        self.assertEqual(500_000, sample.delivery_rate)
+        self.assertIsNone(estimator.generate_sample(20 * MILLISECOND))
+
+
+class TestBBR(TestCase):
+    def test_create(self):
+        self.assertIsInstance(CongestionController.create("bbr"), BBR)
+
+    def test_converges_to_bottleneck(self):
+        cc = BBR(seed=1)
+        self.assertEqual(STARTUP, cc.state)
+
+        drive(cc, 1_250_000, 10 * MILLISECOND, 2 * SECOND)
+
+        self.assertTrue(cc.filled_pipe)
+        self.assertEqual(PROBE_BW, cc.state)
+        self.assertAlmostEqual(1_250_000, cc.btl_bw, delta=125_000)
+        self.assertAlmostEqual(10 * MILLISECOND, cc.rt_prop, delta=MILLISECOND)
+        self.assertEqual(int(cc.pacing_gain * cc.btl_bw), cc.pacing_rate)
+
+    def test_random_loss(self):
+        bbr, new_reno = BBR(seed=1), NewReno()
+
+        for cc in (bbr, new_reno):
+            drive(cc, 1_250_000, 10 * MILLISECOND, 2 * SECOND, lose_every=20)
+
+        # Losing every 20th packet barely changes the model, while NewReno keeps halving its window
+        self.assertAlmostEqual(1_250_000, bbr.btl_bw, delta=250_000)
+        self.assertGreaterEqual(bbr.congestion_window, bbr.bdp())
+        self.assertLess(new_reno.congestion_window, bbr.bdp())
+
+    def test_persistent_congestion(self):
+        cc = BBR()
+        cc.on_packet_sent(sent(0))
+        cc.on_packets_lost([sent(0)], 10 * MILLISECOND, persistent_congestion=True)
+
+        self.assertEqual(cc.minimum_window, cc.congestion_window)
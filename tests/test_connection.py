@@ -0,0 +1,37 @@
+from unittest import TestCase
+
+from quic.clock import SECOND
+from quic.connection import Connection, ConnectionTable
+
+ADDR = ("127.0.0.1", 6000)
+
+
+class TestConnectionTable(TestCase):
+    def test_lookup(self):
+        table = ConnectionTable()
+        connection = Connection(0xabc, 7, ADDR, 0, initial_key=(ADDR, 0x123))
+        table.add(connection)
+
+        # Initial packets are matched by address and the client's connection ID, later ones by the issued ID
+        self.assertIs(connection, table.lookup(0x123, ADDR))
+        self.assertIs(connection, table.lookup(0xabc, ("127.0.0.1", 7000)))
+        self.assertIsNone(table.lookup(0x123, ("127.0.0.1", 7000)))
+
+        with self.assertRaises(ValueError):
+            table.add(Connection(0xabc, 8, ADDR, 0))
+
+    def test_evict_idle(self):
+        table = ConnectionTable(idle_timeout=10 * SECOND)
+        connections = [Connection(conn_id, 0, ADDR, 0, initial_key=(ADDR, conn_id + 100)) for conn_id in range(3)]
+        for connection in connections:
+            table.add(connection)
+
+        table.touch(connections[0], 5 * SECOND)
+
+        self.assertEqual([], table.evict_idle(9 * SECOND))
+        self.assertEqual(connections[1:], table.evict_idle(10 * SECOND))
+        self.assertEqual([connections[0]], list(table))
+        self.assertIsNone(table.lookup(101, ADDR))
+
+        self.assertEqual([connections[0]], table.evict_idle(15 * SECOND))
+        self.assertEqual(0, len(table))
@@ -0,0 +1,113 @@
+import socket
+import threading
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase, skipUnless
+
+from quic.client import Client
+from quic.datagram_io import BatchedDatagramIO, DatagramIO
+from quic.frames.stream import StreamFrame
+from quic.server import Server
+from quic.simulator import SimulatedNetwork, Simulator
+
+
+def gso_supported():
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        return BatchedDatagramIO.supported(sock)
+
+
+class TestDatagramIO(TestCase):
+    def setUp(self):
+        self.receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.receiver.bind(("127.0.0.1", 0))
+        self.receiver.settimeout(1)
+
+        self.sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sender.connect(self.receiver.getsockname())
+        self.sender.settimeout(1)
+
+    def tearDown(self):
+        self.receiver.close()
+        self.sender.close()
+
+    def test_fallback(self):
+        simulator = Simulator()
+        sock = SimulatedNetwork(simulator).socket(("127.0.0.1", 6000))
+
+        self.assertIs(DatagramIO, type(DatagramIO.create(sock, batched=True)))
+        self.assertIs(DatagramIO, type(DatagramIO.create(self.sender)))
+
+    @skipUnless(gso_supported(), "UDP GSO/GRO not supported")
+    def test_batched_send_and_receive(self):
+        sender = DatagramIO.create(self.sender, batched=True)
+        receiver = DatagramIO.create(self.receiver, batched=True)
+        self.assertIsInstance(sender, BatchedDatagramIO)
+
+        datagrams = [bytes([i]) * 1000 for i in range(10)] + [b"end"]
+
+        # Equal sizes are held back, and the shorter last datagram closes the batch
+        for datagram in datagrams[:-1]:
+            sender.send(datagram)
+        self.assertEqual(0, sender.send_calls)
+
+        sender.send(datagrams[-1])
+        self.assertEqual(1, sender.send_calls)
+
+        received = [bytes(receiver.recvfrom(1500)[0]) for _ in datagrams]
+        self.assertEqual(datagrams, received)
+        self.assertEqual(1, receiver.receive_calls)
+
+    @skipUnless(gso_supported(), "UDP GSO/GRO not supported")
+    def test_batched_to_plain_receiver(self):
+        sender = DatagramIO.create(self.sender, batched=True)
+        receiver = DatagramIO.create(self.receiver)
+
+        for i in range(5):
+            sender.send(bytes([i]) * 100)
+
+        # A blocking receive sends what is queued first
+        sender.sock.settimeout(0.01)
+        with self.assertRaises(socket.timeout):
+            sender.recvfrom(1500)
+
+        # Without GRO the kernel splits the batch into the original datagrams
+        received = [receiver.recvfrom(1500)[0] for _ in range(5)]
+        self.assertEqual([bytes([i]) * 100 for i in range(5)], received)
+        self.assertEqual(1, sender.send_calls)
+
+    @skipUnless(gso_supported(), "UDP GSO/GRO not supported")
+    def test_batched_transfer(self):
+        data = bytes(range(256)) * 400
+        stop = threading.Event()
+        chunks = {}
+
+        with Server("127.0.0.1", 0, ack_threshold=10, batched_io=True) as server:
+            server_addr = server._sock.getsockname()
+
+            def serve():
+                while not stop.is_set():
+                    try:
+                        packet, _ = server.receive_packet()
+                    except socket.timeout:
+                        continue
+
+                    for frame in packet.frames:
+                        if isinstance(frame, StreamFrame):
+                            chunks[frame.offset] = bytes(frame.data)
+
+            thread = threading.Thread(target=serve)
+            thread.start()
+
+            try:
+                with TemporaryDirectory() as directory, Client(*server_addr, batched_io=True) as client:
+                    path = Path(directory) / "payload"
+                    path.write_bytes(data)
+
+                    stats = client.send_file(path)
+            finally:
+                stop.set()
+                thread.join()
+
+        self.assertEqual(data, b"".join(chunks[offset] for offset in sorted(chunks)))
+        self.assertEqual(len(data), stats.bytes_sent)
+        self.assertLess(client._io.send_calls, stats.packets_sent)
@@ -0,0 +1,65 @@
+import unittest
+
+from quic.frames import QuicFrame
+from quic.frames.ack import AckFrame
+from quic.frames.immediate_ack import ImmediateAckFrame
+from quic.frames.padding import PaddingFrame
+from quic.frames.ping import PingFrame
+from quic.frames.stream import StreamFrame
+
+
+class TestQuicFrame(unittest.TestCase):
+    def test_stream_types(self):
+        for offset in (None, 10):
+            for include_length in (False, True):
+                for finish in (False, True):
+                    frame = StreamFrame(3, include_length=include_length, offset=offset, finish=finish, data=b"abc")
+                    parsed, end = QuicFrame.from_buffer(memoryview(frame.to_bytes()), 0)
+                    self.assertIsInstance(parsed, StreamFrame)
+                    self.assertEqual(frame.type, parsed.type)
+                    self.assertEqual(offset, parsed.offset)
+                    self.assertEqual(b"abc", parsed.data)
+                    self.assertEqual(frame.encoded_size(), end)
+
+    def test_ack(self):
+        parsed, _ = QuicFrame.from_buffer(memoryview(AckFrame(largest_acknowledged=5).to_bytes()), 0)
+        self.assertIsInstance(parsed, AckFrame)
+        self.assertEqual(5, parsed.largest_acknowledged)
+
+    def test_padding_and_ping(self):
+        buffer = memoryview(PaddingFrame(4).to_bytes() + PingFrame().to_bytes())
+
+        padding, offset = QuicFrame.from_buffer(buffer, 0)
+        self.assertIsInstance(padding, PaddingFrame)
+        self.assertEqual(4, padding.length)
+
+        ping, offset = QuicFrame.from_buffer(buffer, offset)
+        self.assertIsInstance(ping, PingFrame)
+        self.assertEqual(len(buffer), offset)
+
+    def test_trailing_padding(self):
+        # Padding that fills the rest of a packet, as in a path MTU probe
+        buffer = memoryview(PingFrame().to_bytes() + PaddingFrame(9000).to_bytes())
+
+        padding, offset = QuicFrame.from_buffer(buffer, 1)
+        self.assertEqual(9000, padding.length)
+        self.assertEqual(len(buffer), offset)
+
+    def test_immediate_ack(self):
+        parsed, offset = QuicFrame.from_buffer(memoryview(ImmediateAckFrame().to_bytes()), 0)
+        self.assertIsInstance(parsed, ImmediateAckFrame)
+        self.assertEqual(1, offset)
+
+    def test_unknown_type(self):
+        with self.assertRaises(ValueError):
+            QuicFrame.from_buffer(memoryview(b"\x1e"), 0)
+
+    def test_ack_ranges(self):
+        ranges = [(20, 25), (10, 15), (3, 3)]
+        frame = AckFrame.from_ranges(ranges)
+        self.assertEqual(25, frame.largest_acknowledged)
+        self.assertEqual(2, frame.ack_range_count)
+
+        parsed, end = QuicFrame.from_buffer(memoryview(frame.to_bytes()), 0)
+        self.assertEqual(frame.encoded_size(), end)
+        self.assertEqual(ranges, list(parsed.ranges()))
@@ -0,0 +1,127 @@
+import unittest
+
+from quic.frames.ack import AckFrame
+from quic.frames.ping import PingFrame
+from quic.frames.stream import StreamFrame
+from quic.packets import QuicPacket
+from quic.packets.initial import QuicInitialPacket
+
+
+class TestQuicInitialPacket(unittest.TestCase):
+    def test_from_buffer(self):
+        packet = QuicInitialPacket(
+            packet_number=300,
+            version=1,
+            dst_conn_id=1,
+            src_conn_id=2,
+            frames=[
+                AckFrame(largest_acknowledged=10, first_ack_range=3),
+                StreamFrame(4, include_length=True, offset=1000, finish=True, data=b"payload"),
+            ],
+        )
+        buffer = memoryview(bytes(packet.to_bytes()))
+
+        parsed, offset = QuicPacket.from_buffer(buffer)
+        self.assertEqual(len(buffer), offset)
+        self.assertIsInstance(parsed, QuicInitialPacket)
+        self.assertEqual(300, parsed.packet_number)
+        self.assertEqual(1, parsed.dst_conn_id)
+        self.assertEqual(2, parsed.src_conn_id)
+
+        ack, stream = parsed.frames
+        self.assertEqual(10, ack.largest_acknowledged)
+        self.assertEqual(7, ack.smallest_acknowledged)
+        self.assertEqual(4, stream.stream_id)
+        self.assertEqual(1000, stream.offset)
+        self.assertTrue(stream.finish)
+        self.assertEqual(b"payload", stream.data)
+
+    def test_stream_data_is_view(self):
+        packet = QuicInitialPacket(
+            packet_number=0,
+            version=1,
+            dst_conn_id=1,
+            src_conn_id=2,
+            frames=[StreamFrame(0, include_length=False, offset=0, data=b"tail")],
+        )
+        buffer = bytearray(packet.to_bytes())
+
+        parsed, _ = QuicPacket.from_buffer(memoryview(buffer))
+        data = parsed.frames[0].data
+        self.assertIsInstance(data, memoryview)
+        self.assertEqual(b"tail", data)
+
+        buffer[-1] = ord("k")
+        self.assertEqual(b"taik", data)
+
+    def test_serialize_into(self):
+        packet = QuicInitialPacket(
+            packet_number=70000,
+            version=1,
+            dst_conn_id=24601,
+            src_conn_id=2,
+            frames=[
+                StreamFrame(1, include_length=True, offset=0, data=b"A" * 100),
+                StreamFrame(1, include_length=True, offset=100, data=b"B" * 100),
+            ],
+        )
+        size = packet.encoded_size()
+        buffer = bytearray(size + 3)
+
+        end = packet.serialize_into(memoryview(buffer), 3)
+        self.assertEqual(size + 3, end)
+        self.assertEqual(packet.to_bytes(), buffer[3:])
+
+        parsed, offset = QuicPacket.from_buffer(memoryview(buffer), 3)
+        self.assertEqual(end, offset)
+        self.assertEqual(70000, parsed.packet_number)
+        self.assertEqual([b"A" * 100, b"B" * 100], [frame.data for frame in parsed.frames])
+
+    def test_truncated(self):
+        packet = QuicInitialPacket(
+            packet_number=1,
+            version=1,
+            dst_conn_id=1,
+            src_conn_id=2,
+            frames=[StreamFrame(1, include_length=False, offset=0, data=b"A" * 100)],
+        )
+
+        # A datagram cut short by a small receive buffer is rejected rather than read as a shorter frame
+        with self.assertRaises(ValueError):
+            QuicPacket.from_buffer(memoryview(packet.to_bytes()[:-10]))
+
+    def test_packet_number_lengths(self):
+        for packet_number in (2 ** 23 - 1, 2 ** 23, 2 ** 24, 2 ** 31 - 1):
+            with self.subTest(packet_number=packet_number):
+                packet = QuicInitialPacket(
+                    packet_number=packet_number,
+                    version=1,
+                    dst_conn_id=1,
+                    src_conn_id=2,
+                    frames=[PingFrame()],
+                )
+
+                parsed, _ = QuicPacket.from_buffer(memoryview(bytes(packet.to_bytes())))
+                self.assertEqual(packet.packet_number_length, parsed.packet_number_length)
+                self.assertEqual(packet_number, parsed.decode_packet_number(-1))
+                self.assertIsInstance(parsed.frames[0], PingFrame)
+
+    def test_truncated_packet_number(self):
+        # Past 4 bytes, packet numbers are sent relative to the largest acknowledged one
+        packet_number = 2 ** 40 + 5
+        packet = QuicInitialPacket(
+            packet_number=packet_number,
+            version=1,
+            dst_conn_id=1,
+            src_conn_id=2,
+            frames=[PingFrame()],
+            largest_acked=packet_number - 3,
+        )
+        self.assertEqual(1, packet.packet_number_length)
+
+        parsed, _ = QuicPacket.from_buffer(memoryview(bytes(packet.to_bytes())))
+        self.assertEqual(packet_number, parsed.decode_packet_number(packet_number - 1))
+
+        # A packet number far ahead of the largest acknowledged one still takes at most 4 bytes
+        packet.largest_acked = -1
+        self.assertEqual(4, packet.packet_number_length)
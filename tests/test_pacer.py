@@ -0,0 +1,52 @@
+from unittest import TestCase
+
+from quic.clock import MICROSECOND, MILLISECOND, SECOND
+from quic.pacer import Pacer
+
+
+class TestPacer(TestCase):
+    def test_unpaced(self):
+        pacer = Pacer(1000)
+
+        for _ in range(10):
+            self.assertEqual(0, pacer.next_send_time(0))
+            pacer.on_packet_sent(1000, 0)
+
+    def test_rate_from_window(self):
+        pacer = Pacer(1000)
+        pacer.update_rate(100_000, 100 * MILLISECOND)
+        self.assertEqual(1_250_000, pacer.rate)
+
+        pacer.update_rate(100_000, 100 * MILLISECOND, pacing_rate=500_000)
+        self.assertEqual(500_000, pacer.rate)
+
+    def test_spreads_sends_after_burst(self):
+        pacer = Pacer(1000, burst_datagrams=2)
+        pacer.rate = 1_000_000
+
+        # The bucket starts full, so a burst goes out right away
+        for _ in range(2):
+            self.assertEqual(0, pacer.next_send_time(0))
+            pacer.on_packet_sent(1000, 0)
+
+        # Then one datagram per millisecond at 1 MB/s
+        self.assertEqual(MILLISECOND, pacer.next_send_time(0))
+        self.assertEqual(MILLISECOND, pacer.next_send_time(MILLISECOND // 2))
+        pacer.on_packet_sent(1000, MILLISECOND)
+        self.assertEqual(2 * MILLISECOND, pacer.next_send_time(MILLISECOND))
+
+        # Idle time refills at most a burst
+        self.assertEqual(SECOND, pacer.next_send_time(SECOND))
+        self.assertEqual(2000, pacer.tokens)
+
+    def test_small_refills_accumulate(self):
+        pacer = Pacer(1000, burst_datagrams=1)
+        pacer.rate = 1000
+        pacer.on_packet_sent(1000, 0)
+
+        # A fraction of a byte per microsecond still adds up to a datagram after a second
+        for now in range(0, SECOND, 10 * MICROSECOND):
+            pacer.next_send_time(now)
+
+        self.assertEqual(SECOND, pacer.next_send_time(SECOND - 10 * MICROSECOND))
+        self.assertEqual(SECOND, pacer.next_send_time(SECOND))
@@ -0,0 +1,97 @@
+from unittest import TestCase
+
+from quic.frames.ack import AckFrame
+from quic.frames.padding import PaddingFrame
+from quic.frames.ping import PingFrame
+from quic.packet_builder import PacketBuilder
+from quic.packets import QuicPacket
+from quic.packets.initial import QuicInitialPacket
+from quic.send_stream import SendStream
+from quic.sent_packets import StreamRange
+
+
+def empty_packet(packet_number=0):
+    return QuicInitialPacket(packet_number=packet_number, version=1, dst_conn_id=1 << 56, src_conn_id=2)
+
+
+def decode(packet):
+    decoded, _ = QuicPacket.from_buffer(memoryview(packet.to_bytes()))
+    return decoded
+
+
+class TestPacketBuilder(TestCase):
+    def test_fills_packet(self):
+        stream = SendStream(0, bytes(range(256)) * 20)
+        builder = PacketBuilder(empty_packet(), 1200)
+        builder.add_stream_frames(stream)
+
+        packet = builder.build()
+        self.assertLessEqual(packet.encoded_size(), 1200)
+        self.assertGreater(packet.encoded_size(), 1190)
+
+        # The frame that ends the packet leaves out its length and still decodes to the same data
+        frame = decode(packet).frames[0]
+        self.assertFalse(frame.include_length)
+        self.assertEqual(bytes(packet.frames[0].data), bytes(frame.data))
+
+    def test_coalesces_frames(self):
+        streams = [SendStream(0, b"a" * 300), SendStream(4, b"b" * 300, chunk_size=100)]
+        streams[0].next_frame()
+        streams[0].on_range_lost(StreamRange(0, 0, 300, True))
+
+        builder = PacketBuilder(empty_packet(), 1200)
+        self.assertTrue(builder.add_frame(AckFrame(largest_acknowledged=5)))
+        for stream in streams:
+            builder.add_stream_frames(stream)
+
+        frames = decode(builder.build()).frames
+        self.assertIsInstance(frames[0], AckFrame)
+        self.assertEqual(
+            [(0, 0, 300, True, True), (4, 0, 100, False, True), (4, 100, 100, False, True), (4, 200, 100, True, False)],
+            [(f.stream_id, f.offset, len(f.data), f.finish, f.include_length) for f in frames[1:]],
+        )
+        self.assertFalse(any(stream.has_data() for stream in streams))
+
+    def test_splits_lost_range(self):
+        stream = SendStream(0, bytes(3000))
+        stream.next_frame()
+        stream.on_range_lost(StreamRange(0, 0, 3000, True))
+
+        sent = []
+        while stream.has_data():
+            builder = PacketBuilder(empty_packet(len(sent)), 1200)
+            builder.add_stream_frames(stream)
+            sent.extend(decode(builder.build()).frames)
+
+        self.assertEqual(3000, sum(len(frame.data) for frame in sent))
+        self.assertEqual([False, False, True], [frame.finish for frame in sent])
+
+    def test_pad(self):
+        for size in (100, 1200, 16390, 65507):
+            builder = PacketBuilder(empty_packet(), size)
+            builder.add_frame(PingFrame())
+            builder.pad()
+
+            packet = builder.build()
+            self.assertIn(len(packet.to_bytes()), (size - 2, size - 1, size))
+
+            frames = decode(packet).frames
+            self.assertIsInstance(frames[0], PingFrame)
+            self.assertIsInstance(frames[1], PaddingFrame)
+
+    def test_too_small(self):
+        builder = PacketBuilder(empty_packet(), 20)
+
+        with self.assertRaises(ValueError):
+            builder.add_stream_frames(SendStream(0, bytes(100)))
+
+    def test_stream_range(self):
+        stream = SendStream(0, bytes(range(200)))
+        builder = PacketBuilder(empty_packet(), 100)
+
+        # A range that does not fit is cut, and only its last piece may carry the end of the stream
+        self.assertTrue(builder.add_stream_range(stream, StreamRange(0, 50, 150, True)))
+        frame = builder.build().frames[0]
+        self.assertFalse(frame.finish)
+        self.assertEqual(bytes(range(50, 50 + len(frame.data))), bytes(frame.data))
+        self.assertFalse(builder.add_stream_range(stream, StreamRange(0, 0, 10, False)))
@@ -0,0 +1,87 @@
+import math
+from unittest import TestCase
+
+from quic.clock import SECOND
+from quic.pmtud import PathMtuDiscovery, SEARCH_COMPLETE, SEARCHING
+
+
+def search(pmtud: PathMtuDiscovery, path_mtu: int, now=0) -> list[int]:
+    # Probes the path until the search ends, with every probe up to path_mtu getting through
+    sizes = []
+    packet_number = 0
+
+    while (size := pmtud.next_probe_size(now)) is not None:
+        sizes.append(size)
+        pmtud.on_probe_sent(packet_number)
+        packet_number += 1
+
+        if size <= path_mtu:
+            pmtud.on_probe_acked(size, now)
+        else:
+            pmtud.on_probe_lost(now)
+
+    return sizes
+
+
+class TestPathMtuDiscovery(TestCase):
+    def test_search(self):
+        pmtud = PathMtuDiscovery(1500, 65507)
+        sizes = search(pmtud, 9000)
+
+        self.assertEqual(SEARCH_COMPLETE, pmtud.state)
+        self.assertLessEqual(9000 - pmtud.max_payload, pmtud.search_granularity)
+        self.assertLessEqual(pmtud.max_payload, 9000)
+
+        # A binary search, in which each size that fails is tried max_probes times
+        failed = [size for size in sizes if size > 9000]
+        self.assertEqual(len(failed), len(set(failed)) * pmtud.max_probes)
+        self.assertLessEqual(len(set(sizes)), math.ceil(math.log2((65507 - 1500) / pmtud.search_granularity)) + 1)
+
+    def test_one_probe_at_a_time(self):
+        pmtud = PathMtuDiscovery(1500, 9000)
+        size = pmtud.next_probe_size(0)
+        pmtud.on_probe_sent(7)
+
+        self.assertTrue(pmtud.is_probe(7))
+        self.assertIsNone(pmtud.next_probe_size(0))
+
+        # A lost probe is tried again at the same size
+        pmtud.on_probe_lost(0)
+        self.assertEqual(size, pmtud.next_probe_size(0))
+
+    def test_too_big(self):
+        pmtud = PathMtuDiscovery(1500, 9000)
+        size = pmtud.next_probe_size(0)
+
+        # A probe the local interface rejects fails its size right away
+        pmtud.on_probe_too_big(0)
+        self.assertLess(pmtud.next_probe_size(0), size)
+
+    def test_raise_timer(self):
+        pmtud = PathMtuDiscovery(1500, 9000)
+        search(pmtud, 4000)
+        self.assertIsNone(pmtud.next_probe_size(pmtud.raise_interval - SECOND))
+
+        # The path may allow more by now
+        now = pmtud.raise_interval
+        self.assertIsNotNone(pmtud.next_probe_size(now))
+        self.assertEqual(SEARCHING, pmtud.state)
+
+        search(pmtud, 9000, now)
+        self.assertEqual(SEARCH_COMPLETE, pmtud.state)
+        self.assertGreater(pmtud.max_payload, 8900)
+
+    def test_black_hole(self):
+        pmtud = PathMtuDiscovery(1500, 9000)
+        search(pmtud, 9000)
+
+        pmtud.on_black_hole(0)
+        self.assertEqual(1500, pmtud.max_payload)
+        self.assertEqual(SEARCHING, pmtud.state)
+
+        search(pmtud, 4000)
+        self.assertLessEqual(4000 - pmtud.max_payload, pmtud.search_granularity)
+
+    def test_invalid_sizes(self):
+        with self.assertRaises(ValueError):
+            PathMtuDiscovery(1500, 1200)
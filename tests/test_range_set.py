@@ -0,0 +1,54 @@
+from unittest import TestCase
+
+from quic.range_set import RangeSet
+
+
+class TestRangeSet(TestCase):
+    def test_add_in_order(self):
+        s = RangeSet()
+        for i in range(5):
+            s.add(i)
+        self.assertEqual([range(0, 5)], list(s))
+
+    def test_add_with_gaps(self):
+        s = RangeSet()
+        for i in (0, 1, 4, 5, 9):
+            s.add(i)
+        self.assertEqual([range(0, 2), range(4, 6), range(9, 10)], list(s))
+        self.assertEqual(0, s.smallest)
+        self.assertEqual(9, s.largest)
+
+    def test_fill_gap(self):
+        s = RangeSet([range(0, 2), range(3, 5)])
+        s.add(2)
+        self.assertEqual([range(0, 5)], list(s))
+
+    def test_add_overlapping(self):
+        s = RangeSet([range(0, 2), range(4, 6), range(8, 10)])
+        s.add(1, 9)
+        self.assertEqual([range(0, 10)], list(s))
+
+    def test_add_before(self):
+        s = RangeSet([range(5, 6)])
+        s.add(1)
+        self.assertEqual([range(1, 2), range(5, 6)], list(s))
+
+    def test_contains(self):
+        s = RangeSet([range(0, 2), range(4, 6)])
+        self.assertIn(1, s)
+        self.assertIn(4, s)
+        self.assertNotIn(2, s)
+        self.assertNotIn(6, s)
+
+    def test_covers(self):
+        s = RangeSet([range(0, 2), range(4, 8)])
+        self.assertTrue(s.covers(0, 2))
+        self.assertTrue(s.covers(5, 8))
+        self.assertFalse(s.covers(1, 5))
+        self.assertFalse(s.covers(6, 9))
+        self.assertFalse(s.covers(8, 9))
+
+    def test_shift(self):
+        s = RangeSet([range(0, 2), range(4, 6)])
+        self.assertEqual(range(0, 2), s.shift())
+        self.assertEqual(1, len(s))
@@ -0,0 +1,44 @@
+from unittest import TestCase
+
+from quic.send_stream import SendStream
+from quic.sent_packets import StreamRange
+
+
+class TestSendStream(TestCase):
+    def test_frames(self):
+        stream = SendStream(4, b"abcdefg", chunk_size=3)
+
+        frames = []
+        while stream.has_data():
+            frames.append(stream.next_frame())
+
+        self.assertEqual([(0, b"abc", False), (3, b"def", False), (6, b"g", True)],
+                         [(frame.offset, bytes(frame.data), frame.finish) for frame in frames])
+        self.assertEqual({4}, {frame.stream_id for frame in frames})
+        self.assertIsNone(stream.next_frame())
+
+    def test_empty(self):
+        stream = SendStream(0, b"")
+
+        frame = stream.next_frame()
+        self.assertEqual((0, b"", True), (frame.offset, bytes(frame.data), frame.finish))
+        self.assertFalse(stream.has_data())
+
+    def test_lost_ranges_first(self):
+        data = bytes(range(100))
+        stream = SendStream(0, data, chunk_size=10)
+
+        for _ in range(10):
+            stream.next_frame()
+        self.assertFalse(stream.has_data())
+
+        stream.on_range_lost(StreamRange(0, 90, 10, True))
+        stream.on_range_lost(StreamRange(0, 20, 10, False))
+        self.assertTrue(stream.has_data())
+
+        # Lost ranges are framed again from the data, in the order they were lost
+        frame = stream.next_frame()
+        self.assertEqual((90, data[90:], True), (frame.offset, bytes(frame.data), frame.finish))
+        frame = stream.next_frame()
+        self.assertEqual((20, data[20:30], False), (frame.offset, bytes(frame.data), frame.finish))
+        self.assertIsNone(stream.next_frame())
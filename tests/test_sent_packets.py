@@ -0,0 +1,71 @@
+from unittest import TestCase
+
+from quic.sent_packets import SentPacket, SentPacketTracker
+
+
+def sent(packet_number):
+    return SentPacket(packet_number, 0, 100, True, None)
+
+
+class TestSentPacketTracker(TestCase):
+    def test_add_and_get(self):
+        tracker = SentPacketTracker()
+        for packet_number in range(3):
+            tracker.add(sent(packet_number))
+        self.assertEqual(3, len(tracker))
+        self.assertEqual(1, tracker.get(1).packet_number)
+        self.assertIsNone(tracker.get(3))
+        self.assertIn(2, tracker)
+
+    def test_add_used_packet_number(self):
+        tracker = SentPacketTracker()
+        tracker.add(sent(5))
+        with self.assertRaises(ValueError):
+            tracker.add(sent(5))
+
+    def test_skipped_packet_numbers(self):
+        tracker = SentPacketTracker()
+        tracker.add(sent(0))
+        tracker.add(sent(4))
+        self.assertEqual([0, 4], [p.packet_number for p in tracker])
+        self.assertIsNone(tracker.get(2))
+
+    def test_ack_range(self):
+        tracker = SentPacketTracker()
+        for packet_number in range(10):
+            tracker.add(sent(packet_number))
+        acked = tracker.ack_range(2, 5)
+        self.assertEqual([2, 3, 4, 5], [p.packet_number for p in acked])
+        self.assertEqual([], tracker.ack_range(2, 5))
+        self.assertEqual(0, tracker.oldest().packet_number)
+        tracker.ack_range(0, 1)
+        self.assertEqual(6, tracker.oldest().packet_number)
+        self.assertEqual(4, len(tracker))
+
+    def test_ack_range_outside(self):
+        tracker = SentPacketTracker()
+        for packet_number in range(5, 8):
+            tracker.add(sent(packet_number))
+        self.assertEqual([5, 6, 7], [p.packet_number for p in tracker.ack_range(0, 100)])
+        self.assertFalse(tracker)
+        self.assertIsNone(tracker.oldest())
+
+    def test_remove(self):
+        tracker = SentPacketTracker()
+        for packet_number in range(3):
+            tracker.add(sent(packet_number))
+        self.assertEqual(0, tracker.remove(0).packet_number)
+        self.assertIsNone(tracker.remove(0))
+        self.assertEqual(1, tracker.oldest().packet_number)
+
+    def test_compaction(self):
+        tracker = SentPacketTracker()
+        count = SentPacketTracker.compact_threshold * 3
+        for packet_number in range(count):
+            tracker.add(sent(packet_number))
+        tracker.ack_range(0, count - 2)
+        self.assertEqual(1, len(tracker))
+        self.assertEqual(count - 1, tracker.oldest().packet_number)
+        self.assertLess(len(tracker._packets), count)
+        tracker.add(sent(count))
+        self.assertEqual(count, tracker.get(count).packet_number)
@@ -1,9 +1,18 @@
+import io
+import socket
 from unittest import TestCase
 from unittest.mock import MagicMock, patch
 
+from quic.clock import MICROSECOND, MILLISECOND
+from quic.frames.ack import AckFrame
+from quic.frames.immediate_ack import ImmediateAckFrame
+from quic.frames.ping import PingFrame
+from quic.frames.stream import StreamFrame
 from quic.packets import QuicPacket
 from quic.packets.initial import QuicInitialPacket
 from quic.server import Server
+from quic.simulator import SimulatedNetwork, Simulator
+from quic.stream_reassembler import StreamReassembler
 
 
 class TestServer(TestCase):
@@ -44,3 +53,149 @@ class TestServer(TestCase):
             self.assertEqual(received_addr, addr)
             if isinstance(packet, QuicInitialPacket):
                 self.assertEqual(packet.packet_number, 1)
+
+    @patch("socket.socket")
+    def test_multi_range_ack(self, mock_socket):
+        mock_sock_instance = MagicMock()
+        mock_socket.return_value = mock_sock_instance
+        addr = ("", 0)
+        with Server("", 0, 0.1, 5) as s:
+            for packet_number in (0, 1, 2, 5, 6):
+                packet = QuicInitialPacket(packet_number=packet_number, version=1, src_conn_id=1, dst_conn_id=2)
+                mock_sock_instance.recvfrom.return_value = (packet.to_bytes(), addr)
+                s.receive_packet()
+
+            # Packet 5 arrives out of order, so it is ACKed immediately along with the earlier range
+            self.assertEqual(1, mock_sock_instance.sendto.call_count)
+            sent_data, _ = mock_sock_instance.sendto.call_args[0]
+            response, _ = QuicPacket.from_buffer(memoryview(bytes(sent_data)))
+            ack = response.frames[0]
+            self.assertIsInstance(ack, AckFrame)
+            self.assertEqual([(5, 5), (0, 2)], list(ack.ranges()))
+
+    @patch("socket.socket")
+    def test_connections(self, mock_socket):
+        mock_sock_instance = MagicMock()
+        mock_socket.return_value = mock_sock_instance
+        addrs = [("127.0.0.1", 6000), ("127.0.0.1", 6001)]
+
+        # The send buffer is reused, so responses are decoded as they are sent
+        responses = []
+        mock_sock_instance.sendto.side_effect = \
+            lambda data, addr: responses.append((QuicPacket.from_buffer(memoryview(bytes(data)))[0], addr))
+
+        with Server("", 0, 0.1, 2) as s:
+            # Interleaved packets of two clients do not look out of order to each other
+            for packet_number in (0, 1):
+                for addr in addrs:
+                    packet = QuicInitialPacket(packet_number=packet_number, version=1, src_conn_id=5, dst_conn_id=9)
+                    mock_sock_instance.recvfrom.return_value = (packet.to_bytes(), addr)
+                    s.receive_packet()
+
+            self.assertEqual(2, len(s.connections))
+            self.assertEqual(addrs, [addr for _, addr in responses])
+
+            for response, _ in responses:
+                self.assertEqual(5, response.dst_conn_id)
+                self.assertEqual([(0, 1)], list(response.frames[0].ranges()))
+
+            conn_ids = [response.src_conn_id for response, _ in responses]
+            self.assertNotEqual(conn_ids[0], conn_ids[1])
+
+            # Clients address later packets to the connection ID the server issued
+            packet = QuicInitialPacket(packet_number=2, version=1, src_conn_id=5, dst_conn_id=conn_ids[1])
+            mock_sock_instance.recvfrom.return_value = (packet.to_bytes(), addrs[1])
+            s.receive_packet()
+
+            self.assertEqual(3, s.connections.lookup(conn_ids[1], addrs[1]).packets_received)
+
+    def test_delayed_ack(self):
+        simulator = Simulator()
+        network = SimulatedNetwork(simulator)
+        client_addr, server_addr = ("127.0.0.1", 6000), ("127.0.0.1", 5555)
+        client_sock = network.socket(client_addr)
+        client_sock.connect(server_addr)
+
+        with Server(*server_addr, timeout=0.1, ack_threshold=10, clock=simulator, sock=network.socket(server_addr)) as s:
+            packet = QuicInitialPacket(packet_number=0, version=1, src_conn_id=1, dst_conn_id=2)
+            client_sock.send(packet.to_bytes())
+            s.receive_packet()
+            self.assertEqual(s.max_ack_delay, s.next_ack_deadline())
+
+            # The ACK is sent while waiting for more packets, once the packet waited max_ack_delay
+            with self.assertRaises(socket.timeout):
+                s.receive_packet()
+
+            self.assertEqual(100 * MILLISECOND, simulator.now())
+            self.assertIsNone(s.next_ack_deadline())
+
+            data, _ = client_sock.recvfrom(1500)
+            response, _ = QuicPacket.from_buffer(memoryview(data))
+            ack = response.frames[0]
+            self.assertEqual([(0, 0)], list(ack.ranges()))
+            self.assertEqual(25 * MILLISECOND // MICROSECOND >> s.ack_delay_exponent, ack.ack_delay)
+
+            # A probe is acknowledged without delay
+            packet = QuicInitialPacket(packet_number=1, version=1, src_conn_id=1, dst_conn_id=2, frames=[ImmediateAckFrame()])
+            client_sock.send(packet.to_bytes())
+            s.receive_packet()
+
+            self.assertEqual(2, s.acks_sent)
+            self.assertIsNone(s.next_ack_deadline())
+
+    def test_malformed_datagram(self):
+        simulator = Simulator()
+        network = SimulatedNetwork(simulator)
+        client_addr, server_addr = ("127.0.0.1", 6000), ("127.0.0.1", 5555)
+        client_sock = network.socket(client_addr)
+        client_sock.connect(server_addr)
+
+        with Server(*server_addr, timeout=0.1, ack_threshold=1, clock=simulator, sock=network.socket(server_addr)) as s:
+            data = bytes(QuicInitialPacket(packet_number=0, version=1, src_conn_id=1, dst_conn_id=2, frames=[PingFrame()]).to_bytes())
+
+            # A truncated packet, an unknown frame type, an unknown long packet type and a cut off header
+            for garbage in (data[:-1], data[:-1] + b"\x7f", b"\xd0" + data[1:], data[:5]):
+                client_sock.send(garbage)
+
+            client_sock.send(data)
+
+            # The malformed datagrams are dropped and the server keeps serving the connection
+            packet, _ = s.receive_packet()
+
+            self.assertEqual(0, packet.packet_number)
+            self.assertEqual(4, s.packets_dropped)
+            self.assertEqual(4, s.stats()["packets_dropped"])
+            self.assertEqual(1, s.acks_sent)
+
+    def test_streams_per_connection(self):
+        simulator = Simulator()
+        network = SimulatedNetwork(simulator)
+        server_addr = ("127.0.0.1", 5555)
+        client_addrs = [("127.0.0.1", 6000), ("127.0.0.1", 6001)]
+        data = {client_addrs[0]: b"first client", client_addrs[1]: b"second client"}
+        received = {}
+
+        class StreamServer(Server):
+            def open_stream(self, connection, stream_id):
+                received[connection.addr, stream_id] = io.BytesIO()
+                return StreamReassembler(received[connection.addr, stream_id])
+
+        with StreamServer(*server_addr, timeout=0.1, clock=simulator, sock=network.socket(server_addr)) as s:
+            client_socks = [network.socket(addr) for addr in client_addrs]
+
+            # Both clients send stream 0 with the same connection IDs, interleaved and out of order
+            for packet_number, (start, end) in enumerate(((6, None), (0, 6))):
+                for client_sock in client_socks:
+                    frame = StreamFrame(0, offset=start, include_length=True, data=data[client_sock.addr][start:end], finish=end is None)
+                    packet = QuicInitialPacket(packet_number=packet_number, version=1, src_conn_id=1, dst_conn_id=2, frames=[frame])
+                    client_sock.sendto(packet.to_bytes(), server_addr)
+
+            for _ in range(4):
+                s.receive_packet()
+
+        self.assertEqual(2, len(s.connections))
+        self.assertEqual({(addr, 0): client_data for addr, client_data in data.items()},
+                         {key: stream.getvalue() for key, stream in received.items()})
+
+        for connection in s.connections:
+            self.assertTrue(connection.streams[0].finished)
@@ -0,0 +1,80 @@
+import socket
+import sys
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from threading import Thread
+from unittest import TestCase, skipUnless
+
+from quic.client import Client
+from quic.server import Server
+from quic.sharded_server import DST_CONN_ID_OFFSET, ShardedServer, reuseport_sockets
+
+
+def reuseport_supported():
+    if not sys.platform.startswith("linux"):
+        return False
+
+    try:
+        for sock in reuseport_sockets("127.0.0.1", 0, 2):
+            sock.close()
+    except OSError:
+        return False
+
+    return True
+
+
+class TestShardedServer(TestCase):
+    def test_conn_id_selects_worker(self):
+        server = Server(worker_index=2, worker_count=3)
+
+        for _ in range(100):
+            conn_id = server.new_conn_id()
+
+            self.assertEqual(8, (conn_id.bit_length() + 7) // 8)
+            self.assertEqual(2, (conn_id >> 56) % 3)
+
+    @skipUnless(reuseport_supported(), "SO_REUSEPORT steering not supported")
+    def test_steering(self):
+        socks = reuseport_sockets("127.0.0.1", 0, 3)
+
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sender:
+            for sock in socks:
+                sock.settimeout(1)
+
+            # The same source address, so only the payload can spread the datagrams over the sockets
+            for first_byte in range(1, 10):
+                datagram = bytes(DST_CONN_ID_OFFSET) + bytes([first_byte])
+                sender.sendto(datagram, socks[0].getsockname())
+
+                self.assertEqual(datagram, socks[first_byte % 3].recvfrom(1500)[0])
+
+        for sock in socks:
+            sock.close()
+
+    @skipUnless(reuseport_supported(), "SO_REUSEPORT steering not supported")
+    def test_transfers(self):
+        data = bytes(range(256)) * 100
+        clients = []
+
+        with TemporaryDirectory() as directory, ShardedServer("127.0.0.1", 0, workers=2, ack_threshold=5) as server:
+            path = Path(directory) / "payload"
+            path.write_bytes(data)
+
+            def send():
+                with Client(*server.address) as client:
+                    client.send_file(path)
+                    clients.append(client)
+
+            threads = [Thread(target=send) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        stats = server.stats()
+
+        # Each client's packets all reached the worker holding its connection
+        self.assertEqual(4, len(clients))
+        self.assertEqual(4, stats["connections_accepted"])
+        self.assertEqual(sum(client.packets_sent for client in clients), stats["packets_received"])
+        self.assertTrue(all(worker_stats is not None for worker_stats in server.worker_stats))
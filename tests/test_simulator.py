@@ -0,0 +1,115 @@
+import socket
+from unittest import TestCase
+
+from quic.client import Client
+from quic.clock import MICROSECOND, MILLISECOND, SECOND
+from quic.frames.stream import StreamFrame
+from quic.packets.initial import QuicInitialPacket
+from quic.server import Server
+from quic.simulator import SimulatedNetwork, Simulator
+
+CLIENT_ADDR = ("127.0.0.1", 6000)
+SERVER_ADDR = ("127.0.0.1", 5555)
+
+
+class TestSimulator(TestCase):
+    def test_events_run_in_time_order(self):
+        simulator = Simulator()
+        order = []
+
+        simulator.schedule(30, lambda: order.append((simulator.now(), "c")))
+        simulator.schedule(10, lambda: order.append((simulator.now(), "a")))
+        simulator.call_later(10, lambda: order.append((simulator.now(), "b")))
+
+        simulator.sleep(20)
+        self.assertEqual(order, [(10, "a"), (10, "b")])
+        self.assertEqual(simulator.now(), 20)
+
+        simulator.run()
+        self.assertEqual(order[-1], (30, "c"))
+
+    def test_link_latency_and_bandwidth(self):
+        simulator = Simulator()
+        network = SimulatedNetwork(simulator)
+        network.link(CLIENT_ADDR, SERVER_ADDR, latency=MILLISECOND, bandwidth=1000)
+        client_sock = network.socket(CLIENT_ADDR)
+        server_sock = network.socket(SERVER_ADDR)
+
+        arrivals = []
+        server_sock.on_datagram = lambda: arrivals.append(simulator.now())
+
+        client_sock.connect(SERVER_ADDR)
+        client_sock.send(b"x" * 10)
+        client_sock.send(b"y" * 10)
+        simulator.run()
+
+        # 10 bytes at 1000 bytes/s take 10ms each, and the second datagram queues behind the first
+        self.assertEqual(arrivals, [11 * MILLISECOND, 21 * MILLISECOND])
+        self.assertEqual(server_sock.recvfrom(1500), (b"x" * 10, CLIENT_ADDR))
+
+    def test_link_loss(self):
+        simulator = Simulator()
+        network = SimulatedNetwork(simulator)
+        link = network.link(CLIENT_ADDR, SERVER_ADDR, loss=0.25, seed=1)
+        network.socket(SERVER_ADDR)
+
+        for _ in range(1000):
+            network.transmit(b"x", CLIENT_ADDR, SERVER_ADDR)
+
+        self.assertEqual(link.sent, 1000)
+        self.assertAlmostEqual(link.dropped / link.sent, 0.25, delta=0.05)
+        self.assertEqual(simulator.pending_events, link.delivered)
+
+    def test_link_queue_size(self):
+        simulator = Simulator()
+        network = SimulatedNetwork(simulator)
+        link = network.link(CLIENT_ADDR, SERVER_ADDR, bandwidth=1000, queue_size=20)
+        network.socket(SERVER_ADDR)
+
+        # 20 bytes of backlog fit in the queue, so the fourth and fifth datagrams are dropped
+        for _ in range(5):
+            network.transmit(b"x" * 10, CLIENT_ADDR, SERVER_ADDR)
+
+        self.assertEqual(2, link.dropped)
+        self.assertEqual(3, simulator.pending_events)
+
+    def test_receive_timeout_advances_time(self):
+        simulator = Simulator()
+        sock = SimulatedNetwork(simulator).socket(CLIENT_ADDR)
+        sock.settimeout(0.001)
+
+        with self.assertRaises(socket.timeout):
+            sock.recvfrom(1500)
+
+        self.assertEqual(simulator.now(), MILLISECOND)
+
+    def test_client_server_exchange(self):
+        simulator = Simulator()
+        network = SimulatedNetwork(simulator)
+        network.link(CLIENT_ADDR, SERVER_ADDR, latency=50 * MICROSECOND)
+        network.link(SERVER_ADDR, CLIENT_ADDR, latency=50 * MICROSECOND)
+
+        server_sock = network.socket(SERVER_ADDR)
+        received = []
+
+        with Server(*SERVER_ADDR, ack_threshold=2, clock=simulator, sock=server_sock) as server, \
+                Client(*SERVER_ADDR, timeout=0.001, clock=simulator, sock=network.socket(CLIENT_ADDR)) as client:
+            server_sock.on_datagram = lambda: received.append(server.receive_packet()[0].packet_number)
+
+            for offset in (0, 1000):
+                frame = StreamFrame(0, offset=offset, include_length=True, data=b"data")
+                packet = QuicInitialPacket(
+                    packet_number=client.get_packet_number(),
+                    version=1,
+                    dst_conn_id=1,
+                    src_conn_id=0,
+                    frames=[frame],
+                )
+                client.send_packet(packet)
+
+            client.receive_packet()
+
+        self.assertEqual(received, [0, 1])
+        self.assertEqual(len(client.sent_packets), 0)
+        self.assertEqual(client.latest_rtt, 100 * MICROSECOND)
+        self.assertLess(simulator.now(), SECOND)
@@ -0,0 +1,100 @@
+import io
+import random
+from unittest import TestCase
+
+from quic.frames.stream import StreamFrame
+from quic.stream_reassembler import StreamReassembler
+
+
+class TestStreamReassembler(TestCase):
+    def test_in_order(self):
+        delivered = []
+        reassembler = StreamReassembler(delivered.append)
+
+        reassembler.add(0, b"abc")
+        reassembler.add(3, b"def", finish=True)
+
+        self.assertEqual([b"abc", b"def"], delivered)
+        self.assertEqual(0, reassembler.buffered)
+        self.assertTrue(reassembler.finished)
+
+    def test_out_of_order_with_overlaps(self):
+        writer = io.BytesIO()
+        reassembler = StreamReassembler(writer)
+
+        reassembler.add(6, b"ghi")
+        reassembler.add(2, b"cde")
+        self.assertEqual(6, reassembler.buffered)
+
+        # Only the gaps between buffered segments are kept from an overlapping retransmission
+        reassembler.add(3, b"defghijk", finish=True)
+        self.assertEqual(9, reassembler.buffered)
+        self.assertEqual(b"", writer.getvalue())
+
+        reassembler.add(0, b"abcd")
+        self.assertEqual(b"abcdefghijk", writer.getvalue())
+        self.assertEqual(0, reassembler.buffered)
+        self.assertTrue(reassembler.finished)
+
+        # Data that was already delivered is ignored
+        reassembler.add(4, b"efg")
+        self.assertEqual(b"abcdefghijk", writer.getvalue())
+
+    def test_drain_backlog(self):
+        writer = io.BytesIO()
+        reassembler = StreamReassembler(writer)
+        data = bytes(range(256)) * 40
+
+        # Everything but the first segment arrives, then the gap is filled and the whole backlog is delivered
+        for offset in range(10, len(data), 10):
+            reassembler.add(offset, data[offset:offset + 10])
+
+        self.assertEqual(len(data) - 10, reassembler.buffered)
+
+        reassembler.add(0, data[:10])
+
+        self.assertEqual(data, writer.getvalue())
+        self.assertEqual(0, reassembler.buffered)
+
+    def test_stream_frames(self):
+        data = bytes(range(250)) * 40
+        frames = [
+            StreamFrame(0, offset=offset, include_length=True, finish=offset + 100 >= len(data), data=data[offset:offset + 100])
+            for offset in range(0, len(data), 100)
+        ]
+
+        # Reordered within a window of 20 frames, with some frames repeated
+        rng = random.Random(1)
+        shuffled = []
+        for start in range(0, len(frames), 20):
+            window = frames[start:start + 20] + rng.sample(frames[start:start + 20], 5)
+            rng.shuffle(window)
+            shuffled.extend(window)
+
+        writer = io.BytesIO()
+        reassembler = StreamReassembler(writer, max_buffered=4000)
+        max_buffered = 0
+
+        for frame in shuffled:
+            reassembler.on_stream_frame(frame)
+            max_buffered = max(max_buffered, reassembler.buffered)
+
+        self.assertEqual(data, writer.getvalue())
+        self.assertTrue(reassembler.finished)
+        self.assertLess(max_buffered, 2000)
+
+    def test_limits(self):
+        reassembler = StreamReassembler(lambda data: None, max_buffered=10)
+
+        with self.assertRaises(ValueError):
+            reassembler.add(5, b"abcdef")
+
+        reassembler.add(0, b"abc")
+        reassembler.add(8, b"ab")
+        reassembler.add(10, b"", finish=True)
+
+        with self.assertRaises(ValueError):
+            reassembler.add(10, b"a")
+
+        with self.assertRaises(ValueError):
+            reassembler.add(0, b"abcd", finish=True)
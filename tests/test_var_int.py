@@ -1,5 +1,5 @@
 from unittest import TestCase
-from quic.var_int import VarInt
+from quic.var_int import VarInt, decode_many, decode_varint, encode_many, encode_varint, varint_length
 
 
 class TestVarInt(TestCase):
@@ -26,3 +26,26 @@ class TestVarInt(TestCase):
         expected = 4
         actual = VarInt.length_of(t.value).value
         assert actual == expected
+
+    def test_encode_decode_varint(self):
+        for value, length in ((0, 1), (0x3e, 1), (0x3f, 2), (0x3ffe, 2), (0x3fff, 4), (0x3fffffff, 8)):
+            buffer = bytearray(8)
+            end = encode_varint(value, buffer, 0)
+            assert end == length == varint_length(value)
+            assert bytes(buffer[:end]) == VarInt(value).to_bytes()
+            assert decode_varint(buffer, 0) == (value, length)
+
+    def test_varint_too_large(self):
+        with self.assertRaises(ValueError):
+            encode_varint(0x3fffffffffffffff, bytearray(8), 0)
+
+    def test_encode_many_too_large(self):
+        with self.assertRaisesRegex(ValueError, str(0x3fffffffffffffff)):
+            encode_many([5, 0x3fffffffffffffff], bytearray(16), 0)
+
+    def test_encode_decode_many(self):
+        values = [5, 300, 70000, 0xfe8a9bfc]
+        buffer = bytearray(sum(map(varint_length, values)) + 2)
+        end = encode_many(values, buffer, 2)
+        assert end == len(buffer)
+        assert decode_many(memoryview(buffer), 2, len(values)) == (values, end)